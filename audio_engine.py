@@ -0,0 +1,418 @@
+# audio_engine.py
+"""Um único sd.OutputStream com mixer em software para bateria, click, looper e música."""
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+from track_dsp import soft_limit, LIMIT_THRESHOLD
+
+
+def to_float(pcm):
+    """PCM (frames,) / (frames, canais) inteiro ou float -> float32 (frames, canais) em [-1, 1)."""
+    pcm = np.asarray(pcm)
+    if pcm.ndim == 1:
+        pcm = pcm[:, None]
+    if pcm.dtype.kind in "iu":
+        return pcm.astype(np.float32) / float(np.iinfo(pcm.dtype).max + 1)
+    return pcm.astype(np.float32, copy=False)
+
+
+def default_samplerate(device=None, fallback=44100):
+    """Taxa nativa do dispositivo de saída (sem conversão no driver), ou `fallback`."""
+    try:
+        import sounddevice as sd
+        return int(sd.query_devices(device, "output")["default_samplerate"])
+    except Exception as e:
+        logging.debug("Taxa do dispositivo de saída indisponível (%s); usando %d Hz", e, fallback)
+        return fallback
+
+
+def pcm_scale(pcm):
+    """Fator que leva o PCM a [-1, 1): 1 para float, 1/32768 para int16 etc."""
+    if pcm.dtype.kind in "iu":
+        return 1.0 / float(np.iinfo(pcm.dtype).max + 1)
+    return 1.0
+
+
+class Voice:
+    """Um som tocando: PCM float32 ou inteiro (mono ou com os canais da saída), posição e ganho.
+
+    PCM inteiro (ex.: o memmap int16 de um take do looper) é escalado na
+    soma, sem cópia float32.
+    """
+
+    __slots__ = ("id", "pcm", "pos", "start", "gain", "loop", "tag", "pending", "scale", "bus")
+
+    def __init__(self, voice_id, pcm, start, gain, loop, tag, bus=None):
+        self.id = voice_id
+        self.pcm = pcm
+        self.pos = 0
+        self.start = start
+        self.gain = gain
+        self.loop = loop
+        self.tag = tag
+        self.pending = None   # próximo PCM de um loop, trocado na virada
+        self.scale = np.float32(gain * pcm_scale(pcm))
+        self.bus = bus        # track (TrackBuses) ou None: direto no master
+
+
+class MusicSource:
+    """Lê um arquivo em blocos numa thread e entrega ao callback sem bloquear."""
+
+    def __init__(self, path, samplerate, channels, chunk=8192, max_chunks=32, start=None):
+        import soundfile as sf
+        self.path = path
+        self.start = start      # frame da saída em que a música começa (None = já)
+        self.file = sf.SoundFile(path)
+        self.channels = channels
+        self.resample = self.file.samplerate != samplerate
+        self.ratio = samplerate / self.file.samplerate
+        self.chunk = chunk
+        self.queue = queue.Queue(maxsize=max_chunks)
+        self.current = None
+        self.offset = 0
+        self.finished = False
+        self.starved = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._feed, name="music-feeder", daemon=True)
+        self._thread.start()
+
+    def _feed(self):
+        try:
+            while not self._stop.is_set():
+                block = self.file.read(self.chunk, dtype="float32", always_2d=True)
+                if len(block) == 0:
+                    break
+                if self.resample:
+                    # interpolação linear por bloco: suficiente para tocar junto
+                    n_out = max(1, int(round(len(block) * self.ratio)))
+                    x = np.linspace(0, len(block) - 1, n_out)
+                    block = np.stack([np.interp(x, np.arange(len(block)), block[:, c])
+                                      for c in range(block.shape[1])], axis=1).astype(np.float32)
+                while not self._stop.is_set():
+                    try:
+                        self.queue.put(block, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            logging.exception("Erro lendo música %s: %s", self.path, e)
+        finally:
+            self.file.close()
+            self.queue.put(None)
+
+    def mix_into(self, out, gain):
+        """Soma até len(out) frames da música em `out`; False quando acabou."""
+        frames = out.shape[0]
+        done = 0
+        while done < frames:
+            if self.current is None:
+                try:
+                    self.current = self.queue.get_nowait()
+                except queue.Empty:
+                    self.starved += 1
+                    return True
+                self.offset = 0
+                if self.current is None:
+                    self.finished = True
+                    return False
+            n = min(frames - done, len(self.current) - self.offset)
+            seg = self.current[self.offset:self.offset + n]
+            if seg.shape[1] == out.shape[1] or seg.shape[1] == 1:
+                out[done:done + n] += seg * gain
+            else:
+                out[done:done + n] += seg[:, :out.shape[1]] * gain
+            done += n
+            self.offset += n
+            if self.offset >= len(self.current):
+                self.current = None
+        return True
+
+    def close(self):
+        self._stop.set()
+
+
+class AudioEngine:
+    """Mixer em blocos NumPy alimentando um único sd.OutputStream.
+
+    Outras threads só enfileiram comandos (`play`, `stop_tag`, `set_loop`...);
+    o callback os aplica no início de cada bloco, então nenhuma estrutura é
+    compartilhada sem trava com a thread de áudio. `play(at=frame)` agenda um
+    som numa posição absoluta do relógio de amostras da saída. Com
+    `samplerate=None`, a taxa nativa do dispositivo é resolvida em `start()`.
+
+    Vozes com `bus=` passam pela cadeia da track (track_dsp.TrackBuses,
+    trocada com `set_buses`); o master termina num limitador suave.
+    """
+
+    def __init__(self, samplerate=44100, channels=2, blocksize=256, max_voices=48, latency="low", device=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.max_voices = max_voices
+        self.latency = latency
+        self.device = device
+        self.master_gain = 1.0
+        self.music_gain = 1.0
+        self.limit_threshold = LIMIT_THRESHOLD
+        self.buses = None
+        self.frame = 0            # frames já entregues à placa
+        self.voices = []
+        self.music = None
+        self.stream = None
+        # limitado: sem stream rodando ninguém drena a fila, e comandos velhos são descartados
+        self._commands = deque(maxlen=4096)
+        self._next_id = 0
+        self._id_lock = threading.Lock()
+        self._clock_ref = (time.perf_counter(), 0)
+        # contadores expostos ao app
+        self.callbacks = 0
+        self.underruns = 0
+        self.stolen = 0
+        self.late = 0
+        self.max_late_frames = 0
+        # exceções no callback: contadas, registradas uma vez por origem, e o stream segue
+        self.errors = 0
+        self._logged_errors = set()
+        self.max_callback_time = 0.0
+        self.last_callback_time = 0.0
+
+    # ---------------- ciclo de vida ---------------- #
+    def start(self):
+        if self.samplerate is None:
+            # resolvida mesmo se o stream não abrir: os samples são preparados para ela
+            self.samplerate = default_samplerate(self.device)
+        import sounddevice as sd
+        self.stream = sd.OutputStream(
+            samplerate=self.samplerate, channels=self.channels, dtype="float32",
+            blocksize=self.blocksize, latency=self.latency, device=self.device,
+            callback=self._callback)
+        self.stream.start()
+        logging.info("AudioEngine iniciado: %d Hz, bloco %d, latência de saída %.1f ms",
+                     self.samplerate, self.blocksize, self.output_latency * 1000)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        if self.music is not None:
+            self.music.close()
+
+    @property
+    def running(self):
+        return self.stream is not None and self.stream.active
+
+    @property
+    def output_latency(self):
+        return float(self.stream.latency) if self.stream is not None else 0.0
+
+    # ---------------- relógio ---------------- #
+    def frame_at(self, t):
+        """Frame da saída correspondente ao instante `t` (time.perf_counter)."""
+        ref_time, ref_frame = self._clock_ref
+        return ref_frame + int(round((t - ref_time) * self.samplerate))
+
+    # ---------------- comandos (qualquer thread) ---------------- #
+    def _new_id(self):
+        with self._id_lock:
+            self._next_id += 1
+            return self._next_id
+
+    def play(self, pcm, gain=1.0, at=None, loop=False, tag=None, bus=None):
+        """Agenda um som; `at` é o frame absoluto de início (None = no próximo bloco), `bus` a track."""
+        voice = Voice(self._new_id(), pcm, at, gain, loop, tag, bus)
+        self._commands.append(("play", voice))
+        return voice.id
+
+    def stop_tag(self, tag):
+        self._commands.append(("stop_tag", tag))
+
+    def set_loop(self, tag, pcm):
+        """Troca o PCM de um loop tocando na próxima volta (sem corte no meio)."""
+        self._commands.append(("set_loop", tag, pcm))
+
+    def set_buses(self, buses):
+        """Troca a cadeia das tracks (track_dsp.TrackBuses já montado; None desliga)."""
+        self._commands.append(("buses", buses))
+
+    def play_music(self, path, at=None):
+        """Toca `path` em streaming; `at` é o frame absoluto de início, como em `play`."""
+        source = MusicSource(path, self.samplerate, self.channels, start=at)
+        self._commands.append(("music", source))
+        return source
+
+    def stop_music(self):
+        self._commands.append(("music", None))
+
+    def stop_all(self):
+        self._commands.append(("stop_all",))
+
+    def stats(self):
+        """Contadores para a UI/diagnóstico."""
+        return {
+            "running": self.running,
+            "blocksize": self.blocksize,
+            "latency_ms": self.output_latency * 1000,
+            "callbacks": self.callbacks,
+            "underruns": self.underruns,
+            "voices": len(self.voices),
+            "stolen": self.stolen,
+            "late": self.late,
+            "errors": self.errors,
+            "callback_ms": self.last_callback_time * 1000,
+            "max_callback_ms": self.max_callback_time * 1000,
+            "music_starved": self.music.starved if self.music is not None else 0,
+        }
+
+    # ---------------- thread de áudio ---------------- #
+    def _apply_commands(self):
+        while self._commands:
+            cmd = self._commands.popleft()
+            kind = cmd[0]
+            if kind == "play":
+                voice = cmd[1]
+                if voice.start is None:
+                    voice.start = self.frame
+                elif voice.start < self.frame:
+                    # chegou depois do prazo: toca inteiro no próximo bloco em vez de cortar o ataque
+                    self.late += 1
+                    self.max_late_frames = max(self.max_late_frames, self.frame - voice.start)
+                    voice.start = self.frame
+                if len(self.voices) >= self.max_voices:
+                    self._steal()
+                self.voices.append(voice)
+            elif kind == "stop_tag":
+                self.voices = [v for v in self.voices if v.tag != cmd[1]]
+            elif kind == "set_loop":
+                for v in self.voices:
+                    if v.tag == cmd[1] and v.loop:
+                        v.pending = cmd[2]
+            elif kind == "music":
+                if self.music is not None:
+                    self.music.close()
+                self.music = cmd[1]
+                if self.music is not None and self.music.start is None:
+                    self.music.start = self.frame
+            elif kind == "buses":
+                if cmd[1] is not None and self.buses is not None:
+                    cmd[1].take_state(self.buses)
+                self.buses = cmd[1]
+            elif kind == "stop_all":
+                self.voices = []
+                if self.music is not None:
+                    self.music.close()
+                    self.music = None
+
+    def _fail(self, where, error):
+        """Erro na thread de áudio: conta e registra só a primeira vez de cada origem/tipo."""
+        self.errors += 1
+        key = (where, type(error))
+        if key not in self._logged_errors:
+            self._logged_errors.add(key)
+            logging.error("Erro no mixer (%s): %s; descartado, a saída continua", where, error, exc_info=True)
+
+    def _steal(self):
+        # rouba a voz one-shot mais antiga já soando; depois uma ainda agendada;
+        # loops só se não houver outra opção
+        for candidates in ((v for v in self.voices if not v.loop and v.start <= self.frame),
+                           (v for v in self.voices if not v.loop),
+                           iter(self.voices)):
+            victim = next(candidates, None)
+            if victim is not None:
+                self.voices.remove(victim)
+                self.stolen += 1
+                return
+
+    def mix(self, out):
+        """Aplica os comandos pendentes, mistura um bloco em `out` (frames, canais) e avança o relógio."""
+        self._apply_commands()
+        frames = out.shape[0]
+        out.fill(0.0)
+        block_start = self.frame
+        block_end = block_start + frames
+        buses = self.buses
+        bus_buffers = buses.begin(frames) if buses is not None else None
+        alive = []
+        for v in self.voices:
+            if v.start >= block_end:
+                alive.append(v)
+                continue
+            dst = max(0, v.start - block_start)
+            target = out
+            if bus_buffers is not None and v.bus is not None and v.bus < buses.count:
+                target = bus_buffers[v.bus]
+                buses.active[v.bus] = True
+            try:
+                while dst < frames:
+                    length = v.pcm.shape[0]
+                    n = min(frames - dst, length - v.pos)
+                    if n > 0:
+                        seg = v.pcm[v.pos:v.pos + n]
+                        if v.scale == 1.0:
+                            target[dst:dst + n] += seg
+                        else:
+                            target[dst:dst + n] += seg * v.scale
+                        v.pos += n
+                        dst += n
+                    if v.pos >= length:
+                        if not v.loop:
+                            break
+                        if v.pending is not None:
+                            v.pcm, v.pending = v.pending, None
+                            v.scale = np.float32(v.gain * pcm_scale(v.pcm))
+                        v.pos = 0
+                        if length == 0:
+                            break
+            except Exception as e:
+                # PCM com forma/tipo inválido: só esta voz sai
+                self._fail("voz", e)
+                continue
+            if v.loop or v.pos < v.pcm.shape[0]:
+                alive.append(v)
+        self.voices = alive
+        if buses is not None:
+            try:
+                buses.mix_into(out)
+            except Exception as e:
+                self._fail("buses", e)
+                self.buses = None
+        music = self.music
+        if music is not None and music.start < block_end:
+            try:
+                if not music.mix_into(out[max(0, music.start - block_start):], self.music_gain):
+                    self.music = None
+            except Exception as e:
+                self._fail("música", e)
+                music.close()
+                self.music = None
+        if self.master_gain != 1.0:
+            out *= self.master_gain
+        if self.limit_threshold < 1.0:
+            soft_limit(out, self.limit_threshold)
+        np.clip(out, -1.0, 1.0, out=out)
+        self.frame = block_end
+
+    def _callback(self, outdata, frames, time_info, status):
+        t0 = time.perf_counter()
+        self.callbacks += 1
+        if status.output_underflow:
+            self.underruns += 1
+        # referência do relógio: o bloco atual começa a soar ~agora + latência
+        block_start = self.frame
+        self._clock_ref = (t0, block_start)
+        try:
+            self.mix(outdata)
+        except Exception as e:
+            # nunca propaga: uma exceção aqui abortaria o stream e calaria tudo até fechar o app
+            self._fail("callback", e)
+            outdata.fill(0.0)
+            self.frame = block_start + frames
+        elapsed = time.perf_counter() - t0
+        self.last_callback_time = elapsed
+        if elapsed > self.max_callback_time:
+            self.max_callback_time = elapsed
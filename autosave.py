@@ -0,0 +1,164 @@
+# autosave.py
+"""Gravação automática (write-behind) do estado do sequenciador no grooves.db.
+
+A UI só entrega o estado atual com `submit` (uma cópia dos eventos do
+padrão, BPM e timbres, sem I/O nem codificação). Uma thread própria espera
+as edições pararem por `debounce` segundos (ou no máximo `max_delay` desde a
+primeira edição pendente, para uma sequência longa de cliques não adiar a
+gravação para sempre), codifica com o groove_codec e grava só o último
+estado, numa transação (tabela `autosave` do GrooveStore). Rajadas de
+edições viram uma escrita só.
+
+Ao abrir, a mesma thread lê o último estado gravado e o entrega a
+`on_restore`; `clean` diz se a sessão anterior fechou normalmente (close)
+ou caiu no meio. Logo depois a linha volta a `clean = 0`: uma sessão que
+cair sem nenhuma edição também aparece como queda na próxima abertura.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+import groove_codec
+from pattern_events import Pattern
+
+DEBOUNCE = 0.5
+MAX_DELAY = 5.0
+
+
+class AutosaveWriter:
+    """Fila de uma posição entre a thread da UI e o banco: só o estado mais recente importa."""
+
+    def __init__(self, store, tracks, debounce=DEBOUNCE, max_delay=MAX_DELAY, on_restore=None, perf=None):
+        self.store = store
+        self.tracks = tuple(tracks)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_restore = on_restore
+        self.perf = perf
+        self._cond = threading.Condition()
+        self._pending = None        # (seq, eventos, comprimento, bpm, timbres)
+        self._pending_edits = 0
+        self._first = self._last = 0.0
+        self._urgent = False
+        self._closing = False
+        self._last_saved = None     # (bpm, blob) no banco: estado igual não é regravado
+        # contadores (lidos pelo benchmark)
+        self.submitted = 0
+        self.written = 0            # seq do último estado já no banco
+        self.commits = 0
+        self.skipped = 0
+        self.commit_ms = deque(maxlen=1024)
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    # ---------------- thread da UI ---------------- #
+    def submit(self, pattern, bpm, timbres):
+        """Registra o estado atual; só copia os eventos e acorda a thread."""
+        state = (pattern.events.copy(), pattern.length, int(bpm), dict(timbres))
+        with self._cond:
+            now = time.monotonic()
+            self.submitted += 1
+            if self._pending is None:
+                self._first = now
+                self._cond.notify()
+            self._pending = (self.submitted, *state)
+            self._pending_edits += 1
+            self._last = now
+
+    def flush(self, timeout=None):
+        """Grava já o que estiver pendente e espera; True se chegou ao banco dentro do `timeout`."""
+        with self._cond:
+            target = self.submitted
+            if self._pending is not None:
+                self._urgent = True
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self.written >= target, timeout)
+
+    def close(self, timeout=2.0):
+        """Grava o pendente, marca o fechamento normal e encerra a thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    # ---------------- thread de gravação ---------------- #
+    def _run(self):
+        # nada da restauração pode derrubar a thread: sem ela, nada mais seria gravado
+        try:
+            self._restore()
+        except Exception as e:
+            logging.error("Erro restaurando a gravação automática: %s", e, exc_info=True)
+        try:
+            self.store.mark_autosave_dirty()
+        except Exception as e:
+            logging.warning("Erro marcando a abertura da gravação automática: %s", e)
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closing:
+                    self._cond.wait()
+                if self._pending is None:
+                    break
+                # debounce: cada submit empurra o prazo, até o limite de max_delay
+                while not (self._urgent or self._closing):
+                    deadline = min(self._last + self.debounce, self._first + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                state, edits = self._pending, self._pending_edits
+                self._pending, self._pending_edits, self._urgent = None, 0, False
+            self._commit(state, edits)
+        try:
+            self.store.mark_autosave_clean()
+        except Exception as e:
+            logging.warning("Erro marcando o fechamento da gravação automática: %s", e)
+
+    def _restore(self):
+        try:
+            row = self.store.load_autosave()
+        except Exception as e:
+            logging.warning("Erro lendo a gravação automática: %s", e)
+            return
+        if row is None:
+            return
+        self._last_saved = (row["bpm"], row["pattern"])
+        try:
+            groove = groove_codec.decode(row["pattern"])
+        except ValueError as e:
+            logging.warning("Gravação automática ilegível ignorada: %s", e)
+            return
+        if not row["clean"]:
+            logging.warning("Sessão anterior não foi fechada normalmente; recuperando o estado de %s",
+                            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["saved_at"])))
+        if self.on_restore is not None:
+            self.on_restore(groove, row["bpm"], row["clean"])
+
+    def _commit(self, state, edits):
+        seq, events, length, bpm, timbres = state
+        start = time.perf_counter()
+        try:
+            groove = Pattern(self.tracks, length, events).to_groove()
+            blob = groove_codec.encode(groove["sequence"], timbres, groove.get("velocity"),
+                                       groove.get("probability"), groove["length"])
+            if self._last_saved == (bpm, blob):
+                self.skipped += 1
+            else:
+                self.store.save_autosave(bpm, blob, edits)
+                self._last_saved = (bpm, blob)
+                ms = (time.perf_counter() - start) * 1000
+                self.commits += 1
+                self.commit_ms.append(ms)
+                if self.perf is not None:
+                    self.perf.record("autosave", start, edits, ms)
+                logging.debug("Gravação automática: %d edições em %.1f ms", edits, ms)
+        except Exception as e:
+            # o estado continua na memória; a próxima edição tenta de novo
+            logging.error("Erro na gravação automática: %s", e, exc_info=True)
+        with self._cond:
+            self.written = max(self.written, seq)
+            self._cond.notify_all()
@@ -0,0 +1,89 @@
+# beat_sync.py
+"""Relógio do sequenciador travado na grade de batidas detectada na música."""
+import numpy as np
+
+from sequencer_clock import StepClock
+
+STEPS_PER_BEAT = 4
+BEATS_PER_BAR = 4
+STEPS_PER_BAR = STEPS_PER_BEAT * BEATS_PER_BAR
+
+
+class BeatGridClock(StepClock):
+    """StepClock cujos passos caem nas batidas da música (bpm_analysis).
+
+    O instante de referência (`music_origin`) é quando a música está em t=0;
+    o passo 0 cai na primeira batida detectada. Dois modos:
+
+    - travado (padrão): andamento fixo no BPM mediano da música, mas cada
+      compasso começa exatamente na batida detectada (correção de fase por
+      compasso), então o erro nunca acumula além de um compasso;
+    - `stretch=True`: cada passo é interpolado entre as batidas vizinhas,
+      acompanhando as variações de andamento da música.
+
+    Em ambos, `corrections` guarda, por compasso, quanto um relógio de
+    andamento fixo teria se afastado da batida detectada (em segundos).
+    """
+
+    def __init__(self, beats, stretch=False, **kwargs):
+        super().__init__(**kwargs)
+        beats = np.asarray(beats, dtype=np.float64)
+        if len(beats) < 2:
+            raise ValueError("grade de batidas precisa de pelo menos duas batidas")
+        self.beats = beats
+        self.stretch = stretch
+        self.beat_period = float(np.median(np.diff(beats)))
+        self.corrections = []
+        self.music_origin = None
+
+    @property
+    def bpm(self):
+        return 60.0 / self.beat_period
+
+    def start(self, step_duration=None, now=None):
+        """Zera o transporte; `now` é o instante em que a música começa a tocar."""
+        super().start(self.beat_period / STEPS_PER_BEAT, now)
+        self.music_origin = self._anchor_time
+        self.corrections = []
+
+    def set_step_duration(self, step_duration):
+        # o andamento vem da música, não do BPM da UI
+        pass
+
+    def beat_time(self, beat):
+        """Instante (s, na música) da batida `beat`, extrapolado além das pontas."""
+        last = len(self.beats) - 1
+        if beat <= last:
+            return float(self.beats[beat])
+        return float(self.beats[last]) + (beat - last) * self.beat_period
+
+    def music_time(self, step):
+        """Instante (s, na música) do passo `step`."""
+        if self.stretch:
+            beat, sub = divmod(step, STEPS_PER_BEAT)
+            t0 = self.beat_time(beat)
+            return t0 + (self.beat_time(beat + 1) - t0) * sub / STEPS_PER_BEAT
+        bar, sub = divmod(step, STEPS_PER_BAR)
+        return self.beat_time(bar * BEATS_PER_BAR) + sub * self.beat_period / STEPS_PER_BEAT
+
+    def due_time(self, step):
+        return self.music_origin + self.music_time(step)
+
+    def wait_next(self, stop_event=None, until=None):
+        tick = super().wait_next(stop_event, until)
+        if tick is not None and tick.step and tick.step % STEPS_PER_BAR == 0:
+            # onde um relógio de andamento fixo, saindo do compasso anterior, teria caído
+            free_running = self.music_time(tick.step - STEPS_PER_BAR) + BEATS_PER_BAR * self.beat_period
+            self.corrections.append(self.music_time(tick.step) - free_running)
+        return tick
+
+    def alignment_report(self):
+        """Resumo do erro de alinhamento (ms) corrigido compasso a compasso."""
+        corr = np.abs(np.asarray(self.corrections)) * 1000
+        return {
+            "bars": len(corr),
+            "correction_mean_ms": float(corr.mean()) if len(corr) else 0.0,
+            "correction_max_ms": float(corr.max()) if len(corr) else 0.0,
+            "late_steps": self.late_steps,
+            "dropped_steps": self.dropped_steps,
+        }
@@ -0,0 +1,238 @@
+# benchmarks/bench_autosave.py
+"""Gravação automática: custo das edições na thread do Tk, agrupamento e recuperação após queda.
+
+Roda o DrumMachine headless numa pasta temporária e aplica rajadas de
+edições (toggle_step, BPM e timbre) como um usuário clicando. Mede o tempo
+de cada edição na thread principal, quantas transações o autosave fez e
+quanto demorou para a última edição da rajada chegar ao banco. Um audit
+hook e o trace do sqlite3 contam aberturas de arquivo e statements SQL por
+thread: na thread principal, durante as edições, os dois têm de ser zero.
+Por fim, um processo edita e morre sem fechar (os._exit) e outro confere
+se abre com o mesmo estado.
+
+    python benchmarks/bench_autosave.py --bursts 10 --burst-size 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import threading
+import subprocess
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+import headless  # noqa: E402
+from run_suite import make_workdir, percentiles, wait_audio  # noqa: E402
+
+# (thread, tipo) -> contagem, só enquanto `watching` estiver ligado
+io_events = Counter()
+watching = threading.Event()
+
+
+def _audit(event, args):
+    if watching.is_set() and event in ("open", "sqlite3.connect"):
+        io_events[(threading.current_thread().name, event)] += 1
+
+
+def install_io_probe():
+    """Conta aberturas de arquivo (audit hook) e statements de cada conexão do GrooveStore."""
+    from db_backend import GrooveStore
+    sys.addaudithook(_audit)
+    connection = GrooveStore.connection
+
+    def traced(self):
+        conn = connection(self)
+        if not getattr(self._local, "traced", False):
+            self._local.traced = True
+            conn.set_trace_callback(
+                lambda sql: watching.is_set() and io_events.update([(threading.current_thread().name, "sql")]))
+        return conn
+
+    GrooveStore.connection = traced
+
+
+def state_of(app):
+    return {"events": app.pattern.events.tolist(), "length": app.pattern.length, "bpm": int(app.bpm.get()),
+            "timbres": app.current_timbres()}
+
+
+def pump_for(root, seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        root.pump()
+        time.sleep(0.002)
+
+
+def new_app():
+    import drum_machine
+    root = headless.FakeRoot()
+    app = drum_machine.DrumMachine(root)
+    return drum_machine, root, app
+
+
+# ---------------- rajadas de edições ---------------- #
+def bench_edits(args):
+    dm, root, app = new_app()
+    wait_audio(app, root)
+    rng = random.Random(0)
+    timbre_ids = {inst: [t.id for t in dm.catalog.timbres(inst)] for inst in dm.TRACKS}
+    edit_ms, submit_ms, settle_ms = [], [], []
+    submit = app.autosave.submit
+
+    def timed_submit(*a, **kw):
+        start = time.perf_counter()
+        submit(*a, **kw)
+        submit_ms.append((time.perf_counter() - start) * 1000)
+
+    app.autosave.submit = timed_submit
+    commits_before = app.autosave.commits
+    io_events.clear()
+    for _ in range(args.bursts):
+        watching.set()
+        for _ in range(args.burst_size):
+            kind = rng.random()
+            start = time.perf_counter()
+            if kind < 0.8:
+                app.toggle_step(rng.choice(dm.TRACKS), rng.randrange(dm.GRID_COLUMNS))
+            elif kind < 0.95:
+                app.bpm.set(rng.randrange(60, 200))
+            else:
+                inst = rng.choice([i for i in dm.TRACKS if timbre_ids[i]])
+                app.set_timbre(inst, rng.choice(timbre_ids[inst]))
+            edit_ms.append((time.perf_counter() - start) * 1000)
+            pump_for(root, args.interval / 1000)
+        # da última edição da rajada até ela estar no banco (debounce + transação)
+        start = time.perf_counter()
+        target = app.autosave.submitted
+        while app.autosave.written < target and time.perf_counter() - start < 10:
+            root.pump()
+            time.sleep(0.001)
+        settle_ms.append((time.perf_counter() - start) * 1000)
+        watching.clear()
+        pump_for(root, max(args.pause / 1000 - settle_ms[-1] / 1000, 0))
+    edits = args.bursts * args.burst_size
+    commits = app.autosave.commits - commits_before
+    main_io = {kind: n for (thread, kind), n in io_events.items() if thread == "MainThread"}
+    writer_io = {kind: n for (thread, kind), n in io_events.items() if thread == "autosave"}
+    app.autosave.close()
+    result = {
+        "edits": edits,
+        "commits": commits,
+        "edits_per_commit": edits / commits if commits else None,
+        "edit_ms": percentiles(edit_ms),
+        "submit_ms": percentiles(submit_ms),
+        "commit_ms": percentiles(list(app.autosave.commit_ms)[-commits:] if commits else []),
+        "settle_ms": percentiles(settle_ms),
+        "main_thread_io": main_io,
+        "autosave_thread_io": writer_io,
+    }
+    dm.engine.close()
+    return result
+
+
+# ---------------- queda e recuperação (processos novos) ---------------- #
+def child_crash(seed):
+    """Edita, espera o debounce e morre sem fechar; imprime o estado esperado."""
+    dm, root, app = new_app()
+    pump_for(root, 0.2)
+    rng = random.Random(seed)
+    for _ in range(40):
+        app.toggle_step(rng.choice(dm.TRACKS), rng.randrange(dm.GRID_COLUMNS))
+    app.bpm.set(rng.randrange(60, 200))
+    for inst in dm.TRACKS:
+        ids = [t.id for t in dm.catalog.timbres(inst)]
+        if len(ids) > 1:
+            app.set_timbre(inst, ids[-1])
+            break
+    pump_for(root, app.autosave.debounce + 0.5)
+    print(json.dumps(state_of(app)), flush=True)
+    os._exit(1)
+
+
+def child_verify():
+    """Abre o app e imprime o estado restaurado (com o tempo até a restauração)."""
+    start = time.perf_counter()
+    dm, root, app = new_app()
+    while app.autosave.submitted == 0 and time.perf_counter() - start < 10:
+        root.pump()
+        time.sleep(0.002)
+    print(json.dumps({**state_of(app), "restore_ms": (time.perf_counter() - start) * 1000}), flush=True)
+    os._exit(0)
+
+
+def run_child(mode, workdir, seed=0):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), mode, "--seed", str(seed)], cwd=workdir,
+                         capture_output=True, text=True)
+    lines = out.stdout.strip().splitlines()
+    if not lines:
+        raise RuntimeError(f"processo {mode} falhou:\n{out.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def bench_recovery(workdir, runs):
+    ok, restore_ms = 0, []
+    for seed in range(runs):
+        expected = run_child("--child-crash", workdir, seed)
+        restored = run_child("--child-verify", workdir)
+        restore_ms.append(restored.pop("restore_ms"))
+        ok += restored == expected
+    return {"runs": runs, "restored": ok, "restore_ms": percentiles(restore_ms)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=50, help="edições por rajada")
+    parser.add_argument("--interval", type=float, default=5.0, help="ms entre edições de uma rajada")
+    parser.add_argument("--pause", type=float, default=1000.0, help="ms entre rajadas")
+    parser.add_argument("--crash-runs", type=int, default=3, help="processos derrubados no teste de recuperação")
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--child-crash", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child-verify", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    headless.install()
+    logging.disable(logging.CRITICAL)
+    if args.child_crash:
+        child_crash(args.seed)
+    if args.child_verify:
+        child_verify()
+
+    workdir = make_workdir()
+    try:
+        os.chdir(workdir)
+        install_io_probe()
+        edits = bench_edits(args)
+        os.chdir(ROOT)
+        recovery = bench_recovery(workdir, args.crash_runs)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    e = edits
+    print(f"{e['edits']} edições em {args.bursts} rajadas -> {e['commits']} transações "
+          f"({e['edits_per_commit'] or 0:.1f} edições por transação)")
+    print(f"  edição na thread do Tk: p50 {e['edit_ms']['p50']:.3f} ms, p99 {e['edit_ms']['p99']:.3f} ms, "
+          f"máx {e['edit_ms']['max']:.3f} ms (submit p99 {e['submit_ms']['p99'] * 1000:.0f} µs)")
+    if e["commit_ms"]:
+        print(f"  transação (thread autosave): p50 {e['commit_ms']['p50']:.2f} ms, máx {e['commit_ms']['max']:.2f} ms")
+    print(f"  última edição no banco após: p50 {e['settle_ms']['p50']:.0f} ms, máx {e['settle_ms']['max']:.0f} ms")
+    print(f"  I/O na thread do Tk durante edições e gravação: {e['main_thread_io'] or 'nenhum'}; "
+          f"na thread autosave: {e['autosave_thread_io']}")
+    print(f"  recuperação após os._exit: {recovery['restored']}/{recovery['runs']} estados restaurados, "
+          f"restauração p50 {recovery['restore_ms']['p50']:.0f} ms desde a construção")
+    failed = bool(e["main_thread_io"]) or recovery["restored"] != recovery["runs"]
+    if failed:
+        print("FALHA: I/O na thread do Tk ou estado não restaurado")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
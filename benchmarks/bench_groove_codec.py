@@ -0,0 +1,82 @@
+# benchmarks/bench_groove_codec.py
+"""Tamanho e tempo de decode: JSON antigo vs groove_codec binário.
+
+Gera uma biblioteca sintética (padrão: 100k grooves de 4 x 16) e grava as
+duas representações em bancos temporários para comparar o tamanho em disco.
+
+    python benchmarks/bench_groove_codec.py --count 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import groove_codec  # noqa: E402
+
+INSTRUMENTS = {"kick": "Bumbo", "snare": "Caixa", "hat": "Hi-hat", "tom": "Tom"}
+
+
+def legacy_row(rng):
+    sequence = {inst: [rng.randint(0, 1) for _ in range(16)] for inst in INSTRUMENTS}
+    timbres = {inst: f"{label} {rng.randint(1, 7)}" for inst, label in INSTRUMENTS.items()}
+    return json.dumps({"sequence": sequence, "timbres": timbres})
+
+
+def db_size(rows, column_sql):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lib.db")
+        conn = sqlite3.connect(path)
+        conn.execute(f"CREATE TABLE grooves (id INTEGER PRIMARY KEY, name TEXT, bpm INTEGER, {column_sql})")
+        with conn:
+            conn.executemany("INSERT INTO grooves (name, bpm, data) VALUES (?, 120, ?)",
+                             ((f"Groove {i}", row) for i, row in enumerate(rows)))
+        conn.execute("VACUUM")
+        conn.close()
+        return os.path.getsize(path)
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(7)
+    legacy = [legacy_row(rng) for _ in range(args.count)]
+    start = time.perf_counter()
+    binary = []
+    for text in legacy:
+        g = groove_codec.from_json(text)
+        binary.append(groove_codec.encode(g["sequence"], g["timbres"]))
+    migrate = time.perf_counter() - start
+
+    json_bytes = sum(len(t.encode("utf-8")) for t in legacy)
+    bin_bytes = sum(len(b) for b in binary)
+    t_json = timed(json.loads, legacy)
+    t_bin = timed(groove_codec.decode, binary)
+
+    n = args.count
+    print(f"{n} grooves (4 tracks x 16 passos)")
+    print(f"payload JSON:    {json_bytes / n:6.1f} B/groove  total {json_bytes / 1e6:7.2f} MB  "
+          f"decode {t_json / n * 1e6:6.2f} us/groove")
+    print(f"payload binário: {bin_bytes / n:6.1f} B/groove  total {bin_bytes / 1e6:7.2f} MB  "
+          f"decode {t_bin / n * 1e6:6.2f} us/groove")
+    print(f"migração JSON -> binário: {migrate:.2f} s")
+    print(f"banco SQLite: JSON {db_size(legacy, 'data TEXT') / 1e6:7.2f} MB, "
+          f"binário {db_size(binary, 'data BLOB') / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_groove_library.py
+"""Consultas da biblioteca de grooves num banco gerado de 100k linhas.
+
+Compara o antigo `SELECT id, name, bpm FROM grooves` sem limite com as
+páginas por cursor, a busca FTS5 por nome, o filtro por BPM e a busca por
+similaridade de padrão.
+
+    python benchmarks/bench_groove_library.py --count 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import GrooveStore, SQL_LIST  # noqa: E402
+
+INSTRUMENTS = ("kick", "snare", "hat", "tom")
+WORDS = ("Rock", "Reggae", "Funk", "Samba", "Baião", "Jazz", "Hip Hop", "House", "Pop", "Xote")
+
+
+def make_library(store, count, rng):
+    batch = []
+    for i in range(count):
+        sequence = {inst: [int(rng.random() < 0.3) for _ in range(16)] for inst in INSTRUMENTS}
+        timbres = {inst: rng.randint(0, 6) for inst in INSTRUMENTS}
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+        batch.append((name, rng.randint(40, 200), sequence, timbres))
+        if len(batch) == 10_000:
+            store.save_many(batch)
+            batch = []
+    if batch:
+        store.save_many(batch)
+
+
+def timed(label, fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    ms = (time.perf_counter() - start) / repeat * 1000
+    rows = result[0] if isinstance(result, tuple) else result
+    print(f"{label:<32} {ms:9.3f} ms  ({len(rows)} linhas)")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GrooveStore(os.path.join(tmp, "library.db"))
+        start = time.perf_counter()
+        make_library(store, args.count, random.Random(3))
+        print(f"{args.count} grooves gerados em {time.perf_counter() - start:.1f} s")
+        conn = store.connection()
+
+        timed("lista completa (antigo)", lambda: conn.execute(SQL_LIST).fetchall(), repeat=3)
+        _rows, cursor = timed("primeira página", lambda: store.page())
+        for _ in range(200):
+            _rows, cursor = store.page(after=cursor)
+        timed("página 200 (cursor)", lambda: store.page(after=cursor))
+        timed("FTS 'samba fu'", lambda: store.page("samba fu"))
+        timed("FTS + BPM 90-100", lambda: store.page("rock", 90, 100))
+        timed("BPM 120-121", lambda: store.page(None, 120, 121))
+        probe = {inst: [int(i % 4 == 0) for i in range(16)] for inst in INSTRUMENTS}
+        timed("similaridade (top 50)", lambda: store.similar(probe), repeat=3)
+        timed("similaridade BPM 118-122", lambda: store.similar(probe, bpm_min=118, bpm_max=122), repeat=3)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_groove_store.py
+"""Grooves gravados/lidos por segundo: conexão por chamada vs GrooveStore.
+
+Roda num banco temporário; o grooves.db do projeto não é tocado.
+
+    python benchmarks/bench_groove_store.py --count 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import GrooveStore, SQL_CREATE  # noqa: E402
+
+INSTRUMENTS = ("kick", "snare", "hat", "tom")
+LEGACY_INSERT = "INSERT INTO grooves (name, bpm, data) VALUES (?,?,?)"
+LEGACY_BY_ID = "SELECT data, bpm FROM grooves WHERE id = ?"
+
+
+def make_groove(i, rng):
+    sequence = {inst: [rng.randint(0, 1) for _ in range(16)] for inst in INSTRUMENTS}
+    timbres = {inst: f"{inst} {rng.randint(1, 7)}" for inst in INSTRUMENTS}
+    return f"Groove {i}", rng.randint(40, 200), sequence, timbres
+
+
+def legacy_save(db_file, name, bpm, sequence, timbres):
+    """Cópia do save_groove antigo: abre e fecha a conexão a cada chamada."""
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    c.execute(LEGACY_INSERT, (name, bpm, json.dumps({"sequence": sequence, "timbres": timbres})))
+    groove_id = c.lastrowid
+    conn.commit()
+    conn.close()
+    return groove_id
+
+
+def legacy_load(db_file, groove_id):
+    conn = sqlite3.connect(db_file)
+    row = conn.execute(LEGACY_BY_ID, (groove_id,)).fetchone()
+    conn.close()
+    return json.loads(row[0]), row[1]
+
+
+def rate(count, fn):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(1)
+    grooves = [make_groove(i, rng) for i in range(args.count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_db)
+        conn.execute(SQL_CREATE)
+        conn.close()
+        ids = []
+        save = rate(args.count, lambda: ids.extend(legacy_save(legacy_db, *g) for g in grooves))
+        load = rate(args.count, lambda: [legacy_load(legacy_db, gid) for gid in ids])
+        print(f"conexão por chamada: {save:9.0f} saves/s  {load:9.0f} loads/s")
+
+        store = GrooveStore(os.path.join(tmp, "store.db"))
+        ids = []
+        save = rate(args.count, lambda: ids.extend(store.save(*g) for g in grooves))
+        load = rate(args.count, lambda: [store.load_by_id(gid) for gid in ids])
+        print(f"GrooveStore:         {save:9.0f} saves/s  {load:9.0f} loads/s")
+        batch = rate(args.count, lambda: store.save_many(grooves))
+        print(f"GrooveStore batch:   {batch:9.0f} saves/s (save_many, uma transação)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_logging_jitter.py
+"""Jitter dos passos do sequenciador com log na thread de áudio: síncrono vs fila.
+
+Roda o StepClock e, em cada passo, emite `--records` linhas de log, como o
+laço faria num caminho de erro. Compara sem log, com FileHandler síncrono
+(o antigo basicConfig) e com o pipeline QueueHandler/QueueListener do
+log_setup. `--slow-ms` soma uma espera a cada escrita em disco, simulando
+disco/antivírus lentos.
+
+    python benchmarks/bench_logging_jitter.py --bpm 800 --bars 16 --slow-ms 2
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sequencer_clock import StepClock  # noqa: E402
+from log_setup import setup_logging, shutdown_logging, LOG_FORMAT  # noqa: E402
+
+NUM_STEPS = 16
+
+
+def slow_down(handler, seconds):
+    if seconds <= 0:
+        return handler
+    emit = handler.emit
+
+    def slow_emit(record):
+        time.sleep(seconds)
+        emit(record)
+    handler.emit = slow_emit
+    return handler
+
+
+def run(bars, bpm, records, log=True):
+    """Erros de onset (s) e tempo bloqueado no log por passo (s)."""
+    clock = StepClock()
+    clock.start(60 / bpm / 4)
+    stop = threading.Event()
+    lateness, blocked = [], []
+    while clock.next_step < bars * NUM_STEPS:
+        tick = clock.wait_next(stop)
+        lateness.append(tick.lateness)
+        t0 = time.perf_counter()
+        if log:
+            for i in range(records):
+                logging.info("passo %d: registro %d do caminho de erro", tick.step, i)
+        blocked.append(time.perf_counter() - t0)
+    return lateness, blocked, clock.late_steps
+
+
+def summarize(values):
+    ms = sorted(v * 1000 for v in values)
+    return sum(ms) / len(ms), ms[min(len(ms) - 1, int(len(ms) * 0.99))], ms[-1]
+
+
+def report(label, result):
+    lateness, blocked, late = result
+    lm, lp, lw = summarize(lateness)
+    bm, bp, bw = summarize(blocked)
+    print(f"{label:>16}: onset média {lm:6.3f} p99 {lp:6.3f} pior {lw:7.3f} ms | "
+          f"bloqueado no log média {bm:6.3f} p99 {bp:6.3f} pior {bw:7.3f} ms | atrasados {late}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=16)
+    parser.add_argument("--bpm", type=int, default=800)
+    parser.add_argument("--records", type=int, default=4, help="linhas de log por passo")
+    parser.add_argument("--slow-ms", type=float, default=2.0, help="atraso extra por escrita em disco")
+    args = parser.parse_args(argv)
+    slow = args.slow_ms / 1000
+
+    print(f"{args.bars} compassos a {args.bpm} BPM, {args.records} logs/passo, disco +{args.slow_ms} ms/escrita")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        report("sem log", run(args.bars, args.bpm, args.records, log=False))
+
+        sync = logging.FileHandler(os.path.join(tmp, "sync.log"), encoding="utf-8")
+        sync.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(slow_down(sync, slow))
+        report("FileHandler", run(args.bars, args.bpm, args.records))
+        root.removeHandler(sync)
+        sync.close()
+
+        listener = setup_logging(level="INFO", console_level="CRITICAL",
+                                 log_file=os.path.join(tmp, "queue.log"))
+        for handler in listener.handlers:
+            if isinstance(handler, logging.FileHandler):
+                slow_down(handler, slow)
+        report("QueueHandler", run(args.bars, args.bpm, args.records))
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
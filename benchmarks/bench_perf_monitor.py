@@ -0,0 +1,44 @@
+# benchmarks/bench_perf_monitor.py
+"""Custo por evento do PerfMonitor: desligado, ligado e com o buffer já cheio.
+
+Mede o mesmo `record("step", ...)` que o laço do sequenciador faz a cada
+passo, para confirmar que a instrumentação cabe no orçamento de um passo.
+
+    python benchmarks/bench_perf_monitor.py --events 200000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perf_monitor import PerfMonitor  # noqa: E402
+
+
+def cost_ns(monitor, events):
+    record = monitor.record
+    t0 = time.perf_counter()
+    for i in range(events):
+        record("step", t0, i, 0.1, 0.05, 4, 0, 0)
+    return (time.perf_counter() - t0) / events * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--capacity", type=int, default=4096)
+    args = parser.parse_args()
+
+    off = PerfMonitor(args.capacity)
+    on = PerfMonitor(args.capacity, enabled=True)
+    print(f"{args.events} eventos, buffer de {args.capacity}")
+    print(f"  desligado      {cost_ns(off, args.events):8.0f} ns/evento")
+    print(f"  ligado         {cost_ns(on, args.events):8.0f} ns/evento (buffer já deu a volta)")
+    t0 = time.perf_counter()
+    text = on.summary_text()
+    print(f"  summary_text   {(time.perf_counter() - t0) * 1000:8.2f} ms ({len(text.splitlines())} linhas)")
+
+
+if __name__ == "__main__":
+    main()
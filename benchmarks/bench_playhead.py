@@ -0,0 +1,113 @@
+# benchmarks/bench_playhead.py
+"""Chamadas Tk por segundo para destacar o passo: grade inteira vs PlayheadRenderer.
+
+Usa um root falso (fila de `after` processada na thread principal) e botões
+que só contam `config`, então roda sem display.
+
+    python benchmarks/bench_playhead.py --bpm 200 --bpm 2000 --seconds 2
+"""
+import os
+import sys
+import time
+import heapq
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playhead import PlayheadRenderer  # noqa: E402
+
+INSTRUMENTS = ("kick", "snare", "hat", "tom")
+NUM_STEPS = 16
+
+
+class FakeRoot:
+    def __init__(self):
+        self.calls = 0
+        self._queue = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def after(self, ms, fn):
+        with self._lock:
+            self.calls += 1
+            self._seq += 1
+            heapq.heappush(self._queue, (time.perf_counter() + ms / 1000, self._seq, fn))
+
+    def pump_until(self, deadline):
+        while time.perf_counter() < deadline or self._queue:
+            with self._lock:
+                job = self._queue[0] if self._queue and self._queue[0][0] <= time.perf_counter() else None
+                if job:
+                    heapq.heappop(self._queue)
+            if job:
+                job[2]()
+            else:
+                time.sleep(0.0005)
+
+
+class FakeButton:
+    def __init__(self, root):
+        self.root = root
+
+    def config(self, **kw):
+        self.root.calls += 1
+
+
+def legacy_highlight(root, buttons, sequence):
+    """Cópia do highlight_step antigo: repinta as 64 células a cada passo."""
+    def highlight(step):
+        def update():
+            for inst in INSTRUMENTS:
+                for col in range(NUM_STEPS):
+                    if col == step:
+                        buttons[inst][col].config(bg="red")
+                    else:
+                        buttons[inst][col].config(bg="green" if sequence[inst][col] else "white")
+        root.after(0, update)
+    return highlight
+
+
+def run(bpm, seconds, make_highlight):
+    root = FakeRoot()
+    buttons = {inst: [FakeButton(root) for _ in range(NUM_STEPS)] for inst in INSTRUMENTS}
+    sequence = {inst: [col % 2 for col in range(NUM_STEPS)] for inst in INSTRUMENTS}
+    highlight = make_highlight(root, buttons, sequence)
+    step_duration = 60 / bpm / 4
+    end = time.perf_counter() + seconds
+
+    def sequencer():
+        n = 0
+        start = time.perf_counter()
+        while time.perf_counter() < end:
+            highlight(n % NUM_STEPS)
+            n += 1
+            time.sleep(max(0.0, start + n * step_duration - time.perf_counter()))
+
+    t = threading.Thread(target=sequencer)
+    t.start()
+    root.pump_until(end)
+    t.join()
+    return root.calls / seconds
+
+
+def renderer_highlight(root, buttons, sequence):
+    playhead = PlayheadRenderer(root, buttons, lambda inst, col: sequence[inst][col])
+    return playhead.request
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bpm", type=int, action="append")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    for bpm in args.bpm or [120, 200, 2000]:
+        old = run(bpm, args.seconds, legacy_highlight)
+        new = run(bpm, args.seconds, renderer_highlight)
+        print(f"{bpm:5d} BPM: grade inteira {old:8.0f} chamadas Tk/s  "
+              f"PlayheadRenderer {new:7.0f} chamadas Tk/s  ({old / max(new, 1):.1f}x menos)")
+
+
+if __name__ == "__main__":
+    main()
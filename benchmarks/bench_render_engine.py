@@ -0,0 +1,64 @@
+# benchmarks/bench_render_engine.py
+"""Compassos renderizados por segundo pelo GrooveRenderer (sem áudio).
+
+    python benchmarks/bench_render_engine.py --bpm 120 --bars 4 --seconds 2
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_engine import GrooveRenderer, load_wav  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOICES = {
+    "kick": os.path.join("Kick", "FL 909 Kick.wav"),
+    "snare": os.path.join("Snare", "FL 909 Snare.wav"),
+    "hat": os.path.join("Hat", "FL 909 CH 1.wav"),
+    "tom": os.path.join("Tom", "FL 909 Tom.wav"),
+}
+CLICK = os.path.join("Percussion", "Attack Blip 03.wav")
+SEQUENCE = {
+    "kick":  [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+    "snare": [0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0],
+    "hat":   [1, 0, 1, 0, 1, 0, 1, 0, 1, 0, 1, 0, 1, 0, 1, 0],
+    "tom":   [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bpm", type=int, default=120)
+    parser.add_argument("--bars", type=int, default=1, help="compassos por renderização")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    samples_dir = os.path.join(ROOT, "samples")
+    voices = {inst: load_wav(os.path.join(samples_dir, rel)) for inst, rel in VOICES.items()}
+    click = load_wav(os.path.join(samples_dir, CLICK))
+    renderer = GrooveRenderer(bars=args.bars)
+
+    renders = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        renderer.render(SEQUENCE, voices, args.bpm, click, metronome=True)
+        renders += 1
+    full = renders * args.bars / (time.perf_counter() - start)
+
+    toggles = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        renderer.toggle_step("snare", toggles % 16, not renderer.sequence["snare"][toggles % 16])
+        toggles += 1
+    incr = toggles / (time.perf_counter() - start)
+
+    realtime = 60 / args.bpm * 4
+    print(f"{args.bpm} BPM, {args.bars} compasso(s) por render ({realtime:.2f} s de áudio por compasso)")
+    print(f"render completo: {full:9.1f} compassos/s ({full * realtime:.0f}x tempo real)")
+    print(f"toggle incremental: {incr:9.1f} edições/s")
+
+
+if __name__ == "__main__":
+    main()
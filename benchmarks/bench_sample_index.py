@@ -0,0 +1,98 @@
+# benchmarks/bench_sample_index.py
+"""Índice de samples (sample_analysis) numa biblioteca grande: análise, atualização e consulta.
+
+Monta numa pasta temporária uma árvore com `--copies` cópias de cada sample
+de samples/ (links simbólicos, mtimes distintos) e mede: análise completa
+serial vs pool de processos, atualização sem mudanças, atualização com
+poucos arquivos alterados e a latência de `nearest_samples`.
+
+    python benchmarks/bench_sample_index.py --copies 40
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db_backend import GrooveStore  # noqa: E402
+from instruments import build_catalog  # noqa: E402
+from sample_analysis import update_index  # noqa: E402
+
+SAMPLES = os.path.join(ROOT, "samples")
+
+
+def make_tree(dst, copies):
+    for cat in sorted(os.listdir(SAMPLES)):
+        src_dir = os.path.join(SAMPLES, cat)
+        if not os.path.isdir(src_dir):
+            continue
+        os.makedirs(os.path.join(dst, cat))
+        for name in sorted(os.listdir(src_dir)):
+            stem, ext = os.path.splitext(name)
+            for k in range(copies):
+                os.symlink(os.path.join(src_dir, name), os.path.join(dst, cat, f"{stem} {k:03d}{ext}"))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=40, help="cópias de cada sample na árvore")
+    parser.add_argument("--workers", type=int, help="processos do pool (padrão: núcleos da CPU)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--skip-serial", action="store_true", help="não mede a análise serial")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, "samples")
+        make_tree(tree, args.copies)
+        catalog, _cache = build_catalog(tree)
+        files = catalog.files
+        print(f"{len(files)} arquivos em {len(catalog.tracks())} pastas")
+
+        if not args.skip_serial:
+            serial = GrooveStore(os.path.join(tmp, "serial.db"))
+            (_n, _r, _f), ms = timed(lambda: update_index(serial, tree, files, workers=1))
+            print(f"  análise serial:        {ms:8.0f} ms ({ms / len(files):.2f} ms/arquivo)")
+            serial.close()
+
+        store = GrooveStore(os.path.join(tmp, "index.db"))
+        (_n, _r, _f), ms = timed(lambda: update_index(store, tree, files, workers=args.workers))
+        print(f"  análise com pool:      {ms:8.0f} ms ({len(files) / ms * 1000:.0f} arquivos/s)")
+        _, ms = timed(lambda: update_index(store, tree, files))
+        print(f"  atualização sem mudança: {ms:6.1f} ms")
+
+        rng = random.Random(0)
+        changed = rng.sample(sorted(files), 10)
+        for key in changed:
+            files[key] = {**files[key], "mtime": files[key]["mtime"] + 1}
+        (n, _r, _f), ms = timed(lambda: update_index(store, tree, files))
+        print(f"  {n} alterados:          {ms:8.1f} ms")
+
+        keys = [tuple(k.split("/", 1)) for k in sorted(files)]
+        lat = []
+        for category, name in rng.choices(keys, k=args.queries):
+            _, ms = timed(lambda: store.nearest_samples(category, name, 8))
+            lat.append(ms)
+        lat_all = []
+        for category, name in rng.choices(keys, k=args.queries // 5):
+            _, ms = timed(lambda: store.nearest_samples(category, name, 8, same_category=False))
+            lat_all.append(ms)
+        print(f"  mais parecidos (mesma pasta): p50 {np.percentile(lat, 50):.2f} ms, p99 {np.percentile(lat, 99):.2f} ms")
+        print(f"  mais parecidos (biblioteca):  p50 {np.percentile(lat_all, 50):.2f} ms, "
+              f"p99 {np.percentile(lat_all, 99):.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_sample_startup.py
+"""Tempo de startup dos samples: decodificação antecipada vs SampleBank lazy.
+
+Usa o driver de áudio "dummy" do SDL, então roda sem placa de som.
+
+    python benchmarks/bench_sample_startup.py
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from sample_bank import SampleBank, decode_pcm16  # noqa: E402
+from sample_pack import SamplePack, build_pack  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = os.path.join(ROOT, "samples")
+
+
+def pick_decoder():
+    try:
+        import pygame
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        freq, size, channels = pygame.mixer.get_init()
+
+        def sizeof(sound):
+            return int(sound.get_length() * freq * channels * abs(size) // 8)
+        return "pygame", pygame.mixer.Sound, sizeof
+    except Exception:
+        return "soundfile", decode_pcm16, lambda a: a.nbytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first", type=int, default=5, help="samples usados antes da primeira nota")
+    args = parser.parse_args(argv)
+
+    label, decoder, sizeof = pick_decoder()
+
+    start = time.perf_counter()
+    eager = {}
+    total = 0
+    for cat in sorted(os.listdir(SAMPLES)):
+        for name in sorted(os.listdir(os.path.join(SAMPLES, cat))):
+            obj = decoder(os.path.join(SAMPLES, cat, name))
+            eager[(cat, name)] = obj
+            total += sizeof(obj)
+    eager_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    bank = SampleBank(SAMPLES, decoder=decoder, sizeof=sizeof)
+    index_ms = (time.perf_counter() - start) * 1000
+    first = [(r.category, r.name) for cat in bank.categories() for r in bank.files(cat)[:1]][:args.first]
+    for key in first:
+        bank.get(*key)
+    lazy_ms = (time.perf_counter() - start) * 1000
+
+    pack_dir = os.path.join(ROOT, "cache", "sample_pack")
+    if SamplePack.open(pack_dir) is None:
+        build_pack(SAMPLES, pack_dir)
+    start = time.perf_counter()
+    pack = SamplePack.open(pack_dir)
+    stale = pack.stale_entries(SAMPLES)
+    views = [pack.get(*key.split("/", 1)) for key in pack.entries]
+    touched = sum(int(v[-1, 0]) for v in views)  # toca a última página de cada sample
+    pack_ms = (time.perf_counter() - start) * 1000
+
+    print(f"decoder: {label}, {len(eager)} arquivos")
+    print(f"antecipado: {eager_ms:8.1f} ms  {total / 1e6:7.2f} MB decodificados")
+    print(f"SampleBank: índice {index_ms:6.1f} ms, +{len(first)} samples {lazy_ms:8.1f} ms  "
+          f"{bank.cache_bytes / 1e6:7.2f} MB em cache")
+    print(f"SamplePack: {len(views)} views memmap + validação {pack_ms:8.1f} ms  "
+          f"({len(stale)} desatualizados, checksum {touched})")
+
+
+if __name__ == "__main__":
+    main()
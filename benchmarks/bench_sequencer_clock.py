@@ -0,0 +1,128 @@
+# benchmarks/bench_sequencer_clock.py
+"""Erro de onset dos passos do sequenciador, sem janela nem áudio.
+
+Compara o laço antigo (`time.sleep(beat_duration)` após o trabalho do passo)
+com o StepClock de deadlines absolutos. O trabalho por passo é simulado com
+um spin de `--work-ms` milissegundos.
+
+Depois roda o `DrumMachine.loop` de verdade (Tk falso e sounddevice nulo de
+headless.py, numa pasta temporária) com o preset de rock: cada hit é
+agendado antes do passo vencer, num frame do mixer, e o erro de onset é a
+distância entre esse frame e o frame em que o mixer de fato começou o hit
+(zero quando a antecedência bastou; positivo quando chegou tarde).
+
+    python benchmarks/bench_sequencer_clock.py --bars 8 --bpm 200
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from sequencer_clock import StepClock  # noqa: E402
+
+NUM_STEPS = 16
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run_sleep_loop(bars, bpm, work):
+    """Reproduz o laço original: erro medido contra a grade ideal."""
+    beat_duration = 60 / bpm / 4
+    errors = []
+    start = time.perf_counter()
+    n = 0
+    for _ in range(bars):
+        for _step in range(NUM_STEPS):
+            errors.append(time.perf_counter() - (start + n * beat_duration))
+            _busy(work)
+            time.sleep(beat_duration)
+            n += 1
+    return errors, 0
+
+
+def run_step_clock(bars, bpm, work):
+    clock = StepClock()
+    clock.start(60 / bpm / 4)
+    stop = threading.Event()
+    errors = []
+    while clock.next_step < bars * NUM_STEPS:
+        tick = clock.wait_next(stop)
+        errors.append(tick.lateness)
+        _busy(work)
+    return errors, clock.late_steps
+
+
+def run_drum_loop(bars, bpm, work):
+    """O loop real do app; erro = frame em que o mixer começou cada hit - frame agendado."""
+    import headless
+    from run_suite import make_workdir, new_app, play_steps
+    headless.install()
+    import audio_engine
+    voices = []
+
+    class RecordedVoice(audio_engine.Voice):
+        __slots__ = ("requested",)
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.requested = self.start
+            voices.append(self)
+
+    audio_engine.Voice = RecordedVoice
+    workdir = make_workdir()
+    try:
+        os.chdir(workdir)
+        dm, root, app = new_app()
+        app.bpm.set(bpm)
+        late_before = dm.engine.late
+        play_steps(app, root, bars * NUM_STEPS, timeout=bars * NUM_STEPS * 15 / bpm + 5)
+        sr = dm.engine.samplerate
+        errors = [(v.start - v.requested) / sr for v in voices if v.requested is not None]
+        late = dm.engine.late - late_before
+        dm.engine.close()
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return errors, late
+
+
+def summarize(errors):
+    ms = sorted(abs(e) * 1000 for e in errors)
+    mean = sum(ms) / len(ms)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return mean, p99, ms[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=8)
+    parser.add_argument("--bpm", type=int, default=200)
+    parser.add_argument("--work-ms", type=float, default=1.0)
+    parser.add_argument("--no-loop", action="store_true", help="não roda o DrumMachine.loop headless")
+    args = parser.parse_args(argv)
+
+    work = args.work_ms / 1000
+    print(f"{args.bars} compassos a {args.bpm} BPM, trabalho por passo {args.work_ms} ms")
+    runners = [("time.sleep", run_sleep_loop), ("StepClock", run_step_clock)]
+    if not args.no_loop:
+        logging.disable(logging.CRITICAL)
+        runners.append(("loop", run_drum_loop))
+    for label, runner in runners:
+        errors, late = runner(args.bars, args.bpm, work)
+        mean, p99, worst = summarize(errors)
+        print(f"{label:>10}: média {mean:7.3f} ms  p99 {p99:7.3f} ms  pior {worst:7.3f} ms  atrasados {late}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_sparse_pattern.py
+"""Custo de um padrão longo e esparso vs a grade de 16 passos.
+
+Compara, por volta do padrão: passos que o loop visita (acordadas da
+thread de áudio), tempo de compile_pattern na UI, tempo de steps_to_next
+no loop e tamanho do blob do groove_codec.
+
+    python benchmarks/bench_sparse_pattern.py --length 256 --hits 24
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import groove_codec  # noqa: E402
+from pattern_events import Pattern  # noqa: E402
+from pattern_snapshot import compile_pattern, steps_to_next  # noqa: E402
+
+TRACKS = [f"track{i}" for i in range(16)]
+ROCK = {"track0": [1, 0, 0, 0] * 4, "track1": [0, 0, 0, 0, 1, 0, 0, 0] * 2, "track2": [1, 0] * 8}
+
+
+def random_pattern(length, hits, rng):
+    pattern = Pattern(TRACKS, length)
+    while len(pattern) < hits:
+        pattern.set(rng.choice(TRACKS), rng.randrange(length), rng.randint(40, 127), rng.choice((50, 100)))
+    return pattern
+
+
+def visited(snapshot):
+    """Passos visitados numa volta do padrão, como o loop do DrumMachine faz."""
+    pos, count = 0, 0
+    while pos < snapshot.length:
+        pos += steps_to_next(snapshot, pos)
+        if pos < snapshot.length:
+            count += 1
+            pos += 1
+    return count
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def report(label, pattern, voices, repeat):
+    snap = compile_pattern(pattern, voices, 120)
+    groove = pattern.to_groove()
+    blob = groove_codec.encode(groove["sequence"], None, groove.get("velocity"),
+                               groove.get("probability"), groove["length"])
+    compile_us = per_call_us(lambda: compile_pattern(pattern, voices, 120), repeat)
+    next_us = per_call_us(lambda: steps_to_next(snap, 5), repeat * 10)
+    wakeups = visited(snap)
+    print(f"{label:28s} {pattern.length:5d} passos {len(pattern):4d} hits | "
+          f"{wakeups:4d} acordadas/volta ({wakeups / pattern.bars:5.2f}/compasso) | "
+          f"compile {compile_us:7.1f} us | steps_to_next {next_us:5.2f} us | blob {len(blob):5d} B")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--length", type=int, default=256)
+    parser.add_argument("--hits", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    voices = {name: np.zeros((64, 2), dtype=np.float32) for name in TRACKS}
+    rng = random.Random(3)
+    report("grade 16 passos (rock)", Pattern.from_groove({"sequence": ROCK}, TRACKS), voices, args.repeat)
+    report("longo e esparso", random_pattern(args.length, args.hits, rng), voices, args.repeat)
+    report("longo e denso", random_pattern(args.length, args.length * 4, rng), voices, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_startup_imports.py
+"""Custo de importar o drum_machine, medido com `python -X importtime`.
+
+Roda o import num processo novo (importar não abre janela nem dispositivo
+de áudio, então vale sem display nem PortAudio) e mostra os imports diretos
+mais caros, com tudo o que cada um puxa. Com `--baseline`, compara com um JSON
+salvo antes por `--out` e sai com código 1 se o total piorar além de
+`--max-regression` por cento.
+
+    python benchmarks/bench_startup_imports.py --out startup.json
+    python benchmarks/bench_startup_imports.py --baseline startup.json --max-regression 15
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+CHILD = ("import sys, time; sys.path.insert(0, {root!r}); t = time.perf_counter(); import {module}; "
+         "print('wall_us', int((time.perf_counter() - t) * 1e6), file=sys.stderr)")
+
+# não deviam estar no caminho até a janela aparecer
+HEAVY = ("sounddevice", "requests", "pygame", "multiprocessing", "scipy", "librosa", "soundfile")
+
+
+def parse_importtime(stderr):
+    """[(módulo, self_us, cumulativo_us, profundidade)] e o tempo de parede do import."""
+    rows, wall = [], None
+    for line in stderr.splitlines():
+        if line.startswith("wall_us "):
+            wall = int(line.split()[1])
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows, wall
+
+
+def measure(module, cwd):
+    code = CHILD.format(root=ROOT, module=module)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"import de {module} falhou:\n{out.stderr[-2000:]}")
+    return parse_importtime(out.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="drum_machine")
+    parser.add_argument("--runs", type=int, default=5, help="processos medidos (usa a mediana)")
+    parser.add_argument("--top", type=int, default=15, help="módulos mostrados")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="piora máxima do total em relação ao baseline (%%)")
+    args = parser.parse_args(argv)
+
+    # a primeira execução pode gerar caches (catálogo, .pyc); fica fora da mediana
+    measure(args.module, ROOT)
+    runs = [measure(args.module, ROOT) for _ in range(args.runs)]
+    wall_ms = statistics.median(wall for _rows, wall in runs) / 1000
+    cumulative, own, seen = {}, [], set()
+    for rows, _wall in runs:
+        for name, _self_us, cum, depth in rows:
+            seen.add(name.split(".")[0])
+            if name == args.module:
+                own.append(cum / 1000)
+            elif depth == 1:
+                # imports diretos do módulo: o cumulativo já inclui o que eles puxam
+                cumulative.setdefault(name, []).append(cum / 1000)
+    modules = {name: statistics.median(v) for name, v in cumulative.items()}
+    own = statistics.median(own) if own else None
+    top = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+
+    print(f"import {args.module}: {wall_ms:.1f} ms (mediana de {args.runs}; importtime {own or 0:.1f} ms)")
+    for name, ms in top:
+        print(f"  {ms:8.1f} ms  {name}")
+    heavy = [name for name in HEAVY if name in seen]
+    if heavy:
+        print("  no caminho do import:", ", ".join(heavy))
+
+    result = {"module": args.module, "runs": args.runs, "wall_ms": wall_ms, "importtime_ms": own,
+              "top": [{"module": n, "cumulative_ms": ms} for n, ms in top], "heavy": heavy}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"resultados em {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            before = json.load(f)
+        change = (wall_ms - before["wall_ms"]) / before["wall_ms"] * 100
+        print(f"baseline {before['wall_ms']:.1f} ms -> {wall_ms:.1f} ms ({change:+.1f}%)")
+        new_heavy = sorted(set(heavy) - set(before.get("heavy", ())))
+        if new_heavy:
+            print("  módulos pesados novos no import:", ", ".join(new_heavy))
+        if change > args.max_regression or new_heavy:
+            print(f"REGRESSÃO: limite de {args.max_regression:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
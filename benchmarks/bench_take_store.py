@@ -0,0 +1,103 @@
+# benchmarks/bench_take_store.py
+"""Custo do TakeStore: memória e disco por take, overdub, desfazer e compactação.
+
+Grava um take de `--seconds` e `--overdubs` camadas (numa pasta temporária,
+pelo mesmo caminho do callback do StreamRecorder) e compara com o looper
+antigo: float32 em RAM e um WAV novo por gravação.
+
+    python benchmarks/bench_take_store.py --seconds 120 --overdubs 12
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from take_store import TakeStore, to_pcm16, add_pcm16  # noqa: E402
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def record(take, frames, channels, rate, blocksize, rng):
+    """Uma volta gravada em blocos, como o callback do StreamRecorder faz."""
+    overdub = not take.empty
+    layer = take.begin_layer(frames, channels, rate)
+    for pos in range(0, take.frames, blocksize):
+        n = min(blocksize, take.frames - pos)
+        block = to_pcm16(rng.uniform(-0.05, 0.05, (n, take.channels)).astype(np.float32))
+        if overdub:
+            add_pcm16(layer[pos:pos + n], block)
+            add_pcm16(take.data[pos:pos + n], block)
+        else:
+            layer[pos:pos + n] = block
+            take.data[pos:pos + n] = block
+    take.commit_layer()
+
+
+def dir_bytes(path):
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--overdubs", type=int, default=12)
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--blocksize", type=int, default=1024)
+    parser.add_argument("--max-undo", type=int, default=8)
+    args = parser.parse_args(argv)
+    frames = args.seconds * args.rate
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TakeStore(tmp, 1, max_undo=args.max_undo)
+        take = store.take(0)
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        record(take, frames, args.channels, args.rate, args.blocksize, rng)
+        first = time.perf_counter() - start
+        commits = []
+        for _ in range(args.overdubs):
+            start = time.perf_counter()
+            record(take, frames, args.channels, args.rate, args.blocksize, rng)
+            commits.append(time.perf_counter() - start)
+        rss_after = rss_bytes()
+        on_disk = dir_bytes(take.directory)
+        start = time.perf_counter()
+        take.undo()
+        undo = time.perf_counter() - start
+        start = time.perf_counter()
+        files, freed = store.compact()
+        compact = time.perf_counter() - start
+        after = dir_bytes(take.directory)
+        take.data = None
+
+    old_ram = frames * args.channels * 4
+    old_disk = (args.overdubs + 1) * frames * args.channels * 2
+    print(f"take de {args.seconds}s a {args.rate} Hz, {args.channels} canal(is), {args.overdubs} overdubs "
+          f"(desfazer até {args.max_undo})")
+    print(f"  gravar a volta: take {first * 1000:.0f} ms, overdub mediana {np.median(commits) * 1000:.0f} ms "
+          f"({args.seconds / np.median(commits):.0f}x tempo real)")
+    print(f"  desfazer: {undo * 1000:.0f} ms; compactação: {files} arquivos, {freed / 1e6:.1f} MB "
+          f"em {compact * 1000:.1f} ms")
+    print(f"  disco: {on_disk / 1e6:.1f} MB -> {after / 1e6:.1f} MB compactado "
+          f"(looper antigo: {old_disk / 1e6:.1f} MB em WAVs que só crescem)")
+    if rss_before and rss_after:
+        print(f"  RSS: +{(rss_after - rss_before) / 1e6:.1f} MB (páginas do memmap, devolvíveis ao SO) "
+              f"vs {old_ram / 1e6:.1f} MB float32 fixos em RAM")
+
+
+if __name__ == "__main__":
+    main()
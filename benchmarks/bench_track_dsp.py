@@ -0,0 +1,137 @@
+# benchmarks/bench_track_dsp.py
+"""Custo da cadeia por track (track_dsp) no callback do AudioEngine, contra o orçamento do bloco.
+
+Simula o sequenciador com `--tracks` tracks tocando em todas as
+semicolcheias a `--bpm` (pior caso: todo passo com todas as tracks), agenda
+os hits com `at=`/`bus=` como o loop faz e chama `engine.mix` bloco a bloco,
+sem e com a cadeia (ganho, pan e passa-baixa diferentes por track, limitador
+no master). Também mede só o `TrackBuses.mix_into` com todas as tracks
+ativas e confere o filtro vetorizado contra a recursão amostra a amostra.
+Sai com código 1 se o p99 do bloco com a cadeia passar de `--budget` % do
+tempo do bloco.
+
+    python benchmarks/bench_track_dsp.py --tracks 16 --tracks 24 --bpm 200
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_engine import AudioEngine  # noqa: E402
+from track_dsp import TrackBuses, TrackChain, one_pole, one_pole_coeff  # noqa: E402
+
+SR = 44100
+SCHEDULE_AHEAD_BLOCKS = 2
+CUTOFFS = (None, 12000, 5000, 2000, 800, 300)
+
+
+def make_hits(tracks, seconds=0.25):
+    """Um "sample" por track: ruído com decaimento exponencial, mono."""
+    rng = np.random.default_rng(0)
+    n = int(seconds * SR)
+    env = np.exp(-np.arange(n) / (0.05 * SR)).astype(np.float32)
+    return [(rng.uniform(-0.3, 0.3, n).astype(np.float32) * env)[:, None] for _ in range(tracks)]
+
+
+def make_chains(tracks):
+    return [TrackChain(-(t % 7), ((t % 9) - 4) / 4, CUTOFFS[t % len(CUTOFFS)]) for t in range(tracks)]
+
+
+def run_mix(tracks, bpm, blocksize, seconds, chains):
+    engine = AudioEngine(samplerate=SR, blocksize=blocksize, max_voices=tracks * 8)
+    if chains is not None:
+        engine.set_buses(TrackBuses(chains, SR, engine.channels, blocksize))
+    hits = make_hits(tracks)
+    step_len = 60.0 / bpm / 4 * SR
+    out = np.empty((blocksize, 2), dtype=np.float32)
+    blocks = int(seconds * SR / blocksize)
+    step = 0
+    times = []
+    for b in range(blocks):
+        horizon = (b + SCHEDULE_AHEAD_BLOCKS) * blocksize
+        while step * step_len < horizon:
+            at = int(round(step * step_len))
+            for t, pcm in enumerate(hits):
+                engine.play(pcm, gain=0.8, at=at, bus=t)
+            step += 1
+        t0 = time.perf_counter()
+        engine.mix(out)
+        times.append(time.perf_counter() - t0)
+    # o primeiro segundo aquece caches e enche o mixer
+    times = np.array(times[int(SR / blocksize):]) * 1000
+    return times, engine
+
+
+def bench_buses(tracks, blocksize, repeat):
+    """Só a cadeia: todas as tracks ativas, com o filtro soando."""
+    buses = TrackBuses(make_chains(tracks), SR, 2, blocksize)
+    rng = np.random.default_rng(1)
+    noise = rng.uniform(-0.1, 0.1, (tracks, blocksize, 2)).astype(np.float32)
+    out = np.zeros((blocksize, 2), dtype=np.float32)
+    times = []
+    for _ in range(repeat):
+        view = buses.begin(blocksize)
+        view += noise
+        buses.active[:] = True
+        t0 = time.perf_counter()
+        buses.mix_into(out)
+        times.append(time.perf_counter() - t0)
+    return np.array(times) * 1000
+
+
+def check_filter(frames=4096, blocksize=256):
+    """Erro máximo do one_pole em blocos contra a recursão direta."""
+    rng = np.random.default_rng(2)
+    x = rng.uniform(-1, 1, (len(CUTOFFS) - 1, frames, 2)).astype(np.float32)
+    a = np.array([one_pole_coeff(c, SR) for c in CUTOFFS[1:]])
+    ref = np.empty(x.shape, dtype=np.float64)
+    y = np.zeros((len(a), 2))
+    for n in range(frames):
+        y = y + a[:, None] * (x[:, n] - y)
+        ref[:, n] = y
+    state = np.zeros((len(a), 2))
+    got = x.copy()
+    for start in range(0, frames, blocksize):
+        got[:, start:start + blocksize] = one_pole(got[:, start:start + blocksize].copy(), a, state)
+    return float(np.abs(got - ref).max())
+
+
+def summary(times):
+    return f"média {times.mean():.3f} ms  p99 {np.percentile(times, 99):.3f} ms  máx {times.max():.3f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, action="append")
+    parser.add_argument("--bpm", type=float, default=200)
+    parser.add_argument("--blocksize", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--budget", type=float, default=33.0, help="p99 máximo do bloco com a cadeia (%% do bloco)")
+    args = parser.parse_args(argv)
+
+    block_ms = args.blocksize / SR * 1000
+    print(f"filtro em blocos vs recursão: erro máximo {check_filter(blocksize=args.blocksize):.2e}")
+    print(f"bloco de {args.blocksize} frames = {block_ms:.2f} ms a {SR} Hz, {args.bpm:.0f} BPM, "
+          f"todas as tracks em todo passo")
+    failed = False
+    for tracks in args.tracks or [16, 24]:
+        plain, _ = run_mix(tracks, args.bpm, args.blocksize, args.seconds, None)
+        chained, engine = run_mix(tracks, args.bpm, args.blocksize, args.seconds, make_chains(tracks))
+        dsp = bench_buses(tracks, args.blocksize, 2000)
+        p99 = np.percentile(chained, 99)
+        print(f"  {tracks:3d} tracks ({engine.stats()['voices']} vozes):")
+        print(f"      sem cadeia: {summary(plain)}")
+        print(f"      com cadeia: {summary(chained)}  (carga p99 {p99 / block_ms:.1%})")
+        print(f"      só a cadeia: {summary(dsp)}  ({dsp.mean() * 1000 / tracks:.1f} µs por track)")
+        if p99 > block_ms * args.budget / 100:
+            print(f"      ACIMA DO ORÇAMENTO: p99 {p99:.3f} ms > {args.budget:.0f}% de {block_ms:.2f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# benchmarks/headless.py
+"""Ambiente sem display nem placa de som para rodar o DrumMachine de verdade.
+
+`install()` troca o `sounddevice` por um backend nulo (um OutputStream que
+chama o callback numa thread no ritmo do relógio, como a placa faria) e os
+widgets do tkinter por objetos que só guardam a configuração. O `after` do
+root falso é enfileirado e executado por `FakeRoot.pump()` na thread
+principal, como o main loop do Tk. Tem de ser chamado antes de importar
+drum_machine.
+"""
+import os
+import sys
+import time
+import types
+import threading
+from collections import deque
+
+import numpy as np
+
+
+# ---------------- sounddevice nulo ---------------- #
+class _Status:
+    output_underflow = False
+    input_overflow = False
+
+    def __bool__(self):
+        return False
+
+
+class NullOutputStream:
+    """Consome a saída do mixer bloco a bloco, descartando o áudio."""
+
+    def __init__(self, samplerate=44100, channels=2, dtype="float32", blocksize=256, latency=None,
+                 device=None, callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize or 256
+        self.callback = callback
+        self.latency = 2 * self.blocksize / samplerate
+        self.active = False
+        self._thread = None
+
+    def start(self):
+        self.active = True
+        self._thread = threading.Thread(target=self._run, name="null-output", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        buf = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        deadline = time.perf_counter()
+        status = _Status()
+        while self.active:
+            self.callback(buf, self.blocksize, None, status)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def close(self):
+        self.stop()
+
+
+class NullInputStream(NullOutputStream):
+    """Entrega silêncio ao callback de gravação até ele pedir para parar."""
+
+    def __init__(self, samplerate=44100, channels=1, dtype="float32", blocksize=1024, device=None,
+                 callback=None, finished_callback=None, **kwargs):
+        super().__init__(samplerate, channels, dtype, blocksize, None, device, callback)
+        self.finished_callback = finished_callback
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        try:
+            while self.active:
+                self.callback(block, self.blocksize, None, _Status())
+                time.sleep(period)
+        except null_sounddevice.CallbackStop:
+            pass
+        self.active = False
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+
+null_sounddevice = types.ModuleType("sounddevice")
+null_sounddevice.CallbackStop = type("CallbackStop", (Exception,), {})
+null_sounddevice.OutputStream = NullOutputStream
+null_sounddevice.InputStream = NullInputStream
+# a "placa" nula roda na taxa de DRUM_NULL_SAMPLERATE (padrão 44100)
+null_sounddevice.query_devices = lambda device=None, kind=None: {
+    "name": "null", "default_samplerate": float(os.environ.get("DRUM_NULL_SAMPLERATE", "44100"))}
+
+
+# ---------------- Tk falso ---------------- #
+class FakeVar:
+    default = ""
+
+    def __init__(self, master=None, value=None, name=None):
+        self._value = self.default if value is None else value
+        self._traces = []
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+        for callback in self._traces:
+            callback("", "", "write")
+
+    def trace_add(self, mode, callback):
+        self._traces.append(callback)
+        return str(len(self._traces))
+
+
+class FakeIntVar(FakeVar):
+    default = 0
+
+
+class FakeDoubleVar(FakeVar):
+    default = 0.0
+
+
+class FakeBooleanVar(FakeVar):
+    default = False
+
+
+class FakeWidget:
+    """Aceita qualquer chamada de widget; `config` só atualiza um dict."""
+
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = dict(options)
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key, "")
+
+    def get(self, *args):
+        return self.options.get("value", "")
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def __getitem__(self, key):
+        return self.options.get(key)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+class FakeRoot(FakeWidget):
+    """Root cujo `after` pode ser chamado de qualquer thread; `pump` roda o que venceu."""
+
+    def __init__(self):
+        super().__init__()
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    def after(self, ms, func=None, *args):
+        if func is not None:
+            with self._lock:
+                self._queue.append((time.perf_counter() + ms / 1000, func, args))
+        return "after#0"
+
+    def pump(self):
+        now = time.perf_counter()
+        with self._lock:
+            due = [item for item in self._queue if item[0] <= now]
+            for item in due:
+                self._queue.remove(item)
+        for _when, func, args in due:
+            func(*args)
+        return len(due)
+
+
+def _install_tk():
+    import tkinter
+    from tkinter import ttk
+    tkinter.StringVar = FakeVar
+    tkinter.IntVar = FakeIntVar
+    tkinter.DoubleVar = FakeDoubleVar
+    tkinter.BooleanVar = FakeBooleanVar
+    for name in ("Button", "Label", "Spinbox", "Listbox", "Canvas", "Frame", "Toplevel", "Text", "Scrollbar"):
+        setattr(tkinter, name, FakeWidget)
+    tkinter.Tk = FakeRoot
+    for name in dir(ttk):
+        if name[0].isupper() and isinstance(getattr(ttk, name), type):
+            setattr(ttk, name, FakeWidget)
+
+
+def install(null_audio=True, fake_tk=True):
+    """Prepara o processo; chamar antes de importar drum_machine."""
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    if null_audio:
+        sys.modules["sounddevice"] = null_sounddevice
+    if fake_tk:
+        _install_tk()
@@ -0,0 +1,321 @@
+# benchmarks/run_suite.py
+"""Suíte headless: timing do sequenciador, banco de grooves, cold start e memória dos samples.
+
+Roda o DrumMachine de verdade com o Tk falso e o sounddevice nulo de
+headless.py, numa pasta temporária com uma cópia do cache/ (o grooves.db,
+o cache/ e o loops/ do projeto não são tocados). Os resultados vão para JSON; `--compare` mostra a variação
+em relação a uma execução anterior.
+
+    python benchmarks/run_suite.py --out bench.json
+    python benchmarks/run_suite.py --bpm 90 --bpm 400 --bars 4 --out novo.json --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+_T_PROCESS = time.perf_counter()
+
+import numpy as np  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+import headless  # noqa: E402
+from bench_groove_store import make_groove, rate  # noqa: E402
+
+DEFAULT_BPMS = (60, 120, 180, 300)
+NUM_STEPS = 16
+
+
+def rss_bytes():
+    """RSS atual do processo (Linux), ou None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "max": float(values.max())}
+
+
+def make_workdir():
+    """Pasta temporária com os samples/ do projeto (link, só leitura) e uma cópia do cache/.
+
+    O app regrava o cache (catálogo, pack de samples), então ele é copiado
+    e não linkado: o cache/ do projeto nunca é alterado pelos benchmarks.
+    """
+    workdir = tempfile.mkdtemp(prefix="drum_bench_")
+    samples = os.path.join(ROOT, "samples")
+    if os.path.isdir(samples):
+        try:
+            os.symlink(samples, os.path.join(workdir, "samples"))
+        except OSError:
+            shutil.copytree(samples, os.path.join(workdir, "samples"))
+    cache = os.path.join(ROOT, "cache")
+    if os.path.isdir(cache):
+        shutil.copytree(cache, os.path.join(workdir, "cache"))
+    return workdir
+
+
+def wait_event(event, root, timeout=60):
+    """Espera um evento de uma thread do app, rodando a fila do root enquanto isso."""
+    end = time.perf_counter() + timeout
+    while not event.is_set() and time.perf_counter() < end:
+        root.pump()
+        time.sleep(0.002)
+
+
+def wait_audio(app, root, timeout=60):
+    """Saída e samples sobem numa thread; depois o índice de samples (pool de processos) é atualizado.
+
+    As medições só começam com os dois prontos, para o pool não disputar CPU com o loop.
+    """
+    wait_event(app.audio_ready, root, timeout)
+    wait_event(app.samples_indexed, root, timeout)
+
+
+def new_app(wait=True):
+    """DrumMachine sobre um FakeRoot, com o preset de rock carregado."""
+    import drum_machine
+    root = headless.FakeRoot()
+    app = drum_machine.DrumMachine(root)
+    if wait:
+        wait_audio(app, root)
+    app.apply_groove({"sequence": drum_machine.PRESETS["Rock Basico"]})
+    return drum_machine, root, app
+
+
+def play_steps(app, root, steps, timeout):
+    """Toca até o transporte passar de `steps` passos (ou estourar `timeout`).
+
+    O loop só registra os passos que visita (com hits ou início de compasso),
+    então o critério de parada vem do relógio, não do monitor.
+    """
+    app.perf.clear()
+    app.perf.enabled = True
+    app.start_loop()
+    end = time.perf_counter() + timeout
+    while (app.clock is None or app.clock.next_step < steps) and time.perf_counter() < end:
+        root.pump()
+        time.sleep(0.002)
+    app.stop()
+    app.thread.join(timeout=2)
+    root.pump()
+    app.perf.enabled = False
+
+
+# ---------------- sequenciador ---------------- #
+def bench_step_timing(bpms, bars):
+    """Atraso dos passos do loop real em vários andamentos."""
+    dm, root, app = new_app()
+    results = {}
+    for bpm in bpms:
+        app.bpm.set(bpm)
+        steps = bars * NUM_STEPS
+        underruns, late_voices = dm.engine.underruns, dm.engine.late
+        play_steps(app, root, steps, timeout=steps * 15 / bpm + 5)
+        step = app.perf.buffers["step"].snapshot()
+        tk = app.perf.buffers["tk"].snapshot()
+        results[str(bpm)] = {
+            "steps": int(len(step)),
+            "lateness_ms": percentiles(step[:, 2]),
+            "work_ms": percentiles(step[:, 3]),
+            "late_steps": int(step[-1, 5]) if len(step) else 0,
+            "dropped_steps": int(step[-1, 6]) if len(step) else 0,
+            "tk_lag_ms": percentiles(tk[:, 1]),
+            "underruns": dm.engine.underruns - underruns,
+            "late_voices": dm.engine.late - late_voices,
+        }
+        print(f"  {bpm:4d} BPM: atraso p99 {results[str(bpm)]['lateness_ms']['p99']:6.3f} ms, "
+              f"{results[str(bpm)]['late_steps']} atrasados, {results[str(bpm)]['underruns']} underruns")
+    dm.engine.close()
+    return results
+
+
+# ---------------- banco de grooves ---------------- #
+def bench_storage(count):
+    """Grooves por segundo em save/load/save_many num banco temporário."""
+    from db_backend import GrooveStore
+    rng = random.Random(1)
+    grooves = [make_groove(i, rng) for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GrooveStore(os.path.join(tmp, "bench.db"))
+        ids = []
+        save = rate(count, lambda: ids.extend(store.save(*g) for g in grooves))
+        load = rate(count, lambda: [store.load_by_id(gid) for gid in ids])
+        batch = rate(count, lambda: store.save_many(grooves))
+        store.close()
+    results = {"count": count, "save_per_s": save, "load_per_s": load, "save_many_per_s": batch}
+    print(f"  {save:9.0f} saves/s  {load:9.0f} loads/s  {batch:9.0f} save_many/s")
+    return results
+
+
+# ---------------- cold start + memória (processo novo) ---------------- #
+def child_cold_start():
+    """Roda num processo novo: import, construção, áudio pronto e primeiro passo; depois a memória dos samples."""
+    headless.install()
+    logging.disable(logging.CRITICAL)
+    rss_start = rss_bytes()
+    t0 = time.perf_counter()
+    import drum_machine
+    t_import = time.perf_counter()
+    dm, root, app = new_app(wait=False)
+    t_app = time.perf_counter()
+    wait_event(app.audio_ready, root)
+    t_ready = time.perf_counter()
+    # o primeiro passo não espera o índice de samples, como na UI
+    play_steps(app, root, 1, timeout=10)
+    t_first = time.perf_counter()
+    wait_event(app.samples_indexed, root)
+    t_indexed = time.perf_counter()
+
+    import tracemalloc
+    bank = dm.sample_bank
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    loaded = 0
+    for inst in dm.TRACKS:
+        for timbre in dm.catalog.timbres(inst):
+            if bank.get(timbre.category, timbre.name) is not None:
+                loaded += 1
+    traced, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+    dm.engine.close()
+    print(json.dumps({
+        "cold_start": {
+            "interpreter_to_import_ms": (t0 - _T_PROCESS) * 1000,
+            "import_ms": (t_import - t0) * 1000,
+            "construct_ms": (t_app - t_import) * 1000,
+            "audio_ready_ms": (t_ready - t_app) * 1000,
+            "first_step_ms": (t_first - t_ready) * 1000,
+            "samples_indexed_ms": (t_indexed - t_ready) * 1000,
+            "total_ms": (t_first - _T_PROCESS) * 1000,
+        },
+        "sample_bank": {
+            "samples": loaded,
+            "cache_bytes": bank.cache_bytes,
+            "traced_bytes": traced,
+            "rss_delta_bytes": rss_after - rss_before if rss_before and rss_after else None,
+            "rss_bytes": rss_after,
+            "rss_at_start_bytes": rss_start,
+        },
+    }))
+
+
+def bench_cold_start(workdir, runs):
+    """Mediana de `runs` processos novos; o wall time inclui subir o interpretador."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=workdir,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"processo de cold start falhou:\n{out.stderr}")
+        wall = (time.perf_counter() - start) * 1000
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result["cold_start"]["wall_ms"] = wall
+        samples.append(result)
+    cold = {key: float(np.median([s["cold_start"][key] for s in samples])) for key in samples[0]["cold_start"]}
+    cold["runs"] = runs
+    bank = samples[-1]["sample_bank"]
+    print(f"  janela em {cold['import_ms'] + cold['construct_ms']:.0f} ms, áudio pronto "
+          f"+{cold['audio_ready_ms']:.0f} ms, primeiro passo em {cold['total_ms']:.0f} ms "
+          f"(import {cold['import_ms']:.0f} ms, processo {cold['wall_ms']:.0f} ms)")
+    print(f"  {bank['samples']} samples: {bank['cache_bytes'] / 1e6:.2f} MB em cache, "
+          f"{(bank['rss_delta_bytes'] or 0) / 1e6:.2f} MB de RSS")
+    return cold, bank
+
+
+# ---------------- comparação ---------------- #
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new):
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    print(f"comparação com {old['meta'].get('commit') or old['meta'].get('timestamp')}:")
+    for key in sorted(new_flat.keys() & old_flat.keys()):
+        before, after = old_flat[key], new_flat[key]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {key:45s} {before:12.3f} -> {after:12.3f}  ({change:+6.1f}%)")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bpm", type=int, action="append", help="andamentos do teste de timing (repetível)")
+    parser.add_argument("--bars", type=int, default=2, help="compassos tocados por andamento")
+    parser.add_argument("--grooves", type=int, default=2000, help="grooves no teste do banco")
+    parser.add_argument("--cold-runs", type=int, default=3, help="processos novos no teste de cold start")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child_cold_start()
+        return
+
+    workdir = make_workdir()
+    try:
+        print("cold start / memória dos samples:")
+        cold, bank = bench_cold_start(workdir, args.cold_runs)
+        print("banco de grooves:")
+        storage = bench_storage(args.grooves)
+        print("timing do sequenciador:")
+        os.chdir(workdir)
+        headless.install()
+        logging.disable(logging.CRITICAL)
+        timing = bench_step_timing(args.bpm or DEFAULT_BPMS, args.bars)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "bars": args.bars},
+        "results": {"step_timing": timing, "storage": storage, "cold_start": cold, "sample_bank": bank},
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"resultados em {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
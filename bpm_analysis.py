@@ -0,0 +1,232 @@
+# bpm_analysis.py
+"""Detecção de BPM e grade de batidas da música importada, num processo separado.
+
+A análise roda em duas fases: uma estimativa rápida sobre o começo do
+arquivo (mono, reamostrado para ~11 kHz) e o refinamento sobre o arquivo
+inteiro, lido em blocos. O resultado final fica em cache no SQLite, indexado
+pelo SHA-1 do arquivo, então reimportar a mesma música é instantâneo.
+"""
+import time
+import queue
+import logging
+import multiprocessing
+
+import numpy as np
+
+ANALYSIS_SR = 11025
+PREFIX_SECONDS = 30
+HOP = 128
+N_FFT = 512
+BPM_MIN = 60
+BPM_MAX = 200
+BPM_PRIOR = 120       # centro do prior log-normal (como o librosa)
+
+
+# ---------------- decodificação ---------------- #
+def read_mono(path, target_sr=ANALYSIS_SR, seconds=None, progress=None, block_seconds=10):
+    """Lê `path` em blocos e devolve (mono float32 decimado, taxa efetiva).
+
+    A decimação é por média de `fator` amostras (fator inteiro), barata e
+    suficiente para o envelope de ataques; nada é reamostrado na taxa cheia.
+    """
+    import soundfile as sf
+    with sf.SoundFile(path) as f:
+        factor = max(1, f.samplerate // target_sr)
+        total = f.frames if f.frames > 0 else None
+        limit = int(seconds * f.samplerate) if seconds else total
+        block = factor * int(block_seconds * f.samplerate // factor)
+        parts, done = [], 0
+        while limit is None or done < limit:
+            n = block if limit is None else min(block, limit - done)
+            data = f.read(n, dtype="float32", always_2d=True)
+            if len(data) == 0:
+                break
+            done += len(data)
+            mono = data.mean(axis=1)
+            usable = len(mono) - len(mono) % factor
+            parts.append(mono[:usable].reshape(-1, factor).mean(axis=1))
+            if progress and limit:
+                progress(done / limit)
+        sr = f.samplerate / factor
+    y = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return y.astype(np.float32, copy=False), sr
+
+
+# ---------------- análise ---------------- #
+def onset_envelope(y, hop=HOP, n_fft=N_FFT, chunk=4096):
+    """Fluxo espectral (log-magnitude, só aumentos) por frame de `hop` amostras."""
+    if len(y) < n_fft:
+        return np.zeros(0, dtype=np.float32)
+    n_frames = 1 + (len(y) - n_fft) // hop
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(n_frames, n_fft), strides=(y.strides[0] * hop, y.strides[0]), writeable=False)
+    window = np.hanning(n_fft).astype(np.float32)
+    env = np.zeros(n_frames, dtype=np.float32)
+    prev = None
+    for start in range(0, n_frames, chunk):
+        mag = np.log1p(100 * np.abs(np.fft.rfft(frames[start:start + chunk] * window, axis=1)))
+        if prev is not None:
+            mag = np.vstack([prev, mag])
+        flux = np.maximum(np.diff(mag, axis=0), 0).sum(axis=1)
+        offset = start if prev is not None else start + 1
+        env[offset:offset + len(flux)] = flux
+        prev = mag[-1:]
+    env -= env.mean()
+    np.maximum(env, 0, out=env)
+    return env
+
+
+def estimate_tempo(env, rate, bpm_min=BPM_MIN, bpm_max=BPM_MAX):
+    """BPM pelo pico da autocorrelação do envelope, com prior em torno de BPM_PRIOR."""
+    if len(env) < 4:
+        return 0.0
+    n = 1 << int(np.ceil(np.log2(2 * len(env))))
+    spec = np.fft.rfft(env, n)
+    ac = np.fft.irfft(spec * np.conj(spec), n)[:len(env)]
+    lag_min = max(1, int(60.0 * rate / bpm_max))
+    lag_max = min(len(ac) - 2, int(np.ceil(60.0 * rate / bpm_min)))
+    if lag_max <= lag_min:
+        return 0.0
+    lags = np.arange(lag_min, lag_max + 1)
+    bpms = 60.0 * rate / lags
+    prior = np.exp(-0.5 * np.log2(bpms / BPM_PRIOR) ** 2)
+    score = ac[lags] * prior
+    i = int(np.argmax(score))
+    lag = float(lags[i])
+    if 0 < i < len(score) - 1:
+        # interpolação parabólica: precisão abaixo de um frame
+        a, b, c = score[i - 1], score[i], score[i + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            lag += 0.5 * (a - c) / denom
+    return 60.0 * rate / lag
+
+
+def beat_grid(env, rate, tempo):
+    """Instantes (s) das batidas: grade fixa em `tempo` com a fase de maior energia."""
+    if tempo <= 0 or len(env) == 0:
+        return np.zeros(0, dtype=np.float32)
+    period = 60.0 * rate / tempo
+    best_phase, best_score = 0.0, -1.0
+    for phase in np.arange(0, period, 1.0):
+        idx = np.round(np.arange(phase, len(env), period)).astype(int)
+        idx = idx[idx < len(env)]
+        score = env[idx].sum()
+        if score > best_score:
+            best_phase, best_score = phase, score
+    return (np.arange(best_phase, len(env), period) / rate).astype(np.float32)
+
+
+def analyze_signal(y, sr):
+    """(bpm, batidas em segundos) de um sinal mono já decimado."""
+    try:
+        import librosa
+    except ImportError:
+        librosa = None
+    if librosa is not None:
+        tempo, frames = librosa.beat.beat_track(y=y, sr=sr, hop_length=HOP)
+        beats = librosa.frames_to_time(frames, sr=sr, hop_length=HOP).astype(np.float32)
+        return float(np.atleast_1d(tempo)[0]), beats
+    rate = sr / HOP
+    env = onset_envelope(y)
+    tempo = estimate_tempo(env, rate)
+    # o frame i cobre [i*HOP, i*HOP + N_FFT): o ataque aparece no fluxo perto do
+    # centro da janela, um hop depois do frame com que é comparado
+    return tempo, beat_grid(env, rate, tempo) + np.float32((N_FFT / 2 + HOP) / sr)
+
+
+# ---------------- processo de análise ---------------- #
+def analyze_file(path, db_file, out, prefix_seconds=PREFIX_SECONDS):
+    """Corpo do processo: mensagens (tipo, payload) em `out`.
+
+    ("progress", (fase, fração)), ("estimate", resultado), ("result", resultado)
+    ou ("error", texto). `resultado` é um dict com sha1, bpm, beats, duration
+    e cached.
+    """
+    try:
+        from sample_pack import file_sha1
+        from db_backend import GrooveStore
+        out.put(("progress", ("hash", 0.0)))
+        sha1 = file_sha1(path)
+        store = GrooveStore(db_file)
+        cached = store.load_analysis(sha1)
+        if cached is not None:
+            out.put(("result", dict(cached, cached=True)))
+            return
+
+        out.put(("progress", ("estimativa", 0.0)))
+        y, sr = read_mono(path, seconds=prefix_seconds)
+        bpm, beats = analyze_signal(y, sr)
+        out.put(("estimate", {"sha1": sha1, "bpm": bpm, "beats": beats,
+                              "duration": len(y) / sr, "cached": False}))
+
+        y, sr = read_mono(path, progress=lambda frac: out.put(("progress", ("análise", frac))))
+        bpm, beats = analyze_signal(y, sr)
+        result = {"sha1": sha1, "bpm": bpm, "beats": beats, "duration": len(y) / sr, "cached": False}
+        store.save_analysis(sha1, path, bpm, beats, result["duration"])
+        store.close()
+        out.put(("result", result))
+    except Exception as e:
+        logging.exception("Erro analisando %s: %s", path, e)
+        out.put(("error", str(e)))
+
+
+class BpmAnalysis:
+    """Análise de uma música num processo (spawn), consultada pela UI via `poll`.
+
+    `poll()` não bloqueia: repassa as mensagens pendentes aos callbacks na
+    thread que o chama (a do Tk, via `after`) e devolve False quando acabou.
+    """
+
+    def __init__(self, path, db_file, on_progress=None, on_estimate=None, on_result=None, on_error=None):
+        self.path = path
+        self.db_file = db_file
+        self.on_progress = on_progress
+        self.on_estimate = on_estimate
+        self.on_result = on_result
+        self.on_error = on_error
+        self.finished = False
+        self.started_at = None
+        ctx = multiprocessing.get_context("spawn")
+        self._queue = ctx.Queue()
+        self._process = ctx.Process(target=analyze_file, args=(path, db_file, self._queue),
+                                    name="bpm-analysis", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._process.start()
+        return self
+
+    def poll(self):
+        while not self.finished:
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                if not self._process.is_alive() and self._queue.empty():
+                    self._finish(self.on_error, "processo de análise terminou sem resultado")
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*payload)
+            elif kind == "estimate":
+                if self.on_estimate:
+                    self.on_estimate(payload)
+            elif kind == "result":
+                logging.info("BPM de %s: %.1f (%s, %.1fs)", self.path, payload["bpm"],
+                             "cache" if payload["cached"] else "analisado",
+                             time.perf_counter() - self.started_at)
+                self._finish(self.on_result, payload)
+            elif kind == "error":
+                self._finish(self.on_error, payload)
+        return not self.finished
+
+    def _finish(self, callback, payload):
+        self.finished = True
+        self._process.join(timeout=1)
+        if callback:
+            callback(payload)
+
+    def cancel(self):
+        if not self.finished:
+            self.finished = True
+            self._process.terminate()
@@ -1,84 +1,572 @@
-import sqlite3
+import re
 import json
+import time
+import sqlite3
 import logging
+import threading
+
+import numpy as np
+
+import groove_codec
 
 DB_FILE = "grooves.db"
 
-# Configuração do logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("app_debug.log", encoding="utf-8"),  # salva em arquivo
-        logging.StreamHandler()  # também mostra no console
-    ]
+# versão do esquema em PRAGMA user_version
+# 1: coluna `pattern` com o groove binário (groove_codec); `data` JSON é esvaziado
+#    só depois da migração gravada e do blob conferido contra ele
+# 2: índices por nome/bpm, assinatura para similaridade e busca FTS5 por nome
+SCHEMA_VERSION = 2
+PAGE_SIZE = 50
+
+# SQL fixo: o sqlite3 guarda o statement compilado no cache da conexão
+SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS grooves (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        bpm INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        pattern BLOB,
+        signature INTEGER
+    )
+"""
+SQL_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_grooves_name ON grooves(name COLLATE NOCASE, id)",
+    "CREATE INDEX IF NOT EXISTS idx_grooves_bpm ON grooves(bpm)",
+)
+# índice FTS externo ao conteúdo: só guarda os tokens, os triggers mantêm em dia
+SQL_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS grooves_fts USING fts5(name, content='grooves', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS grooves_fts_ai AFTER INSERT ON grooves BEGIN
+        INSERT INTO grooves_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS grooves_fts_ad AFTER DELETE ON grooves BEGIN
+        INSERT INTO grooves_fts(grooves_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS grooves_fts_au AFTER UPDATE OF name ON grooves BEGIN
+        INSERT INTO grooves_fts(grooves_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO grooves_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
 )
+# análise de músicas importadas (bpm_analysis), indexada pelo SHA-1 do arquivo
+SQL_CREATE_ANALYSIS = """
+    CREATE TABLE IF NOT EXISTS music_analysis (
+        sha1 TEXT PRIMARY KEY,
+        path TEXT,
+        bpm REAL NOT NULL,
+        beats BLOB NOT NULL,
+        duration REAL,
+        analyzed_at REAL DEFAULT (strftime('%s', 'now'))
+    )
+"""
+# características dos samples (sample_analysis), atualizadas por mtime/tamanho;
+# oitava = log2(centroide) e dur_log = log2(duração) deixam a distância em aritmética pura
+SQL_CREATE_SAMPLES = """
+    CREATE TABLE IF NOT EXISTS sample_features (
+        category TEXT NOT NULL,
+        name TEXT NOT NULL,
+        mtime REAL NOT NULL,
+        size INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        duration REAL NOT NULL,
+        peak_db REAL NOT NULL,
+        rms_db REAL NOT NULL,
+        onset_ms REAL NOT NULL,
+        centroid REAL NOT NULL,
+        octave REAL NOT NULL,
+        dur_log REAL NOT NULL,
+        thumb BLOB,
+        PRIMARY KEY (category, name)
+    )
+"""
+# último estado do sequenciador (autosave.py): uma linha só, regravada a cada lote de edições;
+# clean = 0 enquanto a sessão está aberta, 1 depois de um fechamento normal
+SQL_CREATE_AUTOSAVE = """
+    CREATE TABLE IF NOT EXISTS autosave (
+        slot INTEGER PRIMARY KEY CHECK (slot = 1),
+        bpm INTEGER NOT NULL,
+        pattern BLOB NOT NULL,
+        edits INTEGER NOT NULL,
+        saved_at REAL NOT NULL,
+        clean INTEGER NOT NULL DEFAULT 0
+    )
+"""
+# IDs dos timbres do catálogo (instruments.py) por conteúdo: é a eles que os grooves salvos
+# se referem, então sobrevivem à perda do cache/instruments.json; linhas nunca são apagadas
+# (um sample removido e devolvido recupera o ID, e o ID não é reaproveitado por outro)
+SQL_CREATE_TIMBRES = """
+    CREATE TABLE IF NOT EXISTS timbre_ids (
+        track TEXT NOT NULL,
+        sha1 TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        PRIMARY KEY (track, sha1)
+    )
+"""
+SQL_SAMPLES_INDEX = "CREATE INDEX IF NOT EXISTS idx_sample_features_octave ON sample_features(category, octave)"
+SQL_INSERT = "INSERT INTO grooves (name, bpm, data, pattern, signature) VALUES (?,?,'',?,?)"
+SQL_LIST = "SELECT id, name, bpm FROM grooves"
+SQL_BY_ID = "SELECT data, bpm, pattern FROM grooves WHERE id = ?"
+SQL_DELETE = "DELETE FROM grooves WHERE id = ?"
+SQL_JSON_ROWS = "SELECT id, data FROM grooves WHERE pattern IS NULL"
+SQL_SET_PATTERN = "UPDATE grooves SET pattern = ? WHERE id = ?"
+SQL_MIGRATED_JSON = "SELECT id, data, pattern FROM grooves WHERE data != '' AND pattern IS NOT NULL"
+SQL_CLEAR_JSON = "UPDATE grooves SET data = '' WHERE id = ?"
+SQL_DROP_PATTERN = "UPDATE grooves SET pattern = NULL, signature = NULL WHERE id = ?"
+SQL_SET_SIGNATURE = "UPDATE grooves SET signature = ? WHERE id = ?"
+SQL_ANALYSIS_BY_SHA1 = "SELECT bpm, beats, duration FROM music_analysis WHERE sha1 = ?"
+SQL_SAVE_ANALYSIS = "INSERT OR REPLACE INTO music_analysis (sha1, path, bpm, beats, duration) VALUES (?,?,?,?,?)"
+SAMPLE_COLUMNS = ("category", "name", "mtime", "size", "version", "duration", "peak_db", "rms_db", "onset_ms",
+                  "centroid", "octave", "dur_log", "thumb")
+SQL_SAMPLE_STAMPS = "SELECT category, name, mtime, size, version FROM sample_features"
+SQL_SAVE_SAMPLE = (f"INSERT OR REPLACE INTO sample_features ({', '.join(SAMPLE_COLUMNS)}) "
+                   f"VALUES ({', '.join('?' * len(SAMPLE_COLUMNS))})")
+SQL_SAMPLE_BY_KEY = f"SELECT {', '.join(SAMPLE_COLUMNS)} FROM sample_features WHERE category = ? AND name = ?"
+SQL_ALL_SAMPLES = f"SELECT {', '.join(SAMPLE_COLUMNS)} FROM sample_features"
+SQL_DELETE_SAMPLE = "DELETE FROM sample_features WHERE category = ? AND name = ?"
+SQL_SAVE_AUTOSAVE = "INSERT OR REPLACE INTO autosave (slot, bpm, pattern, edits, saved_at, clean) VALUES (1,?,?,?,?,0)"
+SQL_LOAD_AUTOSAVE = "SELECT bpm, pattern, edits, saved_at, clean FROM autosave WHERE slot = 1"
+SQL_TIMBRE_IDS = "SELECT track, sha1, id FROM timbre_ids"
+SQL_SAVE_TIMBRE_ID = "INSERT OR REPLACE INTO timbre_ids (track, sha1, id, name) VALUES (?,?,?,?)"
+SQL_AUTOSAVE_CLEAN = "UPDATE autosave SET clean = 1 WHERE slot = 1"
+SQL_AUTOSAVE_DIRTY = "UPDATE autosave SET clean = 0 WHERE slot = 1"
+# pesos: meia oitava de brilho ~ 6 dB de RMS ~ o dobro da duração ~ 5 ms de ataque
+SQL_NEAREST_SAMPLES = """
+    SELECT category, name,
+           ((octave - ?) / 0.5) * ((octave - ?) / 0.5) + ((rms_db - ?) / 6.0) * ((rms_db - ?) / 6.0)
+           + (dur_log - ?) * (dur_log - ?) + ((onset_ms - ?) / 5.0) * ((onset_ms - ?) / 5.0) AS dist
+    FROM sample_features
+    WHERE NOT (category = ? AND name = ?)
+"""
+
+
+def fts_query(text):
+    """Texto digitado -> consulta FTS5 por prefixo ("roc bas" -> "roc"* "bas"*)."""
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", text or ""))
+
+
+def like_pattern(text):
+    """Texto digitado -> padrão LIKE de substring, com %, _ e \\ tratados como literais."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _matches_json(groove, raw):
+    """Confere passo a passo um groove decodificado contra o dict JSON de onde ele veio.
+
+    Lê o JSON cru, sem passar por `normalize`, para que um erro no caminho
+    JSON -> blob não se confirme sozinho.
+    """
+    sequence = raw["sequence"]
+    if list(groove["sequence"]) != list(sequence):
+        return False
+    n_steps = int(raw.get("length") or max((len(steps) for steps in sequence.values()), default=0))
+    timbres = raw.get("timbres") or {}
+    for name, steps in sequence.items():
+        expected = ([1 if s else 0 for s in steps] + [0] * n_steps)[:n_steps]
+        if groove["sequence"][name] != expected:
+            return False
+        idx = groove_codec.timbre_index(timbres.get(name))
+        if idx is not None and not 0 <= idx < groove_codec.NO_TIMBRE:
+            idx = None
+        if groove["timbres"][name] != idx:
+            return False
+    for key in ("velocity", "probability"):
+        values = raw.get(key) or {}
+        if bool(values) != (key in groove):
+            return False
+        for name in sequence if values else ():
+            vals = [min(max(groove_codec.step_value(v), 0), 255) for v in values.get(name) or []]
+            if groove[key][name] != (vals + [0] * n_steps)[:n_steps]:
+                return False
+    return True
+
+
+def decode_row(data, pattern):
+    """Groove canônico de uma linha: blob binário ou, em linhas antigas, JSON."""
+    if pattern is not None:
+        return groove_codec.decode(pattern)
+    return groove_codec.from_json(data)
+
+
+class GrooveStore:
+    """Persistência de grooves com uma conexão longa por thread (WAL).
+
+    Cada thread reaproveita sua própria conexão em vez de abrir/fechar o
+    arquivo a cada chamada; `save_many`/`delete_many` gravam tudo numa
+    única transação.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._connections = []
+        self._initialized = False
+        self.has_fts = False
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, cached_statements=128)
+            conn.create_function("hamming", 2, groove_codec.hamming, deterministic=True)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def init_db(self):
+        """Cria a tabela de grooves se não existir (uma vez por processo)."""
+        if self._initialized:
+            return
+        # as outras threads esperam aqui até as tabelas existirem; se a criação
+        # ou a migração falhar, a flag continua False e a próxima chamada tenta de novo
+        with self._init_lock:
+            if self._initialized:
+                return
+            logging.debug("Inicializando banco de dados...")
+            conn = self.connection()
+            with conn:
+                conn.execute(SQL_CREATE)
+                conn.execute(SQL_CREATE_ANALYSIS)
+                conn.execute(SQL_CREATE_SAMPLES)
+                conn.execute(SQL_SAMPLES_INDEX)
+                conn.execute(SQL_CREATE_AUTOSAVE)
+                conn.execute(SQL_CREATE_TIMBRES)
+                self._migrate(conn)
+            self._drop_migrated_json(conn)
+            self._initialized = True
+        logging.info("Banco de dados inicializado com sucesso.")
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        self.has_fts = self._create_fts(conn, rebuild=version < 2)
+        if version >= SCHEMA_VERSION:
+            return
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(grooves)")}
+        if "pattern" not in columns:
+            conn.execute("ALTER TABLE grooves ADD COLUMN pattern BLOB")
+        if "signature" not in columns:
+            conn.execute("ALTER TABLE grooves ADD COLUMN signature INTEGER")
+        for sql in SQL_INDEXES:
+            conn.execute(sql)
+        migrated = 0
+        for groove_id, data in conn.execute(SQL_JSON_ROWS).fetchall():
+            try:
+                groove = groove_codec.from_json(data)
+            except (ValueError, groove_codec.GrooveFormatError) as e:
+                # linha ilegível fica em JSON; load_by_id continua tentando
+                logging.warning("Groove ID=%s não migrado: %s", groove_id, e)
+                continue
+            blob = groove_codec.encode(groove["sequence"], groove["timbres"], groove.get("velocity"),
+                                       groove.get("probability"), groove.get("length"))
+            conn.execute(SQL_SET_PATTERN, (blob, groove_id))
+            migrated += 1
+        rows = conn.execute("SELECT id, pattern FROM grooves WHERE signature IS NULL AND pattern IS NOT NULL")
+        conn.executemany(SQL_SET_SIGNATURE, [
+            (groove_codec.signature(groove_codec.decode(blob)["sequence"]), groove_id)
+            for groove_id, blob in rows.fetchall()])
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logging.info("Esquema do banco migrado para v%d (%d grooves convertidos para binário)",
+                     SCHEMA_VERSION, migrated)
+
+    def _drop_migrated_json(self, conn):
+        """Esvazia o JSON das linhas cujo blob, decodificado, confere com o JSON original.
+
+        Roda depois do commit da migração, numa transação própria: se algo
+        falhar no meio, o JSON original continua na linha. Blob que não confere
+        é descartado e a linha volta a ser lida do JSON (decode_row).
+        """
+        verified, mismatched = [], []
+        for groove_id, data, blob in conn.execute(SQL_MIGRATED_JSON).fetchall():
+            try:
+                ok = _matches_json(groove_codec.decode(blob), json.loads(data))
+            except (ValueError, AttributeError, TypeError) as e:
+                ok = False
+                logging.debug("Groove ID=%s: conferência do blob falhou: %s", groove_id, e)
+            if ok:
+                verified.append((groove_id,))
+            else:
+                mismatched.append((groove_id,))
+                logging.warning("Groove ID=%s: blob diferente do JSON; o JSON original foi mantido", groove_id)
+        if not (verified or mismatched):
+            return
+        try:
+            with conn:
+                conn.executemany(SQL_CLEAR_JSON, verified)
+                conn.executemany(SQL_DROP_PATTERN, mismatched)
+            logging.info("JSON antigo descartado de %d grooves conferidos", len(verified))
+        except sqlite3.Error as e:
+            logging.warning("Não foi possível descartar o JSON migrado: %s", e)
+
+    def _create_fts(self, conn, rebuild):
+        """Cria a busca FTS5; sem FTS5 compilado no SQLite, a busca cai para LIKE."""
+        try:
+            for sql in SQL_FTS:
+                conn.execute(sql)
+            if rebuild:
+                conn.execute("INSERT INTO grooves_fts(grooves_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            logging.warning("FTS5 indisponível, busca por nome usará LIKE: %s", e)
+            return False
+
+    def save(self, name, bpm, sequence, timbres, velocity=None, probability=None):
+        return self.save_many([(name, bpm, sequence, timbres, velocity, probability)])[0]
+
+    def save_many(self, grooves):
+        """Grava [(name, bpm, sequence, timbres[, velocity[, probability]])] numa transação; devolve os IDs."""
+        self.init_db()
+        conn = self.connection()
+        ids = []
+        with conn:
+            for name, bpm, sequence, timbres, *rest in grooves:
+                blob = groove_codec.encode(sequence, timbres, *rest[:2])
+                cur = conn.execute(SQL_INSERT, (name, bpm, blob, groove_codec.signature(sequence)))
+                ids.append(cur.lastrowid)
+        return ids
+
+    def load_all(self):
+        self.init_db()
+        return self.connection().execute(SQL_LIST).fetchall()
+
+    def page(self, text=None, bpm_min=None, bpm_max=None, after=None, limit=PAGE_SIZE):
+        """Uma página de (id, name, bpm) ordenada por nome, com cursor por chave.
+
+        `after` é o cursor devolvido pela página anterior ((nome, id) da última
+        linha); devolve (linhas, próximo cursor ou None no fim).
+        """
+        self.init_db()
+        where, params = [], []
+        source = "grooves g"
+        query = fts_query(text)
+        if query and self.has_fts:
+            source = "grooves_fts f JOIN grooves g ON g.id = f.rowid"
+            where.append("grooves_fts MATCH ?")
+            params.append(query)
+        elif text:
+            where.append("g.name LIKE ? ESCAPE '\\'")
+            params.append(like_pattern(text))
+        if bpm_min is not None:
+            where.append("g.bpm >= ?")
+            params.append(bpm_min)
+        if bpm_max is not None:
+            where.append("g.bpm <= ?")
+            params.append(bpm_max)
+        if after is not None:
+            where.append("(g.name COLLATE NOCASE, g.id) > (?, ?)")
+            params.extend(after)
+        sql = f"SELECT g.id, g.name, g.bpm FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY g.name COLLATE NOCASE, g.id LIMIT ?"
+        params.append(limit)
+        rows = self.connection().execute(sql, params).fetchall()
+        cursor = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+        return rows, cursor
+
+    def similar(self, sequence, limit=PAGE_SIZE, bpm_min=None, bpm_max=None):
+        """Grooves mais parecidos com `sequence` (distância de Hamming das assinaturas)."""
+        self.init_db()
+        sql = "SELECT id, name, bpm, hamming(signature, ?) AS dist FROM grooves"
+        params = [groove_codec.signature(sequence)]
+        where = []
+        if bpm_min is not None:
+            where.append("bpm >= ?")
+            params.append(bpm_min)
+        if bpm_max is not None:
+            where.append("bpm <= ?")
+            params.append(bpm_max)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY dist, id LIMIT ?"
+        params.append(limit)
+        return self.connection().execute(sql, params).fetchall()
+
+    def load_by_id(self, groove_id):
+        self.init_db()
+        row = self.connection().execute(SQL_BY_ID, (groove_id,)).fetchone()
+        if row:
+            return decode_row(row[0], row[2]), row[1]
+        return None, None
+
+    def delete(self, groove_id):
+        self.delete_many([groove_id])
+
+    def delete_many(self, groove_ids):
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_DELETE, [(gid,) for gid in groove_ids])
+
+    def load_analysis(self, sha1):
+        """Análise de BPM em cache para o arquivo com este SHA-1, ou None."""
+        self.init_db()
+        row = self.connection().execute(SQL_ANALYSIS_BY_SHA1, (sha1,)).fetchone()
+        if row is None:
+            return None
+        # batidas em segundos, float32 little-endian
+        return {"sha1": sha1, "bpm": row[0], "beats": np.frombuffer(row[1], dtype="<f4"), "duration": row[2]}
+
+    def save_analysis(self, sha1, path, bpm, beats, duration):
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_SAVE_ANALYSIS,
+                         (sha1, path, float(bpm), np.asarray(beats, dtype="<f4").tobytes(), duration))
+
+    def sample_stamps(self):
+        """{(categoria, nome): (mtime, tamanho, versão da análise)} de todos os samples analisados."""
+        self.init_db()
+        return {(c, n): (m, s, v) for c, n, m, s, v in self.connection().execute(SQL_SAMPLE_STAMPS)}
+
+    def save_sample_features(self, rows):
+        """Grava [dict com SAMPLE_COLUMNS] numa transação."""
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_SAVE_SAMPLE, [tuple(row[c] for c in SAMPLE_COLUMNS) for row in rows])
+
+    def delete_sample_features(self, keys):
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_DELETE_SAMPLE, list(keys))
+
+    def load_sample_features(self, category, name):
+        """Características de um sample (dict com SAMPLE_COLUMNS), ou None se ainda não analisado."""
+        self.init_db()
+        row = self.connection().execute(SQL_SAMPLE_BY_KEY, (category, name)).fetchone()
+        return dict(zip(SAMPLE_COLUMNS, row)) if row else None
+
+    def load_all_sample_features(self):
+        """{(categoria, nome): dict com SAMPLE_COLUMNS} de todo o índice (para a UI consultar sem ir ao disco)."""
+        self.init_db()
+        rows = self.connection().execute(SQL_ALL_SAMPLES).fetchall()
+        return {(row[0], row[1]): dict(zip(SAMPLE_COLUMNS, row)) for row in rows}
+
+    def nearest_samples(self, category, name, limit=5, same_category=True):
+        """[(categoria, nome, distância)] dos samples mais parecidos com este, do mais próximo ao mais distante."""
+        ref = self.load_sample_features(category, name)
+        if ref is None:
+            return []
+        params = [ref["octave"]] * 2 + [ref["rms_db"]] * 2 + [ref["dur_log"]] * 2 + [ref["onset_ms"]] * 2
+        params += [category, name]
+        sql = SQL_NEAREST_SAMPLES
+        if same_category:
+            sql += " AND category = ?"
+            params.append(category)
+        sql += " ORDER BY dist, name LIMIT ?"
+        params.append(limit)
+        return self.connection().execute(sql, params).fetchall()
+
+    def load_timbre_ids(self):
+        """{track: {sha1: ID}} de todos os timbres já catalogados."""
+        self.init_db()
+        ids = {}
+        for track, sha1, timbre_id in self.connection().execute(SQL_TIMBRE_IDS):
+            ids.setdefault(track, {})[sha1] = timbre_id
+        return ids
+
+    def save_timbre_ids(self, rows):
+        """Grava [(track, sha1, ID, nome)] numa transação."""
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_SAVE_TIMBRE_ID, rows)
+
+    def save_autosave(self, bpm, pattern, edits):
+        """Substitui o estado da gravação automática (groove binário) numa transação."""
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_SAVE_AUTOSAVE, (int(bpm), pattern, edits, time.time()))
+
+    def load_autosave(self):
+        """Último estado gravado automaticamente ({bpm, pattern, edits, saved_at, clean}), ou None."""
+        self.init_db()
+        row = self.connection().execute(SQL_LOAD_AUTOSAVE).fetchone()
+        if row is None:
+            return None
+        return {"bpm": row[0], "pattern": row[1], "edits": row[2], "saved_at": row[3], "clean": bool(row[4])}
+
+    def mark_autosave_clean(self):
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_AUTOSAVE_CLEAN)
+
+    def mark_autosave_dirty(self):
+        """Sessão aberta: se ela cair antes de mark_autosave_clean, a próxima vê clean = 0."""
+        self.init_db()
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_AUTOSAVE_DIRTY)
+
+    def close(self):
+        """Fecha todas as conexões abertas por qualquer thread."""
+        with self._lock:
+            conns, self._connections = self._connections, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # conexão de outra thread: o sqlite3 não deixa fechar daqui
+                pass
+        self._local = threading.local()
+
+
+_store = GrooveStore(DB_FILE)
+
+
+def get_store():
+    """Store padrão compartilhado pelo app (arquivo DB_FILE)."""
+    return _store
+
 
 def init_db():
-    logging.debug("Inicializando banco de dados...")
     """Cria a tabela de grooves se não existir."""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS grooves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            bpm INTEGER NOT NULL,
-            data TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
-    logging.info("Banco de dados inicializado com sucesso.")
-
-def save_groove(name, bpm, sequence, timbres):
-    logging.debug(f"Salvando groove: name={name}, bpm={bpm}")
+    _store.init_db()
+
+def save_groove(name, bpm, sequence, timbres, velocity=None, probability=None):
+    # só metadados: o padrão em si não vai para o log
+    logging.debug("Salvando groove: name=%s, bpm=%s", name, bpm)
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        data = {"sequence": sequence, "timbres": timbres}
-        logging.debug(f"Dados JSON -> {data}")
-        c.execute("INSERT INTO grooves (name, bpm, data) VALUES (?,?,?)",
-                  (name, bpm, json.dumps(data)))
-        groove_id = c.lastrowid  # captura o ID do groove inserido
-        conn.commit()
-        conn.close()
-        logging.info(f"Groove salvo com sucesso! ID={groove_id}")
+        groove_id = _store.save(name, bpm, sequence, timbres, velocity, probability)
+        logging.info("Groove salvo com sucesso! ID=%s", groove_id)
         return groove_id   # retorna para o DrumMachine
-    except Exception as e:
-        print("Erro ao salvar groove:", e)
+    except Exception:
         logging.error("Erro ao salvar groove!", exc_info=True)
         return None
 
 
 def load_all_grooves():
     logging.debug("Carregando lista de grooves do banco...")
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, name, bpm FROM grooves")
-    rows = c.fetchall()
-    conn.close()
-    logging.info(f"Total de grooves carregados: {len(rows)}")
+    rows = _store.load_all()
+    logging.info("Total de grooves carregados: %d", len(rows))
     return rows
 
+def search_grooves(text=None, bpm_min=None, bpm_max=None, after=None, limit=PAGE_SIZE):
+    """Página de grooves filtrada por nome/BPM; veja GrooveStore.page."""
+    rows, cursor = _store.page(text, bpm_min, bpm_max, after, limit)
+    logging.debug("Busca de grooves text=%r bpm=%s-%s: %d linhas", text, bpm_min, bpm_max, len(rows))
+    return rows, cursor
+
+def similar_grooves(sequence, limit=PAGE_SIZE, bpm_min=None, bpm_max=None):
+    return _store.similar(sequence, limit, bpm_min, bpm_max)
+
 def load_groove_by_id(groove_id):
-    logging.debug(f"Carregando groove ID={groove_id}")
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT data, bpm FROM grooves WHERE id = ?", (groove_id,))
-    row = c.fetchone()
-    conn.close()
-    if row:
-        logging.info(f"Groove ID={groove_id} carregado com sucesso")
-        return json.loads(row[0]), row[1]
-    logging.warning(f"Groove ID={groove_id} não encontrado")
+    logging.debug("Carregando groove ID=%s", groove_id)
+    data, bpm = _store.load_by_id(groove_id)
+    if data is not None:
+        logging.info("Groove ID=%s carregado com sucesso", groove_id)
+        return data, bpm
+    logging.warning("Groove ID=%s não encontrado", groove_id)
     return None, None
 
 def delete_groove(groove_id):
-    logging.debug(f"Deletando groove ID={groove_id}")
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM grooves WHERE id = ?", (groove_id,))
-    conn.commit()
-    conn.close()
-    logging.info(f"Groove ID={groove_id} deletado com sucesso.")
+    logging.debug("Deletando groove ID=%s", groove_id)
+    _store.delete(groove_id)
+    logging.info("Groove ID=%s deletado com sucesso.", groove_id)
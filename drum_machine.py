@@ -1,28 +1,37 @@
 # drum_machine.py  (arquivo único)
 import os
-import json
 import time
+import random
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import pygame
-from db_backend import init_db, save_groove, load_all_grooves, load_groove_by_id, delete_groove, DB_FILE
+from db_backend import (init_db, save_groove, load_groove_by_id, delete_groove, search_grooves,
+                        similar_grooves, get_store, DB_FILE)
+from sequencer_clock import StepClock
+from render_engine import GrooveRenderer, load_wav
+from sample_pack import split_sample_path
+import groove_codec
+from playhead import PlayheadRenderer
+from pattern_snapshot import compile_pattern, steps_to_next, swing_delay, EMPTY as EMPTY_PATTERN
+from pattern_events import Pattern, STEPS_PER_BAR, MAX_VELOCITY, MAX_PROBABILITY
+from instruments import load_catalog, CLICK_SAMPLE
+from log_setup import setup_logging
+from audio_engine import AudioEngine, to_float
+from perf_monitor import PerfMonitor
+from take_store import TakeStore
+from track_dsp import TrackBuses, TrackChain
+from autosave import AutosaveWriter
 import sys
-import requests
 import logging
-import sounddevice as sd
-import soundfile as sf
-import numpy as np
-
-# Configuração do logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("app_debug.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+# carregados no primeiro uso (fora do caminho até a janela aparecer): looper, bpm_analysis,
+# groove_export, beat_sync e, na thread de bring_up_audio, sounddevice/sample_pack/sample_prep
+
+_T_START = time.perf_counter()
+
+# Configuração do logger (fila + thread de I/O; níveis via DRUM_LOG_*, ver log_setup.py).
+# Só no processo principal: o processo de análise de BPM reimporta este módulo.
+if __name__ == "__main__":
+    setup_logging()
 
 VERSION = "1.0.0"
 UPDATE_URL = "https://seusite.com/drum_machine_latest.exe"
@@ -33,23 +42,29 @@ def resource_path(relative_path):
     return os.path.join(os.path.abspath("."), relative_path)
 
 SAMPLES_PATH = resource_path("samples")
+# PCM já decodificado, lido por memmap; fica fora do _MEIPASS para sobreviver entre execuções
+SAMPLE_PACK_DIR = os.path.join(os.path.abspath("."), "cache", "sample_pack")
+# samples já na taxa da saída, aparados e normalizados (float32, um pacote por taxa)
+SAMPLE_VARIANTS_DIR = os.path.join(os.path.abspath("."), "cache", "sample_variants")
+# varredura de samples/ (tracks, timbres, mtimes e hashes) reaproveitada entre execuções
+INSTRUMENT_CACHE = os.path.join(os.path.abspath("."), "cache", "instruments.json")
 
 # ---------------- CONFIG ---------------- #
-INSTRUMENTS = {
-    "kick": ["Attack Kick 15.wav", "Attack Kick 46.wav", "Downstream Kick 04.wav", "FL 808 Kick.wav", "FL 909 Kick Alt.wav", "FL 909 Kick.wav", "FL Basic Kick.wav"],
-    "snare": ["FL 808 Snare.wav", "Attack Snare 03.wav", "Attack Snare 26.wav", "FL Grv Snareclap 30.wav", "FL 808 Snare.wav", "FL 909 Snare.wav", "FL 909 Rim.wav"],
-    "hat": ["Attack Hat 06.wav", "Attack OHat 02.wav"],
-    "tom": ["FL 808 Tom.wav", "FL 909 Tom.wav"],
-}
-
-DISPLAY_NAMES = {
-    "kick": "Bumbo",
-    "snare": "Caixa",
-    "hat": "Hi-hat",
-    "tom": "Tom"
-}
-
-NUM_STEPS = 16
+DEFAULT_STEPS = 16
+MAX_PATTERN_STEPS = 1024
+# a grade mostra um compasso por vez; padrões longos são paginados
+GRID_COLUMNS = STEPS_PER_BAR
+# miniatura do timbre ao lado do combobox (THUMB_POINTS do sample_analysis cabem numa linha)
+PREVIEW_WIDTH = 96
+PREVIEW_HEIGHT = 20
+# cadeia de cada track no mixer (track_dsp): ganho em dB, pan em % e passa-baixa em Hz (0 = aberto)
+TRACK_GAIN_MIN, TRACK_GAIN_MAX = -24, 6
+TONE_CUTOFFS = (0, 12000, 8000, 5000, 3000, 2000, 1200, 800, 500, 300)
+# desvio máximo do humanize; entra na antecedência do loop (schedule_ahead), então um hit
+# adiantado ainda cai no futuro do mixer
+HUMANIZE_MAX_MS = 10
+COLOR_SOFT = "#8fcf8f"      # hit com velocity ou probabilidade reduzida
+COLOR_OUTSIDE = "#d9d9d9"   # coluna além do fim do padrão
 
 PRESETS = {
     "Reggae": {
@@ -66,57 +81,157 @@ PRESETS = {
     }
 }
 
-# ---------------- INIT PYGAME ---------------- #
-try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-except Exception as e:
-    logging.exception("Erro inicializando pygame.mixer: %s", e)
-
-# carregar samples (se existirem)
-samples = {}
-for inst, files in INSTRUMENTS.items():
-    samples[inst] = []
-    for f in files:
-        path = os.path.join(SAMPLES_PATH, inst, f)
-        if os.path.exists(path):
-            try:
-                samples[inst].append(pygame.mixer.Sound(path))
-            except pygame.error as e:
-                logging.warning("Erro ao carregar sample %s: %s", path, e)
-        else:
-            logging.info("Aviso: sample não encontrado: %s", path)
+# ---------------- AUDIO ENGINE ---------------- #
+# um único OutputStream mistura bateria, click, looper e música (ver audio_engine.py)
+AUDIO_BLOCKSIZE = int(os.environ.get("DRUM_AUDIO_BLOCKSIZE", "256"))
+AUDIO_MAX_VOICES = 48
+# o relógio entrega cada passo antes de ele soar (StepClock lead) e os hits vão para o frame
+# exato do passo; a antecedência, em tempo, é o bloco que o mixer está preenchendo (no
+# blocksize real da saída), o maior adiantamento de um hit (ataque dos samples + humanize) e
+# esta margem para o jitter da thread do sequenciador (ver schedule_ahead)
+SCHEDULE_AHEAD_MS = 4.0
+# "Música + Instrumentos": a música começa este tanto no futuro, com o streaming já abastecido
+MUSIC_PREROLL = 0.15
+
+# taxa nativa da saída (DRUM_AUDIO_SAMPLERATE força outra), resolvida ao abrir o stream:
+# os samples são convertidos uma vez para ela em vez de o driver reamostrar o stream inteiro
+AUDIO_SAMPLERATE = int(os.environ.get("DRUM_AUDIO_SAMPLERATE", "0")) or None
+
+# mixer, catálogo e tracks são criados por prepare(), chamado pelo DrumMachine: importar este
+# módulo não pode abrir nada, porque os processos spawn (análise de BPM, índice de samples)
+# reimportam o script principal
+engine = None
+catalog = None
+TRACKS = []
+
+
+def decode_voice(path):
+    """PCM float32 pronto para o mixer: variante preparada, pacote int16 na mesma taxa ou o arquivo."""
+    category, name = split_sample_path(path, SAMPLES_PATH)
+    if sample_variants is not None:
+        pcm = sample_variants.get(category, name)
+        if pcm is not None:
+            # view memmap float32 já na taxa da saída; mono continua mono (o mixer espalha)
+            return pcm
+    if sample_pack is not None:
+        entry = sample_pack.info(category, name)
+        if entry is not None and entry["sample_rate"] == engine.samplerate:
+            # mono continua mono: o mixer espalha o canal único na soma
+            return to_float(sample_pack.get(category, name))
+    return load_wav(path, engine.samplerate, engine.channels)
+
+
+def max_early_ms():
+    """Quanto um hit pode sair antes do passo: onset máximo do sample_prep mais o humanize."""
+    from sample_prep import DEFAULT_SETTINGS
+    return DEFAULT_SETTINGS["max_onset_ms"] + HUMANIZE_MAX_MS
+
+
+def schedule_ahead():
+    """Antecedência (s) com que o loop recebe cada passo para agendá-lo no mixer."""
+    return engine.blocksize / engine.samplerate + (max_early_ms() + SCHEDULE_AHEAD_MS) / 1000
+
+
+def sample_onset(category, name):
+    """Frames do início do sample até o ataque, pré-calculados nas variantes (0 sem elas)."""
+    entry = sample_variants.info(category, name) if sample_variants is not None else None
+    return entry["onset"] if entry is not None else 0
+
+
+def prepare():
+    """Cria o mixer (sem abrir o stream) e lê o catálogo; só na primeira chamada.
+
+    Tracks e timbres saem do catálogo (uma pasta de samples/ por track): é o
+    que a grade precisa para aparecer, e com o cache quente custa só a leitura
+    de um JSON e dos IDs no banco.
+    """
+    global engine, catalog, TRACKS
+    if engine is None:
+        engine = AudioEngine(samplerate=AUDIO_SAMPLERATE, channels=2, blocksize=AUDIO_BLOCKSIZE,
+                             max_voices=AUDIO_MAX_VOICES)
+    if catalog is None:
+        catalog = load_catalog(SAMPLES_PATH, INSTRUMENT_CACHE, get_store())
+        TRACKS = catalog.tracks()
+
+
+# preenchidos por bring_up_audio, fora da thread da UI
+sample_pack = None
+sample_variants = None
+sample_bank = None
+
+
+def bring_up_audio():
+    """Abre a saída e prepara os samples; roda numa thread enquanto a janela já responde.
+
+    Ordem: stream (resolve a taxa), pacote int16, variantes na taxa da saída e
+    o banco indexado pela listagem do catálogo.
+    """
+    global sample_pack, sample_variants, sample_bank
+    from sample_bank import SampleBank
+    from sample_pack import open_or_build
+    from sample_prep import open_or_build_variants
+    try:
+        engine.start()
+    except Exception as e:
+        logging.exception("Erro inicializando saída de áudio: %s", e)
+    sample_pack = open_or_build(SAMPLES_PATH, SAMPLE_PACK_DIR, bundled_dir=resource_path("sample_pack"))
+    sample_variants = open_or_build_variants(sample_pack, SAMPLES_PATH, SAMPLE_VARIANTS_DIR, engine.samplerate)
+    sample_bank = SampleBank(SAMPLES_PATH, decoder=decode_voice, pack=sample_pack, refs=catalog.sample_refs())
+    logging.info("Catálogo: %d tracks, %d timbres", len(TRACKS), len(catalog))
 
 # ---------------- DRUM MACHINE ---------------- #
 class DrumMachine:
     def __init__(self, root):
         logging.info("Iniciando DrumMachine...")
+        prepare()
         self.root = root
         self.root.title("Drum Machine Victor S.")
         self.root.columnconfigure(0, weight=1)
+        # saída de áudio e samples sobem em segundo plano (bring_up_audio); até lá os
+        # controles que tocam algo só avisam que o áudio está carregando
+        self.audio_ready = threading.Event()
+        self.audio_ready_ms = None
+        # índice de características dos samples (sample_analysis), atualizado depois do áudio
+        self.samples_indexed = threading.Event()
+        # cópia em memória do índice para as miniaturas: a UI não consulta o banco ao trocar de timbre
+        self.sample_features = {}
 
         # Sequencer / playback
-        self.sequence = {inst: [0]*NUM_STEPS for inst in INSTRUMENTS.keys()}
+        # padrão esparso (passo, track, velocity, probabilidade); a grade mostra a página `page`
+        self.pattern = Pattern(TRACKS, DEFAULT_STEPS)
+        self.page = 0
+        self.pattern_steps = tk.IntVar(value=DEFAULT_STEPS)
+        self.step_velocity = tk.IntVar(value=MAX_VELOCITY)
+        self.step_probability = tk.IntVar(value=MAX_PROBABILITY)
+        # groove: swing das semicolcheias ímpares (%) e desvio aleatório de cada hit (ms)
+        self.swing = tk.IntVar(value=50)
+        self.humanize = tk.IntVar(value=0)
         self.bpm = tk.IntVar(value=100)
         self.is_playing = False
         self.stop_event = threading.Event()
+        # acorda o loop quando o padrão muda ou ao parar (ele dorme até o próximo passo com som)
+        self.wake_event = threading.Event()
         self.thread = None
+        self.clock = None
+        # único estado lido pela thread do loop; trocado inteiro a cada edição
+        self.snapshot = EMPTY_PATTERN
+        self.rendered_playback = False
 
         # Looper (gravações do usuário)
-        self.loop_samplerate = 44100
+        # takes na taxa da saída (conhecida quando o áudio fica pronto): tocam no mixer sem conversão
+        self.loop_samplerate = None
         self.loop_channels = 1            # default mono para gravações de instrumento
         self.loop_dir = os.path.join(os.path.abspath("."), "loops")
-        os.makedirs(self.loop_dir, exist_ok=True)
 
         self.loop_duration_var = tk.IntVar(value=5)   # controlado via UI (spinbox) — evita popups
         self.num_tracks = 3
+        # takes int16 em memmap (loops/pista_N/), com camadas desfazíveis; o mixer toca o mesmo buffer
+        self.take_store = TakeStore(self.loop_dir, self.num_tracks)
         self.tracks = []
         for i in range(self.num_tracks):
-            file_path = os.path.join(self.loop_dir, f"user_loop_{i+1}.wav")
             self.tracks.append({
-                "data": None,
-                "file": file_path,
-                "sound": None,
-                "channel": None,
+                "take": self.take_store.take(i),
+                "playing": False,
                 "btn_record": None,
                 "btn_play": None,
                 "orig_record_bg": None,
@@ -125,20 +240,125 @@ class DrumMachine:
 
         # Metronomo / click
         self.metronome_enabled = tk.BooleanVar(value=False)
-        self.click_sound = None
-        click_path = os.path.join(SAMPLES_PATH, "Percussion", "Attack Blip 03.wav")
-        if os.path.exists(click_path):
-            try:
-                self.click_sound = pygame.mixer.Sound(click_path)
-            except Exception as e:
-                logging.warning("Erro ao carregar click.wav: %s", e)
 
-        # música importada
+        # mix pré-renderizado: um buffer por compasso tocado em loop
+        self.render_mode = tk.BooleanVar(value=False)
+        self.renderer = GrooveRenderer(num_steps=DEFAULT_STEPS)
+        self.rendered_pcm = None
+
+        # música importada; a análise de BPM roda num processo à parte
         self.music_file = None
+        self.music_analysis = None
+        self.bpm_job = None
+        self.music_stretch = tk.BooleanVar(value=False)
+        self.music_sync = None     # (batidas, esticar) quando o loop segue a música
+
+        # instrumentação do caminho quente; só grava com o overlay aberto
+        self.perf = PerfMonitor()
+        self.perf_visible = tk.BooleanVar(value=False)
 
         self._build_ui()
         init_db()
-        logging.info("DrumMachine inicializada com sucesso!")
+        self.rebuild_snapshot()
+        for var in [self.bpm, self.metronome_enabled, self.swing, self.humanize, *self.timbre_vars.values()]:
+            var.trace_add("write", lambda *_: self.rebuild_snapshot())
+        for var in [*self.track_gain.values(), *self.track_pan.values(), *self.track_tone.values()]:
+            var.trace_add("write", lambda *_: self.update_track_chains())
+        # edições vão para o grooves.db numa thread (autosave.py); ao abrir, volta o último estado
+        self.autosave = AutosaveWriter(get_store(), TRACKS, on_restore=self._on_autosave_loaded,
+                                       perf=self.perf).start()
+        for var in [self.bpm, *self.timbre_vars.values()]:
+            var.trace_add("write", lambda *_: self.autosave_edit())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        threading.Thread(target=self._bring_up_audio, name="audio-init", daemon=True).start()
+        logging.info("DrumMachine inicializada com sucesso! (%.0f ms desde o import)",
+                     (time.perf_counter() - _T_START) * 1000)
+
+    # ---------------- Áudio em segundo plano ---------------- #
+    def _bring_up_audio(self):
+        try:
+            bring_up_audio()
+        except Exception as e:
+            logging.exception("Erro preparando o áudio: %s", e)
+        try:
+            # WAVs do looper antigo viram takes uma vez (e ficam em loops/); camadas órfãs são liberadas
+            self.take_store.import_legacy()
+            self.take_store.compact()
+        except OSError as e:
+            logging.warning("Erro organizando %s: %s", self.loop_dir, e)
+        self.root.after(0, self._on_audio_ready)
+
+    def _on_audio_ready(self):
+        """Thread da UI: liga o que dependia da taxa da saída e dos samples."""
+        self.loop_samplerate = engine.samplerate
+        self.renderer.sample_rate = engine.samplerate
+        self.audio_ready_ms = (time.perf_counter() - _T_START) * 1000
+        self.audio_ready.set()
+        self.rebuild_snapshot()
+        self.update_track_chains()
+        # decodifica em segundo plano só o que a UI já selecionou
+        warm = [CLICK_SAMPLE]
+        for inst in TRACKS:
+            timbre = catalog.timbre(inst, self.selected_timbre(inst))
+            if timbre is not None:
+                warm.append((timbre.category, timbre.name))
+        if sample_bank is not None:
+            sample_bank.prewarm(warm)
+        logging.info("Áudio pronto a %s Hz (%.0f ms desde o import)", engine.samplerate, self.audio_ready_ms)
+        self.update_audio_status()
+        threading.Thread(target=self._index_samples, name="sample-index", daemon=True).start()
+
+    def _index_samples(self):
+        """Analisa (num pool de processos) só os samples novos ou alterados desde a última execução."""
+        from sample_analysis import update_index
+        store = get_store()
+        try:
+            # o que já estava analisado aparece antes da atualização terminar
+            self.sample_features = store.load_all_sample_features()
+            self.root.after(0, self.refresh_previews)
+            update_index(store, SAMPLES_PATH, catalog.files)
+            self.sample_features = store.load_all_sample_features()
+        except Exception as e:
+            logging.exception("Erro atualizando o índice de samples: %s", e)
+        self.samples_indexed.set()
+        self.root.after(0, self.refresh_previews)
+
+    # ---------------- Gravação automática ---------------- #
+    def autosave_edit(self):
+        """Entrega o estado atual à gravação automática (cópia dos eventos; o disco fica com a thread dela)."""
+        try:
+            bpm = int(self.bpm.get())
+        except (ValueError, tk.TclError):
+            return
+        self.autosave.submit(self.pattern, bpm, self.current_timbres())
+
+    def _on_autosave_loaded(self, groove, bpm, clean):
+        # thread do autosave: aplica na thread da UI
+        self.root.after(0, lambda: self._restore_autosave(groove, bpm, clean))
+
+    def _restore_autosave(self, groove, bpm, clean):
+        if self.autosave.submitted:
+            # o usuário (ou um preset) já mexeu no padrão: não sobrescreve
+            logging.info("Estado da gravação automática ignorado: padrão já editado")
+            return
+        self.apply_groove(groove)
+        self.bpm.set(bpm)
+        self.update_bpm_label()
+        logging.info("Estado restaurado da gravação automática%s", "" if clean else " (sessão interrompida)")
+
+    def on_close(self):
+        """Fechar a janela: grava o que estiver pendente e marca o fechamento normal."""
+        # único ponto em que a UI espera o disco, com a janela já fechando
+        if not self.autosave.close():
+            logging.warning("Gravação automática não terminou a tempo ao fechar")
+        self.root.destroy()
+
+    def require_audio(self):
+        """True se o áudio já subiu; senão avisa no indicador e devolve False."""
+        if self.audio_ready.is_set():
+            return True
+        self.audio_status.config(text="⏳ Áudio carregando, aguarde...")
+        return False
 
     def _build_ui(self):
         logging.debug("Construindo interface gráfica...")
@@ -168,46 +388,120 @@ class DrumMachine:
         # ---------------- Metronomo ---------------- #
         metro_frame = ttk.Frame(self.root, padding=5)
         metro_frame.pack(fill="x", padx=5, pady=4)
-        ttk.Checkbutton(metro_frame, text="Som do BPM (Metrônomo)", variable=self.metronome_enabled).pack(side="left", padx=5)
-
-        # ---------------- Timbres ---------------- #
-        self.timbre_vars = {}
-        timbre_frame = ttk.Frame(self.root, padding=5)
-        timbre_frame.pack(fill="x", padx=5, pady=4)
-        for inst, t_list in INSTRUMENTS.items():
-            ttk.Label(timbre_frame, text=DISPLAY_NAMES.get(inst, inst)).pack(side="left", padx=3)
-            options = [f"{DISPLAY_NAMES.get(inst, inst)} {i+1}" for i in range(len(t_list))]
-            var = tk.StringVar(value=options[0])
-            combo = ttk.Combobox(timbre_frame, textvariable=var, values=options, width=12)
-            combo.pack(side="left", padx=3)
-            self.timbre_vars[inst] = var
+        ttk.Checkbutton(metro_frame, text="Som do BPM (Metrônomo)", variable=self.metronome_enabled,
+                        command=self.on_metronome_toggle).pack(side="left", padx=5)
+        ttk.Checkbutton(metro_frame, text="Mix pré-renderizado", variable=self.render_mode).pack(side="left", padx=5)
 
         # ---------------- DB ---------------- #
         db_frame = ttk.Frame(self.root, padding=5)
         db_frame.pack(fill="x", padx=5, pady=4)
-        ttk.Label(db_frame, text="Grooves Salvos:").pack(side="left")
-        self.db_list = ttk.Combobox(db_frame, values=[], width=30)
-        self.db_list.pack(side="left", padx=5, fill="x", expand=True)
+        ttk.Label(db_frame, text="Buscar:").pack(side="left")
+        self.db_search_var = tk.StringVar()
+        search_entry = ttk.Entry(db_frame, textvariable=self.db_search_var, width=20)
+        search_entry.pack(side="left", padx=5)
+        search_entry.bind("<KeyRelease>", self.on_db_search)
+        ttk.Label(db_frame, text="BPM:").pack(side="left")
+        self.db_bpm_min = tk.IntVar(value=40)
+        self.db_bpm_max = tk.IntVar(value=200)
+        tk.Spinbox(db_frame, from_=40, to=200, textvariable=self.db_bpm_min, width=4,
+                   command=self.refresh_db_list).pack(side="left")
+        tk.Spinbox(db_frame, from_=40, to=200, textvariable=self.db_bpm_max, width=4,
+                   command=self.refresh_db_list).pack(side="left", padx=(2, 5))
+        ttk.Button(db_frame, text="Parecidos", command=self.show_similar).pack(side="left", padx=3)
         ttk.Button(db_frame, text="Salvar Preset", command=self.save_to_db).pack(side="left", padx=3)
         ttk.Button(db_frame, text="Tocar Preset", command=self.load_from_db).pack(side="left", padx=3)
         ttk.Button(db_frame, text="Excluir Preset", command=self.delete_from_db).pack(side="left", padx=3)
         ttk.Button(db_frame, text="Atualizar Lista", command=self.refresh_db_list).pack(side="left", padx=3)
 
+        # lista paginada: carrega a próxima página quando a rolagem chega perto do fim
+        list_frame = ttk.Frame(self.root, padding=(5, 0))
+        list_frame.pack(fill="x", padx=5)
+        db_scroll = ttk.Scrollbar(list_frame, orient="vertical")
+        self.db_list = tk.Listbox(list_frame, height=5, exportselection=False,
+                                  yscrollcommand=lambda first, last: self.on_db_scroll(db_scroll, first, last))
+        db_scroll.config(command=self.db_list.yview)
+        self.db_list.pack(side="left", fill="x", expand=True)
+        db_scroll.pack(side="left", fill="y")
+        self.db_list.bind("<Double-Button-1>", lambda e: self.load_from_db())
+        self.db_ids = []
+        self.db_cursor = None
+        self.db_search_job = None
+
+        # ---------------- Padrão (comprimento, página, velocity/probabilidade) ---------------- #
+        pattern_frame = ttk.Frame(self.root, padding=5)
+        pattern_frame.pack(fill="x", padx=5, pady=(6, 0))
+        ttk.Label(pattern_frame, text="Passos:").pack(side="left")
+        steps_spin = tk.Spinbox(pattern_frame, from_=1, to=MAX_PATTERN_STEPS, textvariable=self.pattern_steps,
+                                width=5, command=self.on_length_change)
+        steps_spin.pack(side="left", padx=(2, 8))
+        steps_spin.bind("<Return>", lambda e: self.on_length_change())
+        ttk.Button(pattern_frame, text="◀", width=3, command=lambda: self.show_page(self.page - 1)).pack(side="left")
+        self.page_label = ttk.Label(pattern_frame, text="", width=14, anchor="center")
+        self.page_label.pack(side="left")
+        ttk.Button(pattern_frame, text="▶", width=3, command=lambda: self.show_page(self.page + 1)).pack(side="left")
+        # valores usados ao ligar um passo (clique) ou aplicados a ele (botão direito)
+        ttk.Label(pattern_frame, text="Velocity:").pack(side="left", padx=(12, 2))
+        tk.Spinbox(pattern_frame, from_=1, to=MAX_VELOCITY, textvariable=self.step_velocity, width=4).pack(side="left")
+        ttk.Label(pattern_frame, text="Prob. %:").pack(side="left", padx=(8, 2))
+        tk.Spinbox(pattern_frame, from_=1, to=MAX_PROBABILITY, textvariable=self.step_probability,
+                   width=4).pack(side="left")
+        ttk.Label(pattern_frame, text="(botão direito aplica no passo)").pack(side="left", padx=5)
+        ttk.Label(pattern_frame, text="Swing %:").pack(side="left", padx=(12, 2))
+        tk.Spinbox(pattern_frame, from_=50, to=75, textvariable=self.swing, width=3).pack(side="left")
+        ttk.Label(pattern_frame, text="Humanizar ms:").pack(side="left", padx=(8, 2))
+        tk.Spinbox(pattern_frame, from_=0, to=HUMANIZE_MAX_MS, textvariable=self.humanize, width=3).pack(side="left")
+
         # ---------------- Sequencer ---------------- #
         self.grid_frame = ttk.Frame(self.root, padding=5)
         self.grid_frame.pack(fill="both", expand=True, padx=5, pady=6)
         self.step_buttons = {}
-        for row, inst in enumerate(INSTRUMENTS.keys()):
+        # timbre de cada track: o ID inteiro do catálogo fica em timbre_vars; o combobox só mostra o nome
+        self.timbre_vars = {}
+        self.timbre_labels = {}
+        # miniatura da forma de onda do timbre (índice do sample_analysis) e "≈": o próximo mais parecido
+        self.timbre_previews = {}
+        self.similar_chain = {}
+        # cadeia da track no mixer: ganho (dB), pan (-100 a 100) e passa-baixa (Hz, 0 = aberto)
+        self.track_gain, self.track_pan, self.track_tone = {}, {}, {}
+        for row, inst in enumerate(TRACKS):
             self.grid_frame.rowconfigure(row, weight=1)
-            tk.Label(self.grid_frame, text=DISPLAY_NAMES.get(inst, inst), width=10, anchor="e").grid(row=row, column=0, padx=5, pady=2)
+            tk.Label(self.grid_frame, text=catalog.display_name(inst), width=10, anchor="e").grid(row=row, column=0, padx=5, pady=2)
             self.step_buttons[inst] = []
-            for col in range(NUM_STEPS):
+            for col in range(GRID_COLUMNS):
                 btn = tk.Button(self.grid_frame, width=2, height=1, relief="raised", bg="white",
                                 command=lambda i=inst, c=col: self.toggle_step(i, c))
+                btn.bind("<Button-3>", lambda e, i=inst, c=col: self.edit_step(i, c))
                 btn.grid(row=row, column=col+1, padx=2, pady=2, sticky="nsew")
                 self.step_buttons[inst].append(btn)
-            for col in range(NUM_STEPS+1):
+            default = catalog.resolve(inst, None)
+            self.timbre_vars[inst] = tk.IntVar(value=default.id if default else -1)
+            self.timbre_labels[inst] = tk.StringVar(value=default.label if default else "")
+            combo = ttk.Combobox(self.grid_frame, textvariable=self.timbre_labels[inst], state="readonly", width=18,
+                                 values=[t.label for t in catalog.timbres(inst)])
+            combo.grid(row=row, column=GRID_COLUMNS+1, padx=(8, 2), pady=2)
+            combo.bind("<<ComboboxSelected>>", lambda e, i=inst: self.on_timbre_change(i))
+            preview = tk.Canvas(self.grid_frame, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT, bg="white",
+                                highlightthickness=0)
+            preview.grid(row=row, column=GRID_COLUMNS+2, padx=2, pady=2)
+            self.timbre_previews[inst] = preview
+            ttk.Button(self.grid_frame, text="≈", width=2,
+                       command=lambda i=inst: self.similar_timbre(i)).grid(row=row, column=GRID_COLUMNS+3, padx=2)
+            self.track_gain[inst] = tk.IntVar(value=0)
+            self.track_pan[inst] = tk.IntVar(value=0)
+            self.track_tone[inst] = tk.IntVar(value=0)
+            tk.Spinbox(self.grid_frame, from_=TRACK_GAIN_MIN, to=TRACK_GAIN_MAX, textvariable=self.track_gain[inst],
+                       width=3).grid(row=row, column=GRID_COLUMNS+4, padx=(6, 1))
+            tk.Spinbox(self.grid_frame, from_=-100, to=100, increment=10, textvariable=self.track_pan[inst],
+                       width=4).grid(row=row, column=GRID_COLUMNS+5, padx=1)
+            tk.Spinbox(self.grid_frame, values=TONE_CUTOFFS, textvariable=self.track_tone[inst],
+                       width=5).grid(row=row, column=GRID_COLUMNS+6, padx=(1, 4))
+            self.draw_preview(inst)
+            for col in range(GRID_COLUMNS+1):
                 self.grid_frame.columnconfigure(col, weight=1)
+        self.playhead = PlayheadRenderer(self.root, self.step_buttons,
+                                         lambda inst, col: self.step_color(inst, self.page_start + col),
+                                         monitor=self.perf)
+        self.update_page_label()
 
         # ---------------- Controls principais ---------------- #
         ctrl_frame = ttk.Frame(self.root, padding=5)
@@ -217,8 +511,27 @@ class DrumMachine:
         ttk.Button(ctrl_frame, text="🎵 Importar Música", command=self.import_music).pack(side="left", padx=5)
         ttk.Button(ctrl_frame, text="▶ Tocar Música", command=self.play_music_only).pack(side="left", padx=5)
         ttk.Button(ctrl_frame, text="▶ Música + Instrumentos", command=self.play_music_with_instruments).pack(side="left", padx=5)
+        ttk.Checkbutton(ctrl_frame, text="Esticar grade", variable=self.music_stretch).pack(side="left", padx=5)
+        self.music_status = ttk.Label(ctrl_frame, text="")
+        self.music_status.pack(side="left", padx=5)
         ttk.Button(ctrl_frame, text="💾 Extrair Preset", command=self.save_groove).pack(side="left", padx=5)
         ttk.Button(ctrl_frame, text="📂 Importar Preset", command=self.load_groove).pack(side="left", padx=5)
+        ttk.Button(ctrl_frame, text="🔊 Exportar Áudio", command=self.export_audio).pack(side="left", padx=5)
+        ttk.Checkbutton(ctrl_frame, text="📈 Desempenho", variable=self.perf_visible,
+                        command=self.toggle_perf_overlay).pack(side="left", padx=5)
+        self.audio_status = ttk.Label(ctrl_frame, text="")
+        self.audio_status.pack(side="right", padx=5)
+        self.audio_status_job = None
+
+        # ---------------- Overlay de desempenho (oculto por padrão) ---------------- #
+        self.perf_frame = ttk.LabelFrame(self.root, text="Desempenho", padding=6)
+        self.perf_label = tk.Label(self.perf_frame, text="", justify="left", anchor="w", font=("Courier", 9))
+        self.perf_label.pack(side="left", fill="x", expand=True)
+        perf_buttons = ttk.Frame(self.perf_frame)
+        perf_buttons.pack(side="right")
+        ttk.Button(perf_buttons, text="Exportar CSV", command=self.export_perf_csv).pack(fill="x", pady=1)
+        ttk.Button(perf_buttons, text="Exportar trace", command=self.export_perf_trace).pack(fill="x", pady=1)
+        ttk.Button(perf_buttons, text="Limpar", command=self.perf.clear).pack(fill="x", pady=1)
 
         # ---------------- Looper Independente ---------------- #
         loop_frame = ttk.LabelFrame(self.root, text="Looper", padding=6)
@@ -248,6 +561,9 @@ class DrumMachine:
             btn_stop = tk.Button(frame, text=f"⏹ Stop Pista {i+1}", command=lambda idx=i: self.stop_track(idx))
             btn_stop.pack(side="left", padx=3)
 
+            # Undo button: descarta o último overdub (ou o take, se for o único)
+            ttk.Button(frame, text="↶ Desfazer", command=lambda idx=i: self.undo_track(idx)).pack(side="left", padx=3)
+
             # store buttons and original bg colors
             track["btn_record"] = btn_record
             track["btn_play"] = btn_play
@@ -259,12 +575,75 @@ class DrumMachine:
                 track["orig_play_bg"] = None
 
         self.refresh_db_list()
+        self.update_audio_status()
+
+    def update_audio_status(self):
+        """Indicador de pronto, latência e underruns do stream de saída, a cada segundo."""
+        if self.audio_status_job is not None:
+            self.root.after_cancel(self.audio_status_job)
+        stats = engine.stats()
+        if not self.audio_ready.is_set():
+            text = "⏳ Carregando áudio..."
+        elif stats["running"]:
+            text = (f"Áudio: {stats['latency_ms']:.1f} ms | bloco {stats['blocksize']} | "
+                    f"underruns {stats['underruns']} | vozes {stats['voices']}")
+            if stats["errors"]:
+                text += f" | erros do mixer {stats['errors']}"
+        else:
+            text = "Áudio: indisponível"
+        self.audio_status.config(text=text)
+        self.audio_status_job = self.root.after(1000, self.update_audio_status)
+
+    # ---------------- Overlay de desempenho ---------------- #
+    def toggle_perf_overlay(self):
+        """Mostra/oculta o overlay; a coleta só fica ligada enquanto ele está visível."""
+        visible = self.perf_visible.get()
+        self.perf.enabled = visible
+        if visible:
+            self.perf_frame.pack(fill="x", padx=5, pady=6, after=self.audio_status.master)
+            self.update_perf_overlay()
+        else:
+            self.perf_frame.pack_forget()
+
+    def update_perf_overlay(self):
+        if not self.perf_visible.get():
+            return
+        self.perf_label.config(text=self.perf.summary_text())
+        self.root.after(500, self.update_perf_overlay)
+
+    def export_perf_csv(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not file_path:
+            return
+        try:
+            self.perf.to_csv(file_path)
+            logging.info("Métricas de desempenho exportadas em %s", file_path)
+        except OSError as e:
+            logging.exception("Erro exportando métricas: %s", e)
+            messagebox.showerror("Erro", f"Não foi possível exportar: {e}")
+
+    def export_perf_trace(self):
+        """Trace para chrome://tracing ou ui.perfetto.dev."""
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace JSON", "*.json")])
+        if not file_path:
+            return
+        try:
+            self.perf.to_chrome_trace(file_path)
+            logging.info("Trace de desempenho exportado em %s", file_path)
+        except OSError as e:
+            logging.exception("Erro exportando trace: %s", e)
+            messagebox.showerror("Erro", f"Não foi possível exportar: {e}")
 
     # ---------------- Gravação / Looper ---------------- #
     def record_track(self, idx):
-        """Inicia a gravação de uma pista em thread. Não usa popups (usa spinbox para duração)."""
+        """Inicia a gravação de uma pista (InputStream por callback). Não usa popups (usa spinbox para duração)."""
+        if not self.require_audio():
+            return
+        from looper import StreamRecorder
         duration = int(self.loop_duration_var.get())
         track = self.tracks[idx]
+        if track["take"].recording:
+            return
         btn = track["btn_record"]
 
         # desativa botão e muda texto/cor para indicar gravação
@@ -286,68 +665,70 @@ class DrumMachine:
             except Exception:
                 pass
 
+        # o primeiro take define o tamanho do loop; overdubs viram camadas no mesmo tamanho
+        recorder = StreamRecorder(track["take"], duration * self.loop_samplerate, self.loop_channels,
+                                  self.loop_samplerate,
+                                  on_done=lambda rec: self._on_take_recorded(idx, rec, ui_end))
         self.root.after(0, ui_start)
+        logging.info("Iniciando gravação pista %d por %.1fs", idx+1, track["take"].duration)
+        try:
+            # o callback do InputStream roda na thread de áudio; a UI não trava
+            recorder.start()
+        except Exception as e:
+            logging.exception("Erro ao gravar pista %d: %s", idx+1, e)
+            self.root.after(0, ui_end)
 
-        # grava em thread para não travar UI
-        t = threading.Thread(target=self._record_track_thread, args=(idx, duration, ui_end), daemon=True)
-        t.start()
-
-    def _record_track_thread(self, idx, duration, ui_end_callback):
-        """Thread que grava e salva o arquivo do track idx."""
+    def _on_take_recorded(self, idx, recorder, ui_end_callback):
+        """Fim da gravação (thread do gravador): a camada já está no memmap e no histórico do take."""
         track = self.tracks[idx]
         try:
-            logging.info("Iniciando gravação piste %d por %ds", idx+1, duration)
-            frames = int(duration * self.loop_samplerate)
-            audio = sd.rec(frames, samplerate=self.loop_samplerate, channels=self.loop_channels, dtype='float32')
-            sd.wait()  # blocking but we are em thread
-
-            # se primeiro take, salva direto; se já existe, mix (overdub)
-            if track["data"] is None:
-                track["data"] = audio
-            else:
-                # mix: soma na menor quantidade de frames para evitar shape mismatch
-                min_len = min(track["data"].shape[0], audio.shape[0])
-                mix = track["data"][:min_len] + audio[:min_len]
-                track["data"] = np.clip(mix, -1.0, 1.0)
-
-            # salvar com timestamp para evitar sobrescrita e facilitar debug
-            ts = int(time.time())
-            fname = os.path.join(self.loop_dir, f"user_loop_{idx+1}_{ts}.wav")
-            track["file"] = fname
-            sf.write(fname, track["data"], self.loop_samplerate, subtype='PCM_16')
-            logging.info("Gravação salva em %s", fname)
-
-            # carrega no pygame para tocar
-            try:
-                track["sound"] = pygame.mixer.Sound(fname)
-            except Exception as e:
-                logging.exception("Falha ao carregar loop no pygame: %s", e)
-                track["sound"] = None
-
+            # o mixer toca direto da mixagem do take: o overdub já soa sem recarregar nada
+            if recorder.error is None:
+                logging.info("Pista %d: %d camada(s) em %s", idx+1, track["take"].layers, track["take"].directory)
+            # camadas fundidas no histórico e takes substituídos deixam de ser referenciados
+            self.take_store.compact()
         except Exception as e:
-            logging.exception("Erro ao gravar pista %d: %s", idx+1, e)
+            logging.exception("Falha ao finalizar gravação: %s", e)
         finally:
             # atualizar UI (volta cor/texto)
             self.root.after(0, ui_end_callback)
             logging.info("Gravação da pista %d finalizada", idx+1)
 
+    def undo_track(self, idx):
+        """Desfaz a última gravação da pista (overdub, ou o próprio take se for o único)."""
+        track = self.tracks[idx]
+        try:
+            if not track["take"].undo():
+                logging.info("Nada para desfazer na pista %d", idx+1)
+                return
+            if track["take"].empty:
+                self.stop_track(idx)
+            logging.info("Pista %d: desfeito, %d camada(s)", idx+1, track["take"].layers)
+            self.take_store.compact()
+        except Exception as e:
+            logging.exception("Erro ao desfazer na pista %d: %s", idx+1, e)
+
     def play_track(self, idx):
         """Toca a pista idx em loop (infinito)"""
+        if not self.require_audio():
+            return
         track = self.tracks[idx]
-        if not track.get("sound"):
-            # tenta carregar a partir do arquivo se existir
-            try:
-                if os.path.exists(track["file"]):
-                    track["sound"] = pygame.mixer.Sound(track["file"])
-                else:
-                    logging.info("Nenhum loop gravado na pista %d", idx+1)
-                    return
-            except Exception as e:
-                logging.exception("Erro ao carregar som da pista %d: %s", idx+1, e)
-                return
+        take = track["take"]
+        if take.empty:
+            logging.info("Nenhum loop gravado na pista %d", idx+1)
+            return
 
         try:
-            track["channel"] = track["sound"].play(loops=-1)
+            pcm = take.data
+            if take.samplerate != engine.samplerate:
+                # take de uma sessão com outra saída: toca uma cópia convertida (o memmap fica como está)
+                from sample_prep import resample
+                pcm = resample(to_float(pcm), take.samplerate, engine.samplerate)
+            if track["playing"]:
+                engine.stop_tag(("track", idx))
+            # o memmap int16 vai direto para o mixer: overdubs e desfazer soam sem recarregar
+            engine.play(pcm, loop=True, tag=("track", idx))
+            track["playing"] = True
             if track["orig_play_bg"] is not None:
                 track["btn_play"].config(bg="lightgreen")
         except Exception as e:
@@ -356,138 +737,580 @@ class DrumMachine:
     def stop_track(self, idx):
         track = self.tracks[idx]
         try:
-            if track.get("channel"):
-                track["channel"].stop()
+            engine.stop_tag(("track", idx))
+            track["playing"] = False
             if track["orig_play_bg"] is not None:
                 track["btn_play"].config(bg=track["orig_play_bg"])
         except Exception as e:
             logging.exception("Erro ao parar pista %d: %s", idx+1, e)
 
     # ---------------- Funcionalidades Sequencer ---------------- #
+    @property
+    def page_start(self):
+        return self.page * GRID_COLUMNS
+
+    def brush(self):
+        """(velocity, probabilidade) dos spinboxes, limitados às faixas válidas."""
+        try:
+            velocity, probability = int(self.step_velocity.get()), int(self.step_probability.get())
+        except (ValueError, tk.TclError):
+            return MAX_VELOCITY, MAX_PROBABILITY
+        return min(max(velocity, 1), MAX_VELOCITY), min(max(probability, 1), MAX_PROBABILITY)
+
     def toggle_step(self, inst, col):
-        self.sequence[inst][col] = 1 - self.sequence[inst][col]
-        self.update_button_color(inst, col)
+        step = self.page_start + col
+        if step >= self.pattern.length:
+            return
+        velocity, probability = self.brush()
+        on = self.pattern.toggle(inst, step, velocity, probability)
+        self.update_button_color(inst, col, active_step=self.playhead.shown)
+        self.rebuild_snapshot()
+        self.autosave_edit()
+        if self.renderer.mix is not None:
+            self.renderer.toggle_step(inst, step, on, velocity / MAX_VELOCITY)
+            self._queue_rendered()
+
+    def edit_step(self, inst, col):
+        """Botão direito: liga o passo (ou atualiza o já ligado) com a velocity/probabilidade atuais."""
+        step = self.page_start + col
+        if step >= self.pattern.length:
+            return
+        velocity, probability = self.brush()
+        if self.pattern.get(inst, step) == (velocity, probability):
+            return
+        was_on = self.pattern.has(inst, step)
+        self.pattern.set(inst, step, velocity, probability)
+        self.update_button_color(inst, col, active_step=self.playhead.shown)
+        self.rebuild_snapshot()
+        self.autosave_edit()
+        if self.renderer.mix is not None:
+            if was_on:
+                self.renderer.toggle_step(inst, step, False)
+            self.renderer.toggle_step(inst, step, True, velocity / MAX_VELOCITY)
+            self._queue_rendered()
+
+    def on_length_change(self):
+        try:
+            length = min(max(int(self.pattern_steps.get()), 1), MAX_PATTERN_STEPS)
+        except (ValueError, tk.TclError):
+            return
+        if length == self.pattern.length:
+            return
+        self.pattern.resize(length)
+        self.show_page(min(self.page, self.pattern.bars - 1))
+        self.rebuild_snapshot()
+        self.autosave_edit()
+
+    def show_page(self, page):
+        """Mostra o compasso `page` do padrão na grade."""
+        page = min(max(page, 0), self.pattern.bars - 1)
+        if page != self.page:
+            self.page = page
+            # o destaque fica na coluna antiga; o follow do playhead recoloca na página nova
+            self.playhead.shown = -1
+        self.update_page_label()
+        self.redraw_grid()
+
+    def update_page_label(self):
+        self.page_label.config(text=f"Compasso {self.page + 1}/{self.pattern.bars}")
+
+    def redraw_grid(self):
+        """Repinta a página visível da grade (só em edições do usuário, nunca por passo)."""
+        for inst in TRACKS:
+            for col in range(GRID_COLUMNS):
+                self.update_button_color(inst, col, active_step=self.playhead.shown)
+
+    def step_color(self, inst, step):
+        if step >= self.pattern.length:
+            return COLOR_OUTSIDE
+        hit = self.pattern.get(inst, step)
+        if hit is None:
+            return "white"
+        return "green" if hit == (MAX_VELOCITY, MAX_PROBABILITY) else COLOR_SOFT
 
     def update_button_color(self, inst, col, active_step=None):
         btn = self.step_buttons[inst][col]
         if col == active_step:
             btn.config(bg="red")
         else:
-            btn.config(bg="green" if self.sequence[inst][col] else "white")
+            btn.config(bg=self.step_color(inst, self.page_start + col))
+
+    # ---------------- Mix pré-renderizado ---------------- #
+    def selected_timbre(self, inst):
+        """ID (do catálogo) do timbre escolhido para o track."""
+        try:
+            return int(self.timbre_vars[inst].get())
+        except (ValueError, tk.TclError):
+            return catalog.default_id(inst)
+
+    def voice(self, inst, timbre_id=None):
+        """PCM float32 do timbre `timbre_id` (ou do selecionado) do track, decodificado sob demanda."""
+        timbre = catalog.timbre(inst, self.selected_timbre(inst) if timbre_id is None else timbre_id)
+        if timbre is None or sample_bank is None:
+            return None
+        return sample_bank.get(timbre.category, timbre.name)
+
+    def click_voice(self):
+        """PCM do clique do metrônomo (None enquanto o áudio não sobe)."""
+        return sample_bank.get(*CLICK_SAMPLE) if sample_bank is not None else None
+
+    def voice_onset(self, inst, timbre_id=None):
+        """Frames do início do timbre até o ataque (0 sem variante preparada)."""
+        timbre = catalog.timbre(inst, self.selected_timbre(inst) if timbre_id is None else timbre_id)
+        return sample_onset(timbre.category, timbre.name) if timbre is not None else 0
+
+    def rebuild_snapshot(self):
+        """Compila o estado da UI num PatternSnapshot e publica para o loop."""
+        voices = {inst: self.voice(inst) for inst in TRACKS}
+        click = self.click_voice() if self.metronome_enabled.get() else None
+        try:
+            bpm = int(self.bpm.get())
+        except (ValueError, tk.TclError):
+            return
+        try:
+            swing = swing_delay(int(self.swing.get()))
+            humanize = min(max(int(self.humanize.get()), 0), HUMANIZE_MAX_MS) / 1000
+        except (ValueError, tk.TclError):
+            swing, humanize = self.snapshot.swing, self.snapshot.humanize
+        onsets = {inst: self.voice_onset(inst) for inst in TRACKS}
+        self.snapshot = compile_pattern(self.pattern, voices, bpm, self.metronome_enabled.get(), click,
+                                        self.snapshot.version + 1, onsets, sample_onset(*CLICK_SAMPLE),
+                                        swing, humanize)
+        # o loop pode estar dormindo até um passo que deixou de ser o próximo com som
+        self.wake_event.set()
+        if self.is_playing and self.rendered_playback and (
+                bpm != self.renderer.bpm or self.pattern.length != self.renderer.num_steps):
+            self.render_groove()
+
+    def track_chains(self):
+        """TrackChain de cada track (na ordem de TRACKS, que é o bus dos hits) a partir dos spinboxes."""
+        chains = []
+        for inst in TRACKS:
+            try:
+                gain = min(max(int(self.track_gain[inst].get()), TRACK_GAIN_MIN), TRACK_GAIN_MAX)
+                pan = min(max(int(self.track_pan[inst].get()), -100), 100) / 100
+                cutoff = int(self.track_tone[inst].get()) or None
+            except (ValueError, tk.TclError):
+                gain, pan, cutoff = 0, 0.0, None
+            chains.append(TrackChain(gain, pan, cutoff))
+        return chains
+
+    def update_track_chains(self):
+        """Resolve as cadeias em coeficientes aqui e entrega ao mixer, que só troca a referência."""
+        if not self.audio_ready.is_set():
+            return
+        engine.set_buses(TrackBuses(self.track_chains(), engine.samplerate, engine.channels, engine.blocksize))
+
+    def render_groove(self):
+        """Renderiza o compasso inteiro a partir do estado atual da UI."""
+        voices = {inst: self.voice(inst) for inst in TRACKS}
+        click = self.click_voice()
+        groove = self.pattern.to_groove()
+        self.renderer.render(groove["sequence"], voices, self.bpm.get(), click, self.metronome_enabled.get(),
+                             groove.get("velocity"), self.pattern.length)
+        self._queue_rendered()
+
+    def _queue_rendered(self):
+        """Publica uma cópia do mix atual; o mixer troca o loop na próxima volta."""
+        # cópia: o renderer edita o mix no lugar, e o callback não pode ver meia edição
+        self.rendered_pcm = self.renderer.mix.copy()
+        if self.is_playing and self.rendered_playback:
+            engine.set_loop("groove", self.rendered_pcm)
+
+    def on_timbre_change(self, inst):
+        label = self.timbre_labels[inst].get()
+        timbre = next((t for t in catalog.timbres(inst) if t.label == label), None)
+        if timbre is None:
+            return
+        self.similar_chain.pop(inst, None)
+        self.select_timbre(inst, timbre)
+
+    def select_timbre(self, inst, timbre):
+        if sample_bank is not None:
+            sample_bank.prewarm([(timbre.category, timbre.name)])
+        self.timbre_labels[inst].set(timbre.label)
+        # o trace do IntVar republica o snapshot com o timbre novo
+        self.timbre_vars[inst].set(timbre.id)
+        self.draw_preview(inst)
+        if self.renderer.mix is not None:
+            self.renderer.set_voice(inst, self.voice(inst))
+            self._queue_rendered()
+
+    def similar_timbre(self, inst):
+        """Troca pelo timbre mais parecido com o de partida ainda não visitado (cliques seguidos descem a lista).
+
+        A consulta ao índice e a decodificação do sample rodam numa thread;
+        a troca volta para o Tk com after().
+        """
+        current = catalog.timbre(inst, self.selected_timbre(inst))
+        if current is None:
+            return
+        anchor, visited = self.similar_chain.get(inst, (None, []))
+        if anchor is None or visited[-1] != current.id:
+            # escolha manual (ou primeira vez): a busca parte do timbre atual
+            anchor, visited = current, [current.id]
+
+        def run():
+            try:
+                near = get_store().nearest_samples(anchor.category, anchor.name, limit=len(visited) + 8)
+            except Exception as e:
+                logging.warning("Busca de timbre parecido falhou: %s", e)
+                near = []
+            for category, name, _dist in near:
+                timbre = catalog.by_file(category, name)
+                if timbre is not None and timbre.track == inst and timbre.id not in visited:
+                    chain = visited
+                    break
+            else:
+                # lista esgotada (ou índice ainda vazio): volta ao de partida
+                timbre, chain = anchor, []
+            if sample_bank is not None:
+                # decodifica aqui; select_timbre encontra o PCM já no cache
+                sample_bank.get(timbre.category, timbre.name)
+            self.root.after(0, lambda: self._apply_similar(inst, current.id, anchor, chain, timbre))
+
+        threading.Thread(target=run, name="similar-timbre", daemon=True).start()
+
+    def _apply_similar(self, inst, from_id, anchor, visited, timbre):
+        if self.selected_timbre(inst) != from_id:
+            # o timbre mudou enquanto a busca rodava (outro clique ou escolha manual)
+            return
+        self.similar_chain[inst] = (anchor, visited + [timbre.id])
+        self.select_timbre(inst, timbre)
+
+    def draw_preview(self, inst):
+        """Desenha a miniatura do timbre selecionado (vazia enquanto o sample não foi analisado)."""
+        canvas = self.timbre_previews.get(inst)
+        timbre = catalog.timbre(inst, self.selected_timbre(inst))
+        if canvas is None:
+            return
+        canvas.delete("all")
+        row = self.sample_features.get((timbre.category, timbre.name)) if timbre is not None else None
+        if row is None or not row["thumb"]:
+            return
+        mid = PREVIEW_HEIGHT / 2
+        step = PREVIEW_WIDTH / len(row["thumb"])
+        for i, level in enumerate(row["thumb"]):
+            h = max(1.0, level / 255 * mid)
+            canvas.create_line(i * step, mid - h, i * step, mid + h, fill="steelblue")
+        canvas.create_text(PREVIEW_WIDTH - 2, 1, anchor="ne", font=("TkDefaultFont", 7),
+                           text=f"{row['duration']:.2f}s {row['centroid'] / 1000:.1f}k")
+
+    def refresh_previews(self):
+        for inst in TRACKS:
+            self.draw_preview(inst)
+
+    def on_metronome_toggle(self):
+        if self.renderer.mix is not None:
+            self.renderer.set_metronome(self.metronome_enabled.get())
+            self._queue_rendered()
 
     # ---------------- Loop principal (drum machine) ---------------- #
     def loop(self):
+        # cada passo vence num instante absoluto desde o início do transporte;
+        # o trabalho feito em um passo não empurra os seguintes (sem drift)
+        # nada de variáveis Tk aqui: tudo vem do PatternSnapshot publicado pela UI
+        # só acorda nos passos com som e nas viradas de compasso; o playhead segue o relógio sozinho
+        sync = self.music_sync
+        sr = engine.samplerate
+        lead = schedule_ahead()
+        if sync is not None:
+            from beat_sync import BeatGridClock
+            # passos na grade de batidas da música, que toca no mesmo stream
+            clock = BeatGridClock(sync[0], stretch=sync[1], lead=lead)
+            clock.start(now=time.perf_counter() + max(MUSIC_PREROLL, lead))
+        else:
+            clock = StepClock(lead=lead)
+            # o passo 0 também é entregue com a antecedência inteira
+            clock.start(self.snapshot.step_duration, now=time.perf_counter() + lead)
+        self.clock = clock
+        self.playhead.calls_per_second()
+        rendered = self.rendered_playback and self.rendered_pcm is not None and sync is None
+        # passo -> frame da saída: a grade sai do relógio, não do instante em que a thread acordou
+        origin_time = clock.due_time(0)
+        origin_frame = engine.frame_at(origin_time)
+        late_before = engine.late
+        monitor = self.perf
+        rng = random.Random()
+        # nenhum hit sai antes do que a antecedência do relógio cobre
+        max_early = int(max_early_ms() / 1000 * sr)
+        if sync is not None:
+            music_frame = origin_frame + int(round((clock.music_origin - origin_time) * sr))
+            try:
+                engine.play_music(self.music_file, at=music_frame)
+            except Exception as e:
+                logging.exception("Erro tocando música: %s", e)
         while not self.stop_event.is_set():
-            beat_duration = 60 / self.bpm.get() / 4
-            for step in range(NUM_STEPS):
-                if self.stop_event.is_set():
-                    break
-                for inst, pattern in self.sequence.items():
-                    if pattern[step] == 1 and samples.get(inst):
-                        try:
-                            idx_str = self.timbre_vars[inst].get().split()[-1]
-                            idx = int(idx_str) - 1
-                            if 0 <= idx < len(samples[inst]):
-                                samples[inst][idx].play()
-                        except Exception as e:
-                            logging.exception("Erro ao tocar %s: %s", inst, e)
-
-                if self.metronome_enabled.get() and self.click_sound:
-                    if step % 4 == 0:
-                        try:
-                            self.click_sound.play()
-                        except Exception as e:
-                            logging.exception("Erro tocando click: %s", e)
-
-                self.highlight_step(step)
-                time.sleep(beat_duration)
-            self.highlight_step(-1)
+            # limpo antes de ler o snapshot: uma edição depois daqui interrompe a espera
+            self.wake_event.clear()
+            snap = self.snapshot
+            target = clock.next_step + steps_to_next(snap, clock.next_step % snap.length)
+            tick = clock.wait_next(self.wake_event, until=target)
+            if tick is None:
+                # parada ou padrão novo: reavalia o próximo passo a visitar
+                continue
+            t_wake = time.perf_counter()
+            snap = self.snapshot
+            step = tick.step % snap.length
+            if step % STEPS_PER_BAR == 0:
+                # andamento só muda na virada do compasso, como antes
+                clock.set_step_duration(snap.step_duration)
+            at = origin_frame + int(round((tick.due - origin_time) * sr))
+            if rendered:
+                # o compasso inteiro já está no buffer: o mixer o repete sozinho
+                if tick.step == 0:
+                    engine.play(self.rendered_pcm, at=at, loop=True, tag="groove")
+            else:
+                hits = snap.hits.get(step, ())
+                t_trigger = time.perf_counter()
+                if snap.swing and step % 2:
+                    # atraso em fração do passo real (na grade da música os passos variam)
+                    at += int(round(snap.swing * (clock.due_time(tick.step + 1) - tick.due) * sr))
+                jitter = snap.humanize * sr
+                for pcm, gain, probability, onset, bus in hits:
+                    if probability >= MAX_PROBABILITY or rng.random() * MAX_PROBABILITY < probability:
+                        # começa `onset` frames antes para o ataque cair no passo; o click fica na grade
+                        offset = int(rng.uniform(-jitter, jitter)) if jitter and bus is not None else 0
+                        engine.play(pcm, gain=gain, at=at + max(offset - onset, -max_early), bus=bus)
+                monitor.record("trigger", t_trigger, len(hits), (time.perf_counter() - t_trigger) * 1000)
+
+            monitor.record("step", tick.due, tick.step, tick.lateness * 1000,
+                           (time.perf_counter() - t_wake) * 1000, len(engine.voices),
+                           clock.late_steps, clock.dropped_steps)
+        logging.debug("Playhead: %.0f chamadas Tk/s durante a reprodução", self.playhead.calls_per_second())
+        if clock.late_steps or clock.dropped_steps:
+            logging.info("Sequenciador parado: %d passos atrasados, %d descartados",
+                         clock.late_steps, clock.dropped_steps)
+        if sync is not None:
+            self.report_alignment(clock.alignment_report(), engine.late - late_before)
+        self.highlight_step(-1)
+
+    def report_alignment(self, report, late_hits):
+        """Erro de alinhamento com a música: fase corrigida por compasso e hits que saíram atrasados."""
+        text = (f"Alinhamento: {report['bars']} compassos, correção média {report['correction_mean_ms']:.1f} ms "
+                f"(máx {report['correction_max_ms']:.1f} ms), {late_hits} hits atrasados")
+        logging.info("%s; %d passos atrasados, %d descartados", text,
+                     report["late_steps"], report["dropped_steps"])
+        self.root.after(0, lambda: self.music_status.config(text=text))
 
     def highlight_step(self, step):
-        def update():
-            for inst in INSTRUMENTS.keys():
-                for col in range(NUM_STEPS):
-                    self.update_button_color(inst, col, active_step=step if col == step else None)
-        self.root.after(0, update)
+        # coalescido pelo PlayheadRenderer: no máximo um after por quadro
+        self.playhead.request(step)
+
+    def playhead_column(self):
+        """Coluna da página visível no passo que está soando (-1 fora da página ou parado).
+
+        Lido pelo PlayheadRenderer a cada quadro: o loop de áudio dorme nos
+        passos vazios, então a posição vem do relógio, não de avisos por passo.
+        """
+        clock = self.clock
+        if not self.is_playing or clock is None:
+            return -1
+        step = clock.step_at(time.perf_counter())
+        if step < 0:
+            return -1
+        col = step % self.snapshot.length - self.page_start
+        return col if 0 <= col < GRID_COLUMNS else -1
 
     # ---------------- Controles ---------------- #
-    def start_loop(self):
-        if self.is_playing:
+    def start_loop(self, music_sync=None):
+        if self.is_playing or not self.require_audio():
             return
         self.is_playing = True
         self.stop_event.clear()
+        self.music_sync = music_sync
+        self.rendered_playback = self.render_mode.get()
+        if self.rendered_playback:
+            self.render_groove()
+        self.clock = None
         self.thread = threading.Thread(target=self.loop, daemon=True)
         self.thread.start()
+        self.playhead.follow(self.playhead_column)
 
     def stop(self):
         self.stop_event.set()
+        self.wake_event.set()
         self.is_playing = False
+        self.playhead.follow(None)
         self.highlight_step(-1)
-        try:
-            pygame.mixer.music.stop()
-        except Exception:
-            pass
+        engine.stop_tag("groove")
+        engine.stop_music()
 
     # ---------------- Music Functions ---------------- #
     def import_music(self):
         file_path = filedialog.askopenfilename(filetypes=[("Audio files", "*.mp3 *.wav *.ogg")])
         if not file_path:
             return
-        self.music_file = file_path
         try:
-            pygame.mixer.music.load(self.music_file)
-            bpm = self.detect_bpm(self.music_file)
-            messagebox.showinfo("Música carregada", f"Arquivo carregado!\nBPM estimado: {bpm}")
+            import soundfile as sf
+            sf.info(file_path)   # valida o formato antes de aceitar o arquivo
         except Exception as e:
             logging.exception("Erro carregando música: %s", e)
             messagebox.showerror("Erro", f"Não foi possível carregar o arquivo: {e}")
+            return
+        self.music_file = file_path
+        self.music_analysis = None
+        self.detect_bpm(file_path)
 
     def play_music_only(self):
+        if not self.require_audio():
+            return
         if not self.music_file:
             messagebox.showwarning("Aviso", "Nenhuma música importada!")
             return
-        pygame.mixer.music.play()
+        self._start_music()
+
+    def _start_music(self):
+        try:
+            engine.play_music(self.music_file)
+        except Exception as e:
+            logging.exception("Erro tocando música: %s", e)
+            messagebox.showerror("Erro", f"Não foi possível tocar o arquivo: {e}")
+            return False
+        return True
 
     def play_music_with_instruments(self):
+        if not self.require_audio():
+            return
         if not self.music_file:
             messagebox.showwarning("Aviso", "Nenhuma música importada!")
             return
-        pygame.mixer.music.play()
-        self.start_loop()
-
+        analysis = self.music_analysis
+        if analysis is None or len(analysis["beats"]) < 2:
+            # sem grade de batidas ainda: toca sem travar, como antes
+            logging.info("Música + instrumentos sem grade de batidas (análise pendente)")
+            if self._start_music():
+                self.start_loop()
+            return
+        self.stop()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.bpm.set(int(round(analysis["bpm"])))
+        self.update_bpm_label()
+        # a música é disparada pela thread do loop, no mesmo frame de referência da bateria
+        self.start_loop(music_sync=(analysis["beats"], self.music_stretch.get()))
+
+    # ---------------- Análise de BPM ---------------- #
     def detect_bpm(self, file_path):
-        try:
-            import librosa
-            y, sr = librosa.load(file_path, mono=True)
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            return int(tempo)
-        except Exception as e:
-            logging.info("Detect BPM failed: %s", e)
-            return 0
+        """Dispara a análise em segundo plano; a UI segue respondendo enquanto isso."""
+        if self.bpm_job is not None:
+            self.bpm_job.cancel()
+        self.music_status.config(text="Analisando BPM...")
+        from bpm_analysis import BpmAnalysis
+        self.bpm_job = BpmAnalysis(file_path, DB_FILE,
+                                   on_progress=self._on_bpm_progress,
+                                   on_estimate=self._on_bpm_estimate,
+                                   on_result=self._on_bpm_result,
+                                   on_error=self._on_bpm_error).start()
+        job = self.bpm_job
+        self.root.after(100, lambda: self._poll_bpm(job))
+
+    def _poll_bpm(self, job):
+        if job is self.bpm_job and job.poll():
+            self.root.after(100, lambda: self._poll_bpm(job))
+
+    def _on_bpm_progress(self, stage, frac):
+        self.music_status.config(text=f"BPM: {stage} {frac:.0%}")
+
+    def _on_bpm_estimate(self, result):
+        # primeira estimativa (começo da música); o refinamento continua
+        self.music_analysis = result
+        self.music_status.config(text=f"BPM ~{result['bpm']:.0f} (refinando...)")
+
+    def _on_bpm_result(self, result):
+        self.music_analysis = result
+        self.bpm_job = None
+        self.music_status.config(text=f"BPM {result['bpm']:.1f}")
+
+    def _on_bpm_error(self, message):
+        self.bpm_job = None
+        logging.info("Detect BPM failed: %s", message)
+        self.music_status.config(text="BPM indisponível")
 
     # ---------------- JSON / DB ---------------- #
+    def set_timbre(self, inst, value):
+        """Seleciona o timbre pelo ID (ou rótulo antigo "Caixa 3") do groove carregado."""
+        timbre = catalog.timbre(inst, groove_codec.timbre_index(value))
+        if inst in self.timbre_vars and timbre is not None:
+            self.timbre_labels[inst].set(timbre.label)
+            self.timbre_vars[inst].set(timbre.id)
+            self.draw_preview(inst)
+
+    def current_timbres(self):
+        return {inst: self.selected_timbre(inst) for inst in self.timbre_vars}
+
+    def apply_groove(self, groove):
+        """Carrega um groove canônico (groove_codec) na grade e nos timbres."""
+        self.pattern = Pattern.from_groove(groove, TRACKS)
+        self.pattern_steps.set(self.pattern.length)
+        for inst, val in groove.get("timbres", {}).items():
+            self.set_timbre(inst, val)
+        self.show_page(0)
+        self.rebuild_snapshot()
+        self.autosave_edit()
+        if self.renderer.mix is not None:
+            self.render_groove()
+
     def save_groove(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".json")
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Groove JSON", "*.json"), ("Groove binário", "*.grv")])
         if not file_path:
             return
-        data = {"sequence": self.sequence,
-                "timbres": {inst: self.timbre_vars[inst].get() for inst in self.timbre_vars}}
-        with open(file_path, "w") as f:
-            json.dump(data, f)
-        messagebox.showinfo("Sucesso", "Groove salvo em JSON!")
+        groove = self.pattern.to_groove()
+        if file_path.lower().endswith(".grv"):
+            with open(file_path, "wb") as f:
+                f.write(groove_codec.encode(groove["sequence"], self.current_timbres(), groove.get("velocity"),
+                                            groove.get("probability"), groove["length"]))
+        else:
+            with open(file_path, "w") as f:
+                f.write(groove_codec.to_json({**groove, "timbres": self.current_timbres()}))
+        messagebox.showinfo("Sucesso", "Groove salvo em arquivo!")
 
     def load_groove(self):
-        file_path = filedialog.askopenfilename()
+        file_path = filedialog.askopenfilename(filetypes=[("Grooves", "*.json *.grv"), ("Todos", "*.*")])
         if not file_path:
             return
-        with open(file_path, "r") as f:
-            data = json.load(f)
-        self.sequence = data["sequence"]
-        for inst, val in data["timbres"].items():
-            self.timbre_vars[inst].set(val)
-        for inst in INSTRUMENTS.keys():
-            for col in range(NUM_STEPS):
-                self.update_button_color(inst, col)
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        try:
+            groove = groove_codec.decode(raw) if groove_codec.is_binary(raw) else groove_codec.from_json(raw)
+        except ValueError as e:
+            logging.exception("Erro lendo groove %s: %s", file_path, e)
+            messagebox.showerror("Erro", f"Arquivo de groove inválido: {e}")
+            return
+        self.apply_groove(groove)
+
+    def export_audio(self):
+        """Renderiza o groove atual (e, se pedido, o looper) para WAV/FLAC em segundo plano."""
+        if not self.require_audio():
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".wav", filetypes=[("WAV", "*.wav"), ("FLAC", "*.flac")])
+        if not file_path:
+            return
+        bars = simpledialog.askinteger("Exportar áudio", "Quantas voltas do padrão?",
+                                       initialvalue=4, minvalue=1, maxvalue=9999)
+        if not bars:
+            return
+        takes = [t["take"].data for t in self.tracks if not t["take"].empty]
+        if takes and not messagebox.askyesno("Exportar áudio", "Mixar as pistas do looper?"):
+            takes = []
+        # estado copiado aqui: a thread de exportação não lê variáveis Tk
+        groove = {**self.pattern.to_groove(), "timbres": self.current_timbres()}
+        bpm, metronome = self.bpm.get(), self.metronome_enabled.get()
+
+        def run():
+            try:
+                from groove_export import export_groove
+                export_groove(file_path, groove, bpm, bars, sample_bank, engine.samplerate,
+                              loops=takes, metronome=metronome, catalog=catalog, variants=sample_variants)
+                self.root.after(0, lambda: messagebox.showinfo("Sucesso", f"Áudio exportado em {file_path}"))
+            except Exception as e:
+                logging.exception("Erro exportando áudio: %s", e)
+                self.root.after(0, lambda: messagebox.showerror("Erro", f"Não foi possível exportar: {e}"))
+
+        threading.Thread(target=run, name="export-audio", daemon=True).start()
 
     def save_to_db(self):
         logging.debug("Chamando save_to_db()")
@@ -496,45 +1319,93 @@ class DrumMachine:
             logging.warning("Nome do groove não informado. Cancelando operação.")
             return
         try:
-            save_groove(name, self.bpm.get(),
-                        {inst: self.sequence[inst].copy() for inst in INSTRUMENTS.keys()},
-                        {inst: self.timbre_vars[inst].get() for inst in self.timbre_vars})
+            groove = self.pattern.to_groove()
+            save_groove(name, self.bpm.get(), groove["sequence"], self.current_timbres(),
+                        groove.get("velocity"), groove.get("probability"))
             messagebox.showinfo("Sucesso", f"Groove '{name}' salvo no banco!")
             self.refresh_db_list()
         except Exception as e:
             logging.exception("Erro ao salvar no DB: %s", e)
             messagebox.showerror("Erro", f"Não foi possível salvar o groove: {e}")
 
+    def _db_filters(self):
+        try:
+            return self.db_search_var.get().strip(), int(self.db_bpm_min.get()), int(self.db_bpm_max.get())
+        except (ValueError, tk.TclError):
+            return self.db_search_var.get().strip(), None, None
+
+    def _append_db_rows(self, rows):
+        for gid, name, bpm, *_ in rows:
+            self.db_list.insert("end", f"[{gid}] {name} - {bpm} BPM")
+            self.db_ids.append(gid)
+
     def refresh_db_list(self):
+        """Recomeça a lista do zero com os filtros atuais (só a primeira página)."""
+        self.db_list.delete(0, "end")
+        self.db_ids = []
+        self.db_cursor = None
+        self.load_next_db_page()
+
+    def load_next_db_page(self):
+        text, bpm_min, bpm_max = self._db_filters()
         try:
-            grooves = load_all_grooves()
-            self.db_list["values"] = [f"[{gid}] {name} - {bpm} BPM" for gid, name, bpm in grooves]
+            rows, self.db_cursor = search_grooves(text, bpm_min, bpm_max, after=self.db_cursor)
         except Exception as e:
             logging.exception("Erro ao listar grooves: %s", e)
+            self.db_cursor = None
+            return
+        self._append_db_rows(rows)
+
+    def on_db_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        if self.db_cursor is not None and float(last) > 0.9:
+            self.load_next_db_page()
+
+    def on_db_search(self, event=None):
+        # espera a digitação parar antes de consultar o banco
+        if self.db_search_job is not None:
+            self.root.after_cancel(self.db_search_job)
+        self.db_search_job = self.root.after(250, self._run_db_search)
+
+    def _run_db_search(self):
+        self.db_search_job = None
+        self.refresh_db_list()
+
+    def show_similar(self):
+        """Lista os grooves salvos mais parecidos com a grade atual."""
+        _text, bpm_min, bpm_max = self._db_filters()
+        try:
+            rows = similar_grooves(self.pattern.to_groove()["sequence"], bpm_min=bpm_min, bpm_max=bpm_max)
+        except Exception as e:
+            logging.exception("Erro buscando grooves parecidos: %s", e)
+            return
+        self.db_list.delete(0, "end")
+        self.db_ids = []
+        self.db_cursor = None
+        self._append_db_rows(rows)
+
+    def selected_groove_id(self):
+        selection = self.db_list.curselection()
+        if not selection:
+            return None
+        return self.db_ids[selection[0]]
 
     def load_from_db(self):
         logging.debug("Chamando load_from_db()")
-        value = self.db_list.get()
-        if not value:
+        groove_id = self.selected_groove_id()
+        if groove_id is None:
             return
-        groove_id = int(value.split("]")[0][1:])
         data, bpm = load_groove_by_id(groove_id)
         if not data:
             logging.debug("Nenhum dado retornado do DB para id %s", groove_id)
             return
-        self.sequence = {inst: data["sequence"][inst].copy() for inst in INSTRUMENTS.keys()}
-        for inst, val in data["timbres"].items():
-            self.timbre_vars[inst].set(val)
-        for inst in INSTRUMENTS.keys():
-            for col in range(NUM_STEPS):
-                self.update_button_color(inst, col)
+        self.apply_groove(data)
         self.bpm.set(bpm)
 
     def delete_from_db(self):
-        value = self.db_list.get()
-        if not value:
+        groove_id = self.selected_groove_id()
+        if groove_id is None:
             return
-        groove_id = int(value.split("]")[0][1:])
         delete_groove(groove_id)
         messagebox.showinfo("Sucesso", "Groove deletado!")
         self.refresh_db_list()
@@ -543,19 +1414,15 @@ class DrumMachine:
         preset_name = self.preset_var.get()
         if preset_name not in PRESETS:
             return
-        preset = PRESETS[preset_name]
-        for inst in INSTRUMENTS.keys():
-            self.sequence[inst] = preset.get(inst, [0]*NUM_STEPS).copy()
-        for inst in INSTRUMENTS.keys():
-            for col in range(NUM_STEPS):
-                self.update_button_color(inst, col)
+        self.apply_groove({"sequence": PRESETS[preset_name]})
 
     def update_bpm_label(self, event=None):
         self.bpm_label.config(text=str(self.bpm.get()))
 
 # ---------------- MAIN ---------------- #
 if __name__ == "__main__":
-    init_db()
+    import multiprocessing
+    multiprocessing.freeze_support()
     print("DB file location:", os.path.abspath(DB_FILE))
     root = tk.Tk()
     app = DrumMachine(root)
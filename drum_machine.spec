@@ -1,11 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+from sample_pack import build_pack
+
+# PCM pré-decodificado: o exe abre por memmap em vez de decodificar os WAVs a cada execução
+build_pack('samples', os.path.join('build', 'sample_pack'))
 
 
 a = Analysis(
     ['drum_machine.py'],
     pathex=[],
     binaries=[],
-    datas=[('samples', 'samples.')],
+    datas=[('samples', 'samples.'), (os.path.join('build', 'sample_pack'), 'sample_pack')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
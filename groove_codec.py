@@ -0,0 +1,250 @@
+# groove_codec.py
+"""Codificação binária versionada de grooves (bitmask ou lista de eventos + timbres por índice).
+
+Layout (little-endian):
+
+    cabeçalho    "GRV" | versão u8 | n_tracks u8 | n_steps u16 | flags u8
+    por track    len(nome) u8 | nome utf-8 | timbre u8 (0xFF = nenhum)
+    padrões      denso: n_tracks * ceil(n_steps / 8) bytes (np.packbits, MSB primeiro)
+                 esparso (FLAG_SPARSE): n_eventos u32 | passos u16[n] | tracks u8[n]
+    velocity     u8 por passo (denso) ou por evento (esparso), só com FLAG_VELOCITY
+    probability  idem, só com FLAG_PROBABILITY (versão 2)
+
+`encode` escolhe o layout menor: a grade de 16 passos continua em bitmask
+(e na versão 1, byte a byte igual à de antes); padrões longos e esparsos
+ficam em lista de eventos, com custo proporcional ao número de hits.
+
+O groove "canônico" em memória é um dict com `sequence` ({track: [0/1, ...]}),
+`timbres` ({track: índice base 0}) e, opcionalmente, `velocity`,
+`probability` ({track: [valor por passo, 0 = padrão]}) e `length`.
+"""
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"GRV"
+VERSION = 2
+VERSIONS = (1, 2)
+FLAG_VELOCITY = 0x01
+FLAG_SPARSE = 0x02
+FLAG_PROBABILITY = 0x04
+NO_TIMBRE = 0xFF
+JSON_FORMAT = 2
+
+_HEADER = struct.Struct("<3sBBHB")
+_COUNT = struct.Struct("<I")
+# byte -> 8 passos (MSB primeiro); evita o custo fixo do NumPy em padrões pequenos
+_BITS = [tuple((b >> (7 - i)) & 1 for i in range(8)) for b in range(256)]
+
+
+class GrooveFormatError(ValueError):
+    """Blob/JSON que não é um groove válido."""
+
+
+def timbre_index(value):
+    """Índice base 0 a partir de um int ou do rótulo antigo da UI ("Caixa 3" -> 2)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    try:
+        return int(str(value).split()[-1]) - 1
+    except (ValueError, IndexError):
+        return None
+
+
+def step_value(value):
+    """Velocity/probability de um passo vindo do JSON; nulo ou não numérico vira 0 (padrão)."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def normalize(data):
+    """Groove canônico a partir de um dict JSON (formato antigo ou novo)."""
+    try:
+        sequence = {inst: [1 if s else 0 for s in steps] for inst, steps in data["sequence"].items()}
+    except (KeyError, AttributeError, TypeError) as e:
+        raise GrooveFormatError(f"groove sem 'sequence' válido: {e}")
+    timbres = {inst: timbre_index(v) for inst, v in (data.get("timbres") or {}).items()}
+    groove = {"sequence": sequence, "timbres": timbres}
+    try:
+        for key in ("velocity", "probability"):
+            if data.get(key):
+                groove[key] = {inst: [step_value(v) for v in vals or []] for inst, vals in data[key].items()}
+        if data.get("length"):
+            groove["length"] = int(data["length"])
+    except (AttributeError, TypeError, ValueError) as e:
+        raise GrooveFormatError(f"groove com campos inválidos: {e}")
+    return groove
+
+
+def _dense(values, names, n_steps):
+    """{track: [valor por passo]} -> matriz u8 (n_tracks, n_steps)."""
+    out = np.zeros((len(names), n_steps), dtype=np.uint8)
+    for row, name in enumerate(names):
+        vals = (values.get(name) or [])[:n_steps]
+        out[row, :len(vals)] = np.clip(vals, 0, 255)
+    return out
+
+
+def encode(sequence, timbres=None, velocity=None, probability=None, length=None):
+    """Serializa um groove em bytes, no layout (denso ou esparso) que ficar menor."""
+    timbres = timbres or {}
+    names = list(sequence.keys())
+    if len(names) > 255:
+        raise GrooveFormatError("máximo de 255 tracks por groove")
+    n_steps = length or max((len(sequence[n]) for n in names), default=0)
+    if n_steps > 0xFFFF:
+        raise GrooveFormatError("máximo de 65535 passos por groove")
+    steps = np.zeros((len(names), n_steps), dtype=np.uint8)
+    for row, name in enumerate(names):
+        pattern = sequence[name][:n_steps]
+        steps[row, :len(pattern)] = np.asarray(pattern, dtype=np.uint8) != 0
+    # eventos em ordem (passo, track), como no Pattern
+    ev_steps, ev_tracks = np.nonzero(steps.T)
+    n_events = len(ev_steps)
+    row_bytes = (n_steps + 7) // 8
+    sparse = _COUNT.size + 3 * n_events < len(names) * row_bytes
+
+    flags = (FLAG_VELOCITY if velocity else 0) | (FLAG_PROBABILITY if probability else 0)
+    flags |= FLAG_SPARSE if sparse else 0
+    version = 1 if not flags & ~FLAG_VELOCITY else VERSION
+    parts = [_HEADER.pack(MAGIC, version, len(names), n_steps, flags)]
+    for name in names:
+        raw = name.encode("utf-8")
+        idx = timbre_index(timbres.get(name))
+        if idx is None or not 0 <= idx < NO_TIMBRE:
+            idx = NO_TIMBRE
+        parts.append(bytes([len(raw)]) + raw + bytes([idx]))
+    if sparse:
+        parts.append(_COUNT.pack(n_events))
+        parts.append(ev_steps.astype("<u2").tobytes())
+        parts.append(ev_tracks.astype(np.uint8).tobytes())
+    else:
+        parts.append(np.packbits(steps, axis=1).tobytes())
+    for values in (velocity, probability):
+        if values:
+            dense = _dense(values, names, n_steps)
+            parts.append((dense[ev_tracks, ev_steps] if sparse else dense).tobytes())
+    return b"".join(parts)
+
+
+def _need(blob, pos, size, what):
+    """Garante `size` bytes a partir de `pos`; blob truncado vira GrooveFormatError."""
+    if pos + size > len(blob):
+        raise GrooveFormatError(f"blob truncado em {what} (byte {pos}, faltam {pos + size - len(blob)})")
+
+
+def decode(blob):
+    """Bytes -> groove canônico; qualquer blob malformado levanta GrooveFormatError."""
+    blob = bytes(blob)
+    if len(blob) < _HEADER.size:
+        raise GrooveFormatError("blob curto demais")
+    magic, version, n_tracks, n_steps, flags = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise GrooveFormatError("assinatura inválida")
+    if version not in VERSIONS:
+        raise GrooveFormatError(f"versão {version} não suportada")
+
+    pos = _HEADER.size
+    names, timbres = [], {}
+    for _ in range(n_tracks):
+        _need(blob, pos, 1, "nome do track")
+        size = blob[pos]
+        _need(blob, pos + 1, size + 1, "nome do track")
+        try:
+            name = blob[pos + 1:pos + 1 + size].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise GrooveFormatError(f"nome de track inválido: {e}")
+        idx = blob[pos + 1 + size]
+        pos += size + 2
+        names.append(name)
+        timbres[name] = None if idx == NO_TIMBRE else idx
+
+    if flags & FLAG_SPARSE:
+        _need(blob, pos, _COUNT.size, "contagem de eventos")
+        (n_events,) = _COUNT.unpack_from(blob, pos)
+        pos += _COUNT.size
+        _need(blob, pos, 3 * n_events, "eventos")
+        ev_steps = np.frombuffer(blob, dtype="<u2", count=n_events, offset=pos)
+        pos += 2 * n_events
+        ev_tracks = np.frombuffer(blob, dtype=np.uint8, count=n_events, offset=pos)
+        pos += n_events
+        if n_events and (ev_steps.max() >= n_steps or ev_tracks.max() >= n_tracks):
+            raise GrooveFormatError("evento fora da grade (passo ou track além do cabeçalho)")
+        ev_steps, ev_tracks = ev_steps.tolist(), ev_tracks.tolist()
+        sequence = {name: [0] * n_steps for name in names}
+        for step, track in zip(ev_steps, ev_tracks):
+            sequence[names[track]][step] = 1
+    else:
+        row_bytes = (n_steps + 7) // 8
+        _need(blob, pos, n_tracks * row_bytes, "padrões")
+        sequence = {}
+        for name in names:
+            row = []
+            for b in blob[pos:pos + row_bytes]:
+                row.extend(_BITS[b])
+            del row[n_steps:]
+            sequence[name] = row
+            pos += row_bytes
+    groove = {"sequence": sequence, "timbres": timbres}
+    for flag, key in ((FLAG_VELOCITY, "velocity"), (FLAG_PROBABILITY, "probability")):
+        if not flags & flag:
+            continue
+        if flags & FLAG_SPARSE:
+            _need(blob, pos, n_events, key)
+            vals = np.frombuffer(blob, dtype=np.uint8, count=n_events, offset=pos).tolist()
+            pos += n_events
+            dense = {name: [0] * n_steps for name in names}
+            for step, track, v in zip(ev_steps, ev_tracks, vals):
+                dense[names[track]][step] = v
+        else:
+            _need(blob, pos, n_tracks * n_steps, key)
+            vals = np.frombuffer(blob, dtype=np.uint8, count=n_tracks * n_steps, offset=pos)
+            pos += n_tracks * n_steps
+            dense = dict(zip(names, vals.reshape(n_tracks, n_steps).tolist()))
+        groove[key] = dense
+    return groove
+
+
+def signature(sequence, tracks=4, steps=16):
+    """Impressão digital de 64 bits do padrão para busca por similaridade.
+
+    Bit `t * steps + (s % steps)` liga se o track t (nas primeiras `tracks`)
+    tem hit no passo s; padrões longos são dobrados sobre um compasso. O
+    resultado é um inteiro com sinal, no intervalo de um INTEGER do SQLite.
+    """
+    sig = 0
+    for t, pattern in enumerate(list(sequence.values())[:tracks]):
+        for s, on in enumerate(pattern):
+            if on:
+                sig |= 1 << (t * steps + s % steps)
+    return sig - (1 << 64) if sig >= 1 << 63 else sig
+
+
+def hamming(a, b):
+    """Número de bits diferentes entre duas assinaturas."""
+    if a is None or b is None:
+        return 64
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def is_binary(blob):
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:3]) == MAGIC
+
+
+def from_json(text):
+    """Groove canônico a partir do texto JSON (arquivo exportado ou linha antiga do DB)."""
+    return normalize(json.loads(text))
+
+
+def to_json(groove):
+    """Texto JSON do groove canônico, no formato de arquivo atual."""
+    data = {"format": JSON_FORMAT, "sequence": groove["sequence"], "timbres": groove.get("timbres", {})}
+    for key in ("velocity", "probability", "length"):
+        if groove.get(key):
+            data[key] = groove[key]
+    return json.dumps(data)
@@ -0,0 +1,262 @@
+# groove_export.py
+"""Exportação offline de grooves (opcionalmente com o looper) para WAV/FLAC.
+
+Também é o ponto de entrada headless, sem Tk nem placa de som:
+
+    python groove_export.py saida.wav --id 3 --bars 8
+    python groove_export.py saida.flac --json meu_groove.json --bpm 96 --loop loops/pista_1
+    python groove_export.py --batch 1 2 3 --out-dir exports --format flac --jobs 4
+    python groove_export.py --batch all --out-dir exports
+
+O áudio é gerado compasso a compasso (render_engine.stream_groove) e escrito
+em blocos pelo soundfile, então a memória não cresce com o número de compassos.
+"""
+import os
+import re
+import sys
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import groove_codec
+from instruments import load_catalog, CLICK_SAMPLE
+from render_engine import stream_groove, load_wav, as_stereo
+from sample_bank import SampleBank
+from sample_pack import SamplePack
+from sample_prep import open_or_build_variants, variants_dir, resample
+from take_store import StoredTake
+
+DEFAULT_SAMPLES = "samples"
+DEFAULT_PACK_DIR = os.path.join("cache", "sample_pack")
+DEFAULT_CATALOG = os.path.join("cache", "instruments.json")
+DEFAULT_VARIANTS_DIR = os.path.join("cache", "sample_variants")
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BARS = 4
+DEFAULT_NUM_STEPS = 16
+# extensão -> (formato do libsndfile, subtipo)
+FORMATS = {".wav": ("WAV", "PCM_16"), ".flac": ("FLAC", "PCM_16")}
+
+
+def open_bank(samples_root=DEFAULT_SAMPLES, pack_dir=DEFAULT_PACK_DIR, catalog=None):
+    """SampleBank para uso headless (usa o pacote memmap se existir e a listagem do catálogo)."""
+    refs = catalog.sample_refs() if catalog is not None else None
+    return SampleBank(samples_root, pack=SamplePack.open(pack_dir), refs=refs)
+
+
+def open_variants(bank, sample_rate=DEFAULT_SAMPLE_RATE, cache_root=DEFAULT_VARIANTS_DIR):
+    """Variantes preparadas (sample_prep) na taxa da exportação, as mesmas que o app toca."""
+    return open_or_build_variants(bank.pack, bank.root, cache_root, sample_rate)
+
+
+def sample_pcm(bank, category, name, sample_rate=DEFAULT_SAMPLE_RATE, variants=None):
+    """PCM do sample na taxa pedida: variante preparada, view do pacote na mesma taxa ou reamostrado."""
+    if variants is not None and variants.index.get("output_rate") == sample_rate:
+        pcm = variants.get(category, name)
+        if pcm is not None:
+            return pcm
+    path = bank.path(category, name)
+    if path is None:
+        return None
+    import soundfile as sf
+    if sf.info(path).samplerate == sample_rate:
+        return bank.pcm(category, name)
+    return load_wav(path, sample_rate)
+
+
+def groove_voices(bank, catalog, groove, sample_rate=DEFAULT_SAMPLE_RATE, variants=None):
+    """PCM de cada track do groove no timbre salvo (o primeiro do track, se ausente/inválido)."""
+    voices = {}
+    for inst in groove["sequence"]:
+        timbre = catalog.resolve(inst, groove.get("timbres", {}).get(inst))
+        if timbre is not None:
+            voices[inst] = sample_pcm(bank, timbre.category, timbre.name, sample_rate, variants)
+    return voices
+
+
+def write_stream(path, blocks, sample_rate=DEFAULT_SAMPLE_RATE, channels=2):
+    """Escreve os blocos float32 em WAV/FLAC (pela extensão); devolve os frames gravados."""
+    import soundfile as sf
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"formato não suportado: {ext or path} (use .wav ou .flac)")
+    fmt, subtype = FORMATS[ext]
+    frames = 0
+    with sf.SoundFile(path, "w", samplerate=sample_rate, channels=channels, format=fmt, subtype=subtype) as f:
+        for block in blocks:
+            np.clip(block, -1.0, 1.0, out=block)
+            f.write(block)
+            frames += len(block)
+    return frames
+
+
+def export_groove(path, groove, bpm, bars=DEFAULT_BARS, bank=None, sample_rate=DEFAULT_SAMPLE_RATE,
+                  loops=(), metronome=False, tail=True, catalog=None, variants=None):
+    """Renderiza `groove` tocado `bars` vezes em `bpm` e grava em `path`.
+
+    Com o padrão de 16 passos, cada volta é um compasso; padrões longos
+    (`length` ou listas maiores) contam a volta inteira.
+    """
+    catalog = catalog or load_catalog(bank.root if bank else DEFAULT_SAMPLES, DEFAULT_CATALOG)
+    bank = bank or open_bank(catalog=catalog)
+    voices = groove_voices(bank, catalog, groove, sample_rate, variants)
+    click = sample_pcm(bank, *CLICK_SAMPLE, sample_rate, variants) if metronome else None
+    num_steps = (groove.get("length") or max((len(p) for p in groove["sequence"].values()), default=0)
+                 or DEFAULT_NUM_STEPS)
+    blocks = stream_groove(groove["sequence"], voices, bpm, bars, sample_rate, 2, num_steps,
+                           click, metronome, loops, tail, groove.get("velocity"), groove.get("probability"))
+    frames = write_stream(path, blocks, sample_rate)
+    logging.info("Groove exportado em %s (%d voltas de %d passos, %.1fs)", path, bars, num_steps,
+                 frames / sample_rate)
+    return frames
+
+
+def load_groove_file(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return groove_codec.decode(raw) if groove_codec.is_binary(raw) else groove_codec.from_json(raw)
+
+
+def load_loop(path, sample_rate=DEFAULT_SAMPLE_RATE):
+    """PCM estéreo de um loop para mixar: pasta de uma pista do looper (a mixagem das camadas) ou WAV."""
+    if os.path.isdir(path):
+        take = StoredTake(path)
+        if take.empty:
+            raise ValueError(f"pista sem take em {path}")
+        return as_stereo(resample(as_stereo(take.data, take.channels), take.samplerate, sample_rate))
+    return load_wav(path, sample_rate)
+
+
+def safe_filename(name):
+    return re.sub(r"[^\w\-]+", "_", name).strip("_") or "groove"
+
+
+# ---------------- lote (process pool) ---------------- #
+_worker_bank = None
+_worker_catalog = None
+_worker_variants = None
+
+
+def _init_worker(samples_root, pack_dir, sample_rate, db_file):
+    global _worker_bank, _worker_catalog, _worker_variants
+    from db_backend import GrooveStore
+    # só lê os caches: o processo principal já varreu a árvore e preparou as variantes em export_batch
+    store = GrooveStore(db_file)
+    try:
+        _worker_catalog = load_catalog(samples_root, DEFAULT_CATALOG, store)
+    finally:
+        store.close()
+    _worker_bank = open_bank(samples_root, pack_dir, _worker_catalog)
+    _worker_variants = SamplePack.open(variants_dir(DEFAULT_VARIANTS_DIR, sample_rate))
+
+
+def _export_job(job):
+    """Exporta um groove do banco num processo do pool; devolve (id, caminho, frames)."""
+    from db_backend import GrooveStore
+    groove_id, out_path, db_file, bars, sample_rate = job
+    store = GrooveStore(db_file)
+    try:
+        groove, bpm = store.load_by_id(groove_id)
+    finally:
+        store.close()
+    if groove is None:
+        raise LookupError(f"groove {groove_id} não encontrado")
+    return groove_id, out_path, export_groove(out_path, groove, bpm, bars, _worker_bank, sample_rate,
+                                                 catalog=_worker_catalog, variants=_worker_variants)
+
+
+def export_batch(groove_ids, out_dir, db_file, fmt="wav", bars=DEFAULT_BARS, jobs=None,
+                 sample_rate=DEFAULT_SAMPLE_RATE, samples_root=DEFAULT_SAMPLES, pack_dir=DEFAULT_PACK_DIR):
+    """Exporta vários grooves do banco em paralelo; devolve {id: caminho ou exceção}."""
+    from db_backend import GrooveStore
+    store = GrooveStore(db_file)
+    try:
+        names = {gid: name for gid, name, _bpm in store.load_all()}
+        # varre (ou valida) a árvore uma vez aqui, com os IDs de timbre do banco; os workers só leem
+        catalog = load_catalog(samples_root, DEFAULT_CATALOG, store)
+    finally:
+        store.close()
+    if groove_ids is None:
+        groove_ids = sorted(names)
+    open_variants(open_bank(samples_root, pack_dir, catalog), sample_rate)
+    os.makedirs(out_dir, exist_ok=True)
+    jobs_list = [(gid, os.path.join(out_dir, f"{gid:04d}_{safe_filename(names.get(gid, 'groove'))}.{fmt}"),
+                  db_file, bars, sample_rate) for gid in groove_ids]
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(samples_root, pack_dir, sample_rate, db_file)) as pool:
+        futures = {pool.submit(_export_job, job): job[0] for job in jobs_list}
+        for future in as_completed(futures):
+            gid = futures[future]
+            try:
+                results[gid] = future.result()[1]
+            except Exception as e:
+                logging.error("Falha exportando groove %s: %s", gid, e)
+                results[gid] = e
+    return results
+
+
+# ---------------- CLI ---------------- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta grooves para WAV/FLAC sem abrir a interface.")
+    parser.add_argument("output", nargs="?", help="arquivo .wav/.flac (modo de um groove)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--id", type=int, help="ID do groove no banco")
+    source.add_argument("--json", help="groove exportado (.json ou .grv)")
+    source.add_argument("--batch", nargs="+", help="IDs do banco (ou 'all') para exportar em lote")
+    parser.add_argument("--db", default="grooves.db")
+    parser.add_argument("--bpm", type=int, help="BPM (padrão: o do banco; 100 para arquivos)")
+    parser.add_argument("--bars", type=int, default=DEFAULT_BARS,
+                        help="voltas do padrão (compassos, num padrão de 16 passos)")
+    parser.add_argument("--metronome", action="store_true", help="inclui o click do metrônomo")
+    parser.add_argument("--loop", action="append", default=[],
+                        help="pista do looper (loops/pista_N) ou WAV para mixar (repetível)")
+    parser.add_argument("--no-tail", action="store_true", help="corta exatamente no fim do último compasso")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES)
+    parser.add_argument("--pack-dir", default=DEFAULT_PACK_DIR)
+    parser.add_argument("--out-dir", default="exports", help="pasta do modo lote")
+    parser.add_argument("--format", choices=("wav", "flac"), default="wav", help="formato do modo lote")
+    parser.add_argument("--jobs", type=int, help="processos do modo lote (padrão: núcleos da CPU)")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        ids = None if args.batch == ["all"] else [int(x) for x in args.batch]
+        results = export_batch(ids, args.out_dir, args.db, args.format, args.bars, args.jobs,
+                               args.sample_rate, args.samples, args.pack_dir)
+        failed = [gid for gid, r in results.items() if isinstance(r, Exception)]
+        print(f"{len(results) - len(failed)} grooves exportados em {args.out_dir}" +
+              (f"; falharam: {sorted(failed)}" if failed else ""))
+        return 1 if failed else 0
+
+    if not args.output:
+        parser.error("informe o arquivo de saída")
+    from db_backend import GrooveStore
+    store = GrooveStore(args.db)
+    if args.id is not None:
+        groove, bpm = store.load_by_id(args.id)
+        if groove is None:
+            parser.error(f"groove {args.id} não encontrado em {args.db}")
+    else:
+        try:
+            groove, bpm = load_groove_file(args.json), 100
+        except (OSError, ValueError) as e:
+            parser.error(f"não foi possível ler {args.json}: {e}")
+    try:
+        loops = [load_loop(path, args.sample_rate) for path in args.loop]
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(f"não foi possível ler o loop: {e}")
+    catalog = load_catalog(args.samples, DEFAULT_CATALOG, store)
+    bank = open_bank(args.samples, args.pack_dir, catalog)
+    frames = export_groove(args.output, groove, args.bpm or bpm, args.bars, bank, args.sample_rate,
+                           loops, args.metronome, tail=not args.no_tail, catalog=catalog,
+                           variants=open_variants(bank, args.sample_rate))
+    print(f"{args.output}: {frames / args.sample_rate:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging(log_file="")
+    sys.exit(main())
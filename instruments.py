@@ -0,0 +1,321 @@
+# instruments.py
+"""Catálogo de instrumentos montado a partir de uma varredura de `samples/`.
+
+Cada pasta de `samples/` vira um track e cada arquivo de áudio um timbre,
+identificado por um inteiro estável dentro do track: é esse ID que vai para
+a UI, o PatternSnapshot, o banco, o JSON e o .grv. Compartilhado pela UI e
+pela exportação headless.
+
+A varredura fica em cache (JSON com os mtimes das pastas e dos arquivos):
+numa nova execução, pastas com o mesmo mtime não são listadas de novo (mas
+cada arquivo ainda passa por um stat) e só arquivos novos ou alterados são
+lidos para o sha1. Arquivos de mesmo conteúdo dentro
+de um track viram um timbre só.
+
+O cache pode sumir a qualquer momento; os IDs não. Com um GrooveStore, o
+mapa sha1 -> ID fica também no grooves.db (tabela `timbre_ids`), junto dos
+grooves que o usam, e é ele que manda: um cache apagado é refeito com os
+mesmos IDs.
+"""
+import os
+import json
+import logging
+from collections import namedtuple
+
+from sample_bank import SampleRef
+from sample_pack import file_sha1, AUDIO_EXTENSIONS
+
+CATALOG_VERSION = 1
+# o ID vai num u8 no .grv; 0xFF é "sem timbre"
+MAX_TIMBRES = 0xFF
+
+# tracks da grade antiga vêm primeiro, na mesma ordem; os demais em ordem alfabética
+TRACK_ORDER = ("kick", "snare", "hat", "tom")
+
+DISPLAY_NAMES = {
+    "kick": "Bumbo",
+    "snare": "Caixa",
+    "hat": "Hi-hat",
+    "tom": "Tom",
+    "cymbal": "Prato",
+    "percussion": "Percussão",
+    "sfx": "Efeitos",
+}
+
+# lista escrita à mão de antes do catálogo: grooves salvos guardam a posição
+# do timbre nela, então esses arquivos mantêm a posição como ID (o "FL 808
+# Snare.wav" repetido na posição 4 vira um apelido do ID 0)
+LEGACY_TIMBRES = {
+    "kick": ["Attack Kick 15.wav", "Attack Kick 46.wav", "Downstream Kick 04.wav", "FL 808 Kick.wav", "FL 909 Kick Alt.wav", "FL 909 Kick.wav", "FL Basic Kick.wav"],
+    "snare": ["FL 808 Snare.wav", "Attack Snare 03.wav", "Attack Snare 26.wav", "FL Grv Snareclap 30.wav", "FL 808 Snare.wav", "FL 909 Snare.wav", "FL 909 Rim.wav"],
+    "hat": ["Attack Hat 06.wav", "Attack OHat 02.wav"],
+    "tom": ["FL 808 Tom.wav", "FL 909 Tom.wav"],
+}
+
+CLICK_SAMPLE = ("Percussion", "Attack Blip 03.wav")
+
+# id: inteiro estável no track; files: todos os nomes com esse conteúdo (o primeiro é o tocado)
+Timbre = namedtuple("Timbre", "id track category name label sha1 files")
+
+
+def _legacy_ids(track):
+    """{nome: ID} e {ID repetido: ID original} da lista antiga do track."""
+    ids, aliases = {}, {}
+    for pos, name in enumerate(LEGACY_TIMBRES.get(track, ())):
+        if name in ids:
+            aliases[pos] = ids[name]
+        else:
+            ids[name] = pos
+    return ids, aliases
+
+
+class InstrumentCatalog:
+    """Tracks e timbres da árvore de samples; consultas por (track, ID inteiro)."""
+
+    def __init__(self, samples_root, tracks, categories, files=None):
+        self.samples_root = samples_root
+        self._tracks = tracks            # {track: [Timbre ordenado por ID]}
+        self.categories = categories     # {track: nome da pasta}
+        self.files = files or {}         # {"Pasta/arquivo.wav": {"mtime", "size", "sha1"}}
+        self._by_id = {track: {t.id: t for t in timbres} for track, timbres in tracks.items()}
+        self._by_file = {(t.category, f): t for timbres in tracks.values() for t in timbres for f in t.files}
+        self._aliases = {track: _legacy_ids(track)[1] for track in tracks}
+
+    def tracks(self):
+        return list(self._tracks)
+
+    def display_name(self, track):
+        return DISPLAY_NAMES.get(track, self.categories.get(track, track))
+
+    def timbres(self, track):
+        return list(self._tracks.get(track, ()))
+
+    def timbre(self, track, timbre_id):
+        """Timbre pelo ID (apelidos antigos incluídos), ou None."""
+        if timbre_id is None:
+            return None
+        timbre_id = self._aliases.get(track, {}).get(timbre_id, timbre_id)
+        return self._by_id.get(track, {}).get(timbre_id)
+
+    def by_file(self, category, name):
+        """Timbre que toca `category/name` (cópias de mesmo conteúdo incluídas), ou None."""
+        return self._by_file.get((category, name))
+
+    def default_id(self, track):
+        timbres = self._tracks.get(track)
+        return timbres[0].id if timbres else None
+
+    def resolve(self, track, timbre_id):
+        """Timbre pelo ID; o primeiro do track se ausente/inválido (None sem timbres)."""
+        timbre = self.timbre(track, timbre_id)
+        if timbre is None:
+            timbres = self._tracks.get(track)
+            timbre = timbres[0] if timbres else None
+        return timbre
+
+    def sample_refs(self):
+        """SampleRef de todos os arquivos varridos, para indexar o SampleBank sem nova listagem."""
+        refs = []
+        for key, entry in self.files.items():
+            category, _, name = key.partition("/")
+            refs.append(SampleRef(category, name, os.path.join(self.samples_root, category, name), entry["size"]))
+        return refs
+
+    def __len__(self):
+        return sum(len(t) for t in self._tracks.values())
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CATALOG_VERSION:
+            return cache
+    except (OSError, ValueError) as e:
+        logging.debug("Cache do catálogo indisponível em %s: %s", cache_path, e)
+    return None
+
+
+def _write_cache(cache_path, cache):
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        logging.warning("Não foi possível gravar o cache do catálogo: %s", e)
+
+
+def _scan_files(samples_root, previous):
+    """Pastas e arquivos da árvore, reaproveitando o que o cache anterior já sabe.
+
+    Devolve ({pasta: mtime}, {"Pasta/arquivo": entrada}, arquivos lidos para hash).
+    """
+    prev_dirs = previous.get("dirs", {})
+    prev_files = previous.get("files", {})
+    dirs, files, hashed = {}, {}, 0
+    try:
+        entries = sorted(os.scandir(samples_root), key=lambda e: e.name)
+    except FileNotFoundError:
+        logging.warning("Diretório de samples não encontrado: %s", samples_root)
+        entries = []
+    for cat in entries:
+        if not cat.is_dir():
+            continue
+        mtime = cat.stat().st_mtime
+        dirs[cat.name] = mtime
+        prefix = cat.name + "/"
+        if prev_dirs.get(cat.name) == mtime:
+            # nada foi criado, removido ou renomeado na pasta: os nomes do cache valem, mas um
+            # arquivo sobrescrito no lugar não muda o mtime da pasta, então cada um é conferido
+            paths = [(k, os.path.join(cat.path, k[len(prefix):])) for k in prev_files if k.startswith(prefix)]
+        else:
+            paths = [(prefix + f.name, f.path) for f in sorted(os.scandir(cat.path), key=lambda e: e.name)
+                     if f.is_file() and f.name.lower().endswith(AUDIO_EXTENSIONS)]
+        for key, path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            old = prev_files.get(key)
+            if old is not None and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+                files[key] = old
+                continue
+            files[key] = {"mtime": st.st_mtime, "size": st.st_size, "sha1": file_sha1(path)}
+            hashed += 1
+    return dirs, files, hashed
+
+
+def _assign_ids(track, names_by_sha1, previous_ids):
+    """{sha1: ID}: IDs já dados continuam; novos conteúdos recebem o próximo ID livre.
+
+    IDs de `previous_ids` cujo conteúdo sumiu da pasta ficam reservados: um
+    arquivo novo nunca herda o ID de um sample removido.
+    """
+    legacy, _aliases = _legacy_ids(track)
+    ids, used = {}, set()
+    for sha1, i in previous_ids.items():
+        if sha1 in names_by_sha1 and i not in used:
+            ids[sha1] = i
+            used.add(i)
+    reserved = set(previous_ids.values())
+    fresh = []
+    for sha1, names in names_by_sha1.items():
+        if sha1 in ids:
+            continue
+        old = [legacy[n] for n in names if n in legacy and legacy[n] not in used]
+        if old:
+            ids[sha1] = min(old)
+            used.add(ids[sha1])
+        else:
+            fresh.append(sha1)
+    next_id = max(list(used | reserved) + [len(LEGACY_TIMBRES.get(track, ())) - 1]) + 1
+    for sha1 in sorted(fresh, key=lambda s: names_by_sha1[s][0]):
+        if next_id >= MAX_TIMBRES:
+            logging.warning("Track %s: mais de %d timbres; ignorando %s", track, MAX_TIMBRES,
+                            names_by_sha1[sha1][0])
+            continue
+        ids[sha1] = next_id
+        next_id += 1
+    return ids
+
+
+def _merge_ids(saved, cached):
+    """IDs do banco, mais os do cache que ainda não estão lá (e não colidem com eles)."""
+    merged = {}
+    for track in set(saved) | set(cached):
+        ids = dict(saved.get(track, {}))
+        taken = set(ids.values())
+        for sha1, i in cached.get(track, {}).items():
+            if sha1 not in ids and i not in taken:
+                ids[sha1] = i
+                taken.add(i)
+        merged[track] = ids
+    return merged
+
+
+def build_catalog(samples_root, previous=None, saved_ids=None):
+    """Varre `samples_root` e devolve (InstrumentCatalog, dados para o cache).
+
+    `saved_ids` ({track: {sha1: ID}}, do GrooveStore) prevalece sobre os IDs do cache.
+    """
+    previous = previous or {}
+    dirs, files, hashed = _scan_files(samples_root, previous)
+    prev_ids = _merge_ids(saved_ids or {}, previous.get("ids", {}))
+
+    grouped = {}   # track -> pasta, {sha1: [nomes]}
+    for key, entry in files.items():
+        category, _, name = key.partition("/")
+        track = category.lower()
+        _cat, by_sha1 = grouped.setdefault(track, (category, {}))
+        by_sha1.setdefault(entry["sha1"], []).append(name)
+    order = sorted(grouped, key=lambda t: (TRACK_ORDER.index(t) if t in TRACK_ORDER else len(TRACK_ORDER), t))
+
+    tracks, categories, ids = {}, {}, {}
+    for track in order:
+        category, by_sha1 = grouped[track]
+        legacy = _legacy_ids(track)[0]
+        for names in by_sha1.values():
+            # o nome da lista antiga (se houver) representa o conteúdo
+            names.sort(key=lambda n: (n not in legacy, n))
+        ids[track] = _assign_ids(track, by_sha1, prev_ids.get(track, {}))
+        timbres = [Timbre(i, track, category, by_sha1[sha1][0], os.path.splitext(by_sha1[sha1][0])[0], sha1,
+                          tuple(by_sha1[sha1]))
+                   for sha1, i in ids[track].items()]
+        tracks[track] = sorted(timbres, key=lambda t: t.id)
+        categories[track] = category
+
+    catalog = InstrumentCatalog(samples_root, tracks, categories, files)
+    cache = {"version": CATALOG_VERSION, "dirs": dirs, "files": files, "ids": ids}
+    logging.debug("Catálogo: %d tracks, %d timbres, %d arquivos (%d lidos para hash)",
+                  len(tracks), len(catalog), len(files), hashed)
+    return catalog, cache
+
+
+def _load_saved_ids(store):
+    try:
+        return store.load_timbre_ids()
+    except Exception as e:
+        logging.warning("Não foi possível ler os IDs de timbre do banco: %s", e)
+        return None
+
+
+def _save_new_ids(store, catalog, saved):
+    """Grava no banco os IDs que ele ainda não tem (conteúdo novo ou vindo só do cache)."""
+    rows = [(track, t.sha1, t.id, t.name) for track in catalog.tracks() for t in catalog.timbres(track)
+            if saved.get(track, {}).get(t.sha1) != t.id]
+    if not rows:
+        return
+    try:
+        store.save_timbre_ids(rows)
+        logging.debug("IDs de %d timbres gravados no banco", len(rows))
+    except Exception as e:
+        logging.warning("Não foi possível gravar os IDs de timbre no banco: %s", e)
+
+
+def load_catalog(samples_root, cache_path=None, store=None):
+    """Catálogo da árvore de samples, usando (e atualizando) o cache em `cache_path`.
+
+    Com `store` (GrooveStore), os IDs dos timbres vêm do banco e os novos são gravados lá.
+    """
+    previous = _read_cache(cache_path) if cache_path else None
+    saved = _load_saved_ids(store) if store is not None else None
+    catalog, cache = build_catalog(samples_root, previous, saved)
+    if cache_path and cache != previous:
+        _write_cache(cache_path, cache)
+    if saved is not None:
+        _save_new_ids(store, catalog, saved)
+    return catalog
+
+
+if __name__ == "__main__":
+    import sys
+    from db_backend import GrooveStore, DB_FILE
+    root = sys.argv[1] if len(sys.argv) > 1 else "samples"
+    catalog = load_catalog(root, os.path.join("cache", "instruments.json"), GrooveStore(DB_FILE))
+    for track in catalog.tracks():
+        print(f"{catalog.display_name(track)} ({track}):")
+        for t in catalog.timbres(track):
+            dup = f"  (= {', '.join(t.files[1:])})" if len(t.files) > 1 else ""
+            print(f"  {t.id:3d}  {t.label}{dup}")
@@ -0,0 +1,88 @@
+# log_setup.py
+"""Configuração única de logging: QueueHandler na aplicação, I/O numa thread à parte.
+
+Quem loga (inclusive a thread do sequenciador) só enfileira o registro; o
+QueueListener grava no arquivo rotativo e no console. Níveis e arquivo vêm
+do ambiente:
+
+    DRUM_LOG_LEVEL          nível geral (padrão INFO)
+    DRUM_LOG_CONSOLE_LEVEL  nível do console (padrão: o geral)
+    DRUM_LOG_FILE           arquivo de log (padrão app_debug.log; vazio desliga)
+    DRUM_LOG_MAX_BYTES      tamanho antes de rotacionar (padrão 1 MB)
+    DRUM_LOG_BACKUPS        arquivos antigos mantidos (padrão 3)
+"""
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+DEFAULT_LOG_FILE = "app_debug.log"
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+_listener = None
+
+
+def _level(value, default):
+    if value is None or value == "":
+        return default
+    if str(value).isdigit():
+        return int(value)
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else default
+
+
+def setup_logging(level=None, console_level=None, log_file=None, max_bytes=None, backups=None):
+    """Liga o pipeline assíncrono (uma vez por processo); argumentos explícitos vencem o ambiente.
+
+    `log_file=""` loga só no console.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    env = os.environ
+    level = _level(level if level is not None else env.get("DRUM_LOG_LEVEL"), logging.INFO)
+    console_level = _level(console_level if console_level is not None else env.get("DRUM_LOG_CONSOLE_LEVEL"), level)
+    if log_file is None:
+        log_file = env.get("DRUM_LOG_FILE", DEFAULT_LOG_FILE)
+    max_bytes = int(max_bytes if max_bytes is not None else env.get("DRUM_LOG_MAX_BYTES", DEFAULT_MAX_BYTES))
+    backups = int(backups if backups is not None else env.get("DRUM_LOG_BACKUPS", DEFAULT_BACKUPS))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        file_handler.setLevel(level)
+        handlers.append(file_handler)
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    handlers.append(console)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # fila sem limite: put nunca bloqueia quem loga
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(min(level, console_level))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Esvazia a fila e fecha os handlers (chamado no atexit)."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,103 @@
+# looper.py
+"""Gravação do looper por callback (sd.InputStream) direto na camada int16 de um take."""
+import logging
+import threading
+
+from take_store import to_pcm16, add_pcm16
+
+
+class StreamRecorder:
+    """Grava `passes` voltas do loop numa camada nova de `take` (StoredTake).
+
+    O callback do InputStream converte o bloco recebido para int16 e o
+    copia (take novo) ou soma (overdub) na posição atual da camada e da
+    mixagem, ambas memmap: o disco acompanha o buffer sem thread de escrita
+    nem WAV, e o mixer já ouve o overdub enquanto ele é gravado. Ao parar,
+    a camada entra no histórico do take (`commit_layer`). `passes=None`
+    grava até `stop()`.
+    """
+
+    def __init__(self, take, frames=None, channels=1, samplerate=44100, passes=1, blocksize=1024, device=None,
+                 on_done=None):
+        self.take = take
+        # pista vazia: o take novo tem `frames`; senão é overdub no tamanho do take
+        self.overdub = not take.empty
+        self.layer = take.begin_layer(frames, channels, samplerate)
+        self.passes = passes
+        self.blocksize = blocksize
+        self.device = device
+        self.on_done = on_done
+        self.pos = 0
+        self.recorded = 0
+        self.overflows = 0
+        self.error = None
+        self.done = threading.Event()
+        self._finished_event = threading.Event()
+        self._stream = None
+        self._closer = None
+
+    def start(self):
+        try:
+            import sounddevice as sd
+            self._stop_exc = sd.CallbackStop
+            self._stream = sd.InputStream(
+                samplerate=self.take.samplerate, channels=self.take.channels, dtype="float32",
+                blocksize=self.blocksize, device=self.device,
+                callback=self._callback, finished_callback=self._finished)
+            self._stream.start()
+        except Exception:
+            self.take.abort_layer()
+            raise
+        # fecha a camada fora da thread de áudio (flush e índice tocam o disco)
+        self._closer = threading.Thread(target=self._close_loop, name="looper-close", daemon=True)
+        self._closer.start()
+        logging.info("Gravação iniciada (%s, %.1fs)", "overdub" if self.overdub else "take novo", self.take.duration)
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        total = self.take.frames
+        limit = None if self.passes is None else self.passes * total
+        src = 0
+        while src < frames:
+            n = min(frames - src, total - self.pos)
+            if limit is not None:
+                n = min(n, limit - self.recorded)
+            if n <= 0:
+                break
+            block = to_pcm16(indata[src:src + n])
+            layer = self.layer[self.pos:self.pos + n]
+            mix = self.take.data[self.pos:self.pos + n]
+            if self.overdub:
+                add_pcm16(layer, block)
+                add_pcm16(mix, block)
+            else:
+                layer[:] = block
+                mix[:] = block
+            src += n
+            self.recorded += n
+            self.pos = (self.pos + n) % total
+        if limit is not None and self.recorded >= limit:
+            raise self._stop_exc
+
+    def _finished(self):
+        self._finished_event.set()
+
+    def _close_loop(self):
+        self._finished_event.wait()
+        try:
+            self.take.commit_layer()
+        except Exception as e:
+            self.error = e
+            logging.exception("Erro fechando a camada gravada: %s", e)
+        finally:
+            self.done.set()
+            if self.on_done:
+                self.on_done(self)
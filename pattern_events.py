@@ -0,0 +1,166 @@
+# pattern_events.py
+"""Padrão de tamanho variável guardado como lista esparsa de eventos.
+
+Cada hit é uma linha de um array estruturado NumPy (passo, track, velocity,
+probabilidade), sempre ordenado por (passo, track). Só existem linhas para
+os passos tocados: um padrão de 256 passos com 16 tracks e poucos hits
+ocupa o mesmo que a grade de 16 passos de antes. A grade densa
+({track: [0/1, ...]}) só aparece nas bordas: JSON, renderização offline e
+assinatura de similaridade.
+"""
+import numpy as np
+
+EVENT_DTYPE = np.dtype([("step", "<u2"), ("track", "u1"), ("velocity", "u1"), ("probability", "u1")])
+STEPS_PER_BAR = 16
+MAX_STEPS = 0xFFFF
+MAX_TRACKS = 0xFF
+MAX_VELOCITY = 127
+MAX_PROBABILITY = 100
+
+
+def per_step(values, steps, default):
+    """Valores densos (lista por passo) nos `steps` pedidos; 0/ausente vira `default`."""
+    out = np.full(len(steps), default, dtype=np.int64)
+    if values:
+        values = np.asarray(values, dtype=np.int64)
+        inside = steps < len(values)
+        out[inside] = values[steps[inside]]
+        out[out <= 0] = default
+    return np.clip(out, 1, default)
+
+
+class Pattern:
+    """Eventos de um padrão de `length` passos sobre `tracks` (nomes, na ordem da grade).
+
+    Editado só pela thread da UI; a thread de áudio recebe um PatternSnapshot
+    compilado a partir dele (pattern_snapshot.compile_pattern).
+    """
+
+    def __init__(self, tracks, length=STEPS_PER_BAR, events=None):
+        self.tracks = tuple(tracks)
+        if len(self.tracks) > MAX_TRACKS:
+            raise ValueError(f"máximo de {MAX_TRACKS} tracks por padrão")
+        self.track_index = {name: i for i, name in enumerate(self.tracks)}
+        self.length = self._check_length(length)
+        events = np.zeros(0, dtype=EVENT_DTYPE) if events is None else np.asarray(events, dtype=EVENT_DTYPE)
+        self._set_events(np.sort(events[events["step"] < self.length], order=("step", "track")))
+
+    @staticmethod
+    def _check_length(length):
+        length = int(length)
+        if not 1 <= length <= MAX_STEPS:
+            raise ValueError(f"comprimento do padrão fora de 1..{MAX_STEPS}: {length}")
+        return length
+
+    def _set_events(self, events):
+        self.events = events
+        # chave única (passo, track) para busca binária
+        self._keys = events["step"].astype(np.int64) * (MAX_TRACKS + 1) + events["track"]
+
+    def _find(self, track, step):
+        key = step * (MAX_TRACKS + 1) + self.track_index[track]
+        i = int(np.searchsorted(self._keys, key))
+        return i, i < len(self._keys) and self._keys[i] == key
+
+    # ---------------- conversão ---------------- #
+    @classmethod
+    def from_groove(cls, groove, tracks=None, length=None):
+        """A partir do groove canônico (groove_codec): grade densa + velocity/probability opcionais."""
+        sequence = groove.get("sequence") or {}
+        velocity = groove.get("velocity") or {}
+        probability = groove.get("probability") or {}
+        tracks = tuple(tracks) if tracks is not None else tuple(sequence)
+        if length is None:
+            length = groove.get("length") or max((len(p) for p in sequence.values()), default=0) or STEPS_PER_BAR
+        rows = []
+        for t, name in enumerate(tracks):
+            steps = np.flatnonzero(np.asarray(sequence.get(name) or [], dtype=bool)[:length])
+            if not len(steps):
+                continue
+            ev = np.zeros(len(steps), dtype=EVENT_DTYPE)
+            ev["step"] = steps
+            ev["track"] = t
+            ev["velocity"] = per_step(velocity.get(name), steps, MAX_VELOCITY)
+            ev["probability"] = per_step(probability.get(name), steps, MAX_PROBABILITY)
+            rows.append(ev)
+        events = np.concatenate(rows) if rows else None
+        return cls(tracks, length, events)
+
+    def to_groove(self):
+        """Groove canônico (sem timbres); velocity/probability só entram se algum hit fugir do padrão."""
+        def dense():
+            return {name: [0] * self.length for name in self.tracks}
+        sequence = dense()
+        velocity = dense() if (self.events["velocity"] < MAX_VELOCITY).any() else None
+        probability = dense() if (self.events["probability"] < MAX_PROBABILITY).any() else None
+        for step, track, vel, prob in self.events.tolist():
+            name = self.tracks[track]
+            sequence[name][step] = 1
+            if velocity is not None:
+                velocity[name][step] = vel
+            if probability is not None:
+                probability[name][step] = prob
+        groove = {"sequence": sequence, "length": self.length}
+        if velocity:
+            groove["velocity"] = velocity
+        if probability:
+            groove["probability"] = probability
+        return groove
+
+    def copy(self):
+        return Pattern(self.tracks, self.length, self.events.copy())
+
+    # ---------------- consulta ---------------- #
+    def __len__(self):
+        return len(self.events)
+
+    def get(self, track, step):
+        """(velocity, probabilidade) do hit, ou None se o passo está vazio."""
+        i, found = self._find(track, step)
+        if not found:
+            return None
+        return int(self.events["velocity"][i]), int(self.events["probability"][i])
+
+    def has(self, track, step):
+        return self._find(track, step)[1]
+
+    def track_events(self, track):
+        """Eventos de um track (view ordenada por passo)."""
+        return self.events[self.events["track"] == self.track_index[track]]
+
+    @property
+    def bars(self):
+        return -(-self.length // STEPS_PER_BAR)
+
+    # ---------------- edição ---------------- #
+    def set(self, track, step, velocity=MAX_VELOCITY, probability=MAX_PROBABILITY):
+        """Liga (ou atualiza) o hit em `step`."""
+        if not 0 <= step < self.length:
+            raise IndexError(f"passo {step} fora do padrão de {self.length}")
+        velocity = min(max(int(velocity), 1), MAX_VELOCITY)
+        probability = min(max(int(probability), 1), MAX_PROBABILITY)
+        i, found = self._find(track, step)
+        if found:
+            self.events["velocity"][i] = velocity
+            self.events["probability"][i] = probability
+            return
+        row = np.array([(step, self.track_index[track], velocity, probability)], dtype=EVENT_DTYPE)
+        self._set_events(np.insert(self.events, i, row))
+
+    def clear(self, track, step):
+        i, found = self._find(track, step)
+        if found:
+            self._set_events(np.delete(self.events, i))
+
+    def toggle(self, track, step, velocity=MAX_VELOCITY, probability=MAX_PROBABILITY):
+        """Inverte o passo; devolve o novo estado."""
+        if self.has(track, step):
+            self.clear(track, step)
+            return False
+        self.set(track, step, velocity, probability)
+        return True
+
+    def resize(self, length):
+        """Muda o comprimento; hits além do novo fim são descartados."""
+        self.length = self._check_length(length)
+        self._set_events(self.events[self.events["step"] < self.length])
@@ -0,0 +1,62 @@
+# pattern_snapshot.py
+"""Padrão pré-compilado e imutável lido pela thread de áudio."""
+from bisect import bisect_left
+from collections import namedtuple
+
+from pattern_events import STEPS_PER_BAR, MAX_VELOCITY, MAX_PROBABILITY
+
+STEPS_PER_BEAT = 4
+CLICK_EVERY = 4
+
+# hits: {passo: tupla de (pcm, ganho, probabilidade %, onset em frames, bus)} só para os
+# passos com som (o click do metrônomo já entra aqui quando ligado, com bus None)
+# event_steps: os passos de `hits`, ordenados; length: passos até o padrão repetir
+# swing: atraso dos passos ímpares em fração de passo; humanize: desvio máximo de cada hit em segundos
+PatternSnapshot = namedtuple("PatternSnapshot",
+                             "hits event_steps length bpm step_duration metronome version swing humanize")
+
+
+def swing_delay(percent):
+    """Swing em % (50 = reto, 66 = tercina, 75 = pontuado) -> atraso da semicolcheia ímpar em passos."""
+    return min(max(percent, 50), 75) / 50.0 - 1.0
+
+
+def compile_pattern(pattern, voices, bpm, metronome=False, click=None, version=0, onsets=None, click_onset=0,
+                    swing=0.0, humanize=0.0):
+    """Resolve o Pattern esparso em hits por passo.
+
+    Feito na thread da UI a cada edição, percorrendo só os eventos; a thread
+    de áudio só troca a referência e, por passo visitado, dispara os hits
+    daquele passo (O(hits)), sem tocar em variáveis Tk nem no array do Pattern.
+    `onsets` ({track: frames até o ataque}) vai junto de cada hit, e o bus
+    de cada hit é o índice da track (a cadeia dela no AudioEngine).
+    """
+    onsets = onsets or {}
+    hits = {}
+    for step, track, velocity, probability in pattern.events.tolist():
+        name = pattern.tracks[track]
+        pcm = voices.get(name)
+        if pcm is not None:
+            hits.setdefault(step, []).append((pcm, velocity / MAX_VELOCITY, probability, onsets.get(name, 0),
+                                              track))
+    if metronome and click is not None:
+        for step in range(0, pattern.length, CLICK_EVERY):
+            hits.setdefault(step, []).append((click, 1.0, MAX_PROBABILITY, click_onset, None))
+    hits = {step: tuple(h) for step, h in hits.items()}
+    return PatternSnapshot(hits, tuple(sorted(hits)), pattern.length, bpm,
+                           60.0 / bpm / STEPS_PER_BEAT, bool(metronome), version, swing, humanize)
+
+
+def steps_to_next(snapshot, pos):
+    """Passos de `pos` (posição no padrão, inclusive) até o próximo a visitar.
+
+    Visita-se um passo se ele tem hits ou abre um compasso (é onde o loop
+    aplica mudanças de andamento); os passos vazios no meio são pulados.
+    """
+    i = bisect_left(snapshot.event_steps, pos)
+    event = snapshot.event_steps[i] if i < len(snapshot.event_steps) else snapshot.length
+    bar = -(-pos // STEPS_PER_BAR) * STEPS_PER_BAR
+    return min(event, bar, snapshot.length) - pos
+
+
+EMPTY = PatternSnapshot({}, (), STEPS_PER_BAR, 100, 60.0 / 100 / STEPS_PER_BEAT, False, 0, 0.0, 0.0)
@@ -0,0 +1,137 @@
+# perf_monitor.py
+"""Instrumentação leve dos caminhos quentes em buffers circulares de tamanho fixo."""
+import csv
+import json
+
+import numpy as np
+
+from pattern_events import STEPS_PER_BAR
+
+# canal -> campos gravados por evento (o primeiro é sempre o instante, perf_counter em s)
+CHANNELS = {
+    # um por passo do sequenciador
+    "step": ("t", "step", "lateness_ms", "work_ms", "voices", "late_steps", "dropped_steps"),
+    # disparo dos samples de um passo (engine.play de cada hit)
+    "trigger": ("t", "hits", "duration_ms"),
+    # flush do playhead no main loop do Tk
+    "tk": ("t", "lag_ms", "pending", "duration_ms"),
+    # gravação automática (thread do autosave): edições agrupadas numa transação
+    "autosave": ("t", "edits", "write_ms"),
+}
+
+
+class RingBuffer:
+    """Últimos `capacity` eventos de um canal num array float64 pré-alocado.
+
+    `record` só escreve numa linha já existente: nada cresce nem é alocado
+    por evento. Um único escritor por canal; leitores copiam um snapshot.
+    """
+
+    def __init__(self, fields, capacity=4096):
+        self.fields = fields
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(fields)), dtype=np.float64)
+        self.count = 0
+
+    def record(self, *values):
+        row = self.data[self.count % self.capacity]
+        for i, v in enumerate(values):
+            row[i] = v
+        self.count += 1
+
+    def snapshot(self):
+        """Cópia dos eventos em ordem cronológica."""
+        n = min(self.count, self.capacity)
+        if self.count <= self.capacity:
+            return self.data[:n].copy()
+        start = self.count % self.capacity
+        return np.concatenate([self.data[start:], self.data[:start]])
+
+    def clear(self):
+        self.count = 0
+
+
+class PerfMonitor:
+    """Coleta step/trigger/tk em RingBuffers; desligado, `record` retorna na hora."""
+
+    def __init__(self, capacity=4096, enabled=False):
+        self.enabled = enabled
+        self.buffers = {name: RingBuffer(fields, capacity) for name, fields in CHANNELS.items()}
+
+    def record(self, channel, *values):
+        if self.enabled:
+            self.buffers[channel].record(*values)
+
+    def clear(self):
+        for buf in self.buffers.values():
+            buf.clear()
+
+    def column(self, channel, field):
+        buf = self.buffers[channel]
+        return buf.snapshot()[:, buf.fields.index(field)]
+
+    def percentiles(self, channel, field, qs=(50, 95, 99)):
+        """{p50, p95, p99, max, n} de um campo sobre o conteúdo atual do buffer."""
+        values = self.column(channel, field)
+        if len(values) == 0:
+            return None
+        result = {f"p{q}": float(v) for q, v in zip(qs, np.percentile(values, qs))}
+        result["max"] = float(values.max())
+        result["n"] = len(values)
+        return result
+
+    def summary_text(self):
+        """Linhas curtas para o overlay da UI."""
+        lines = []
+        for channel, field, label in (("step", "lateness_ms", "atraso do passo"),
+                                      ("step", "work_ms", "trabalho do passo"),
+                                      ("trigger", "duration_ms", "disparo dos samples"),
+                                      ("tk", "lag_ms", "atraso do Tk"),
+                                      ("tk", "pending", "fila do playhead"),
+                                      ("autosave", "write_ms", "gravação automática")):
+            p = self.percentiles(channel, field)
+            if p is None:
+                lines.append(f"{label}: -")
+                continue
+            lines.append(f"{label}: p50 {p['p50']:.2f}  p95 {p['p95']:.2f}  p99 {p['p99']:.2f}  máx {p['max']:.2f}")
+        steps = self.buffers["step"].snapshot()
+        if len(steps):
+            last = steps[-1]
+            lines.append(f"vozes no mixer: {int(last[4])}  atrasados: {int(last[5])}  descartados: {int(last[6])}")
+        return "\n".join(lines)
+
+    # ---------------- exportação ---------------- #
+    def to_csv(self, path):
+        """Uma linha por evento: canal + campos do canal."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for channel, buf in self.buffers.items():
+                writer.writerow(["channel", *buf.fields])
+                for row in buf.snapshot():
+                    writer.writerow([channel, *(f"{v:.6f}" for v in row)])
+
+    def to_chrome_trace(self, path):
+        """JSON do chrome://tracing / Perfetto: passos e disparos como spans, o resto como contadores."""
+        events = []
+        for t, step, lateness, work, voices, late, dropped in self.buffers["step"].snapshot():
+            ts = t * 1e6
+            events.append({"name": f"passo {int(step) % STEPS_PER_BAR}", "cat": "step", "ph": "X", "ts": ts,
+                           "dur": work * 1000, "pid": 1, "tid": 1, "args": {"lateness_ms": lateness}})
+            events.append({"name": "mixer", "ph": "C", "ts": ts, "pid": 1,
+                           "args": {"voices": voices, "late_steps": late, "dropped_steps": dropped}})
+        for t, hits, duration in self.buffers["trigger"].snapshot():
+            events.append({"name": "trigger", "cat": "audio", "ph": "X", "ts": t * 1e6,
+                           "dur": duration * 1000, "pid": 1, "tid": 2, "args": {"hits": hits}})
+        for t, lag, pending, duration in self.buffers["tk"].snapshot():
+            events.append({"name": "playhead", "cat": "tk", "ph": "X", "ts": t * 1e6,
+                           "dur": duration * 1000, "pid": 1, "tid": 3, "args": {"lag_ms": lag}})
+            events.append({"name": "tk", "ph": "C", "ts": t * 1e6, "pid": 1,
+                           "args": {"lag_ms": lag, "pending": pending}})
+        for t, edits, duration in self.buffers["autosave"].snapshot():
+            events.append({"name": "autosave", "cat": "db", "ph": "X", "ts": t * 1e6,
+                           "dur": duration * 1000, "pid": 1, "tid": 4, "args": {"edits": edits}})
+        events.sort(key=lambda e: e["ts"])
+        meta = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                for tid, name in ((1, "sequenciador"), (2, "disparo"), (3, "tk"), (4, "autosave"))]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,123 @@
+# playhead.py
+"""Destaque do passo atual na grade: só redesenha as colunas que mudaram."""
+import time
+import threading
+
+COLOR_ACTIVE = "red"
+COLOR_ON = "green"
+COLOR_OFF = "white"
+
+
+class PlayheadRenderer:
+    """Move o destaque do passo tocando sem repintar a grade inteira.
+
+    `request(step)` pode ser chamado de qualquer thread: guarda só o passo mais
+    recente e agenda no máximo um `after` por quadro (`refresh_hz`). No flush,
+    só a coluna anterior e a nova são reconfiguradas. `tk_calls` conta todas
+    as chamadas feitas ao Tk para medir a carga no main loop. Com `monitor`
+    (PerfMonitor), cada flush registra o atraso do Tk em relação ao horário
+    agendado e quantos pedidos ficaram acumulados esperando por ele.
+
+    `is_on(inst, col)` pode devolver a própria cor do passo (str) em vez de
+    um bool, para passos com velocity/probabilidade fora do padrão.
+    """
+
+    def __init__(self, root, buttons, is_on, refresh_hz=60, monitor=None):
+        self.root = root
+        self.buttons = buttons
+        self.is_on = is_on
+        self.interval = 1.0 / refresh_hz
+        self.shown = -1
+        self.tk_calls = 0
+        self.requests = 0
+        self.flushes = 0
+        self.monitor = monitor
+        self._pending = -1
+        self._waiting = 0
+        self._due = 0.0
+        self._scheduled = False
+        self._position = None
+        self._following = False
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._rate_mark = (time.perf_counter(), 0)
+
+    def request(self, step):
+        """Pede para destacar `step` (-1 apaga o destaque)."""
+        now = time.perf_counter()
+        with self._lock:
+            self._pending = step
+            self.requests += 1
+            self._waiting += 1
+            if self._scheduled:
+                return
+            self._scheduled = True
+            delay = max(0.0, self._last_flush + self.interval - now)
+            self._due = now + delay
+        self.tk_calls += 1
+        self.root.after(int(delay * 1000), self._flush)
+
+    def follow(self, position):
+        """Segue `position()` (coluna atual ou -1) a cada quadro, no próprio main loop do Tk.
+
+        Para o sequenciador que só acorda nos passos com som: o destaque anda
+        pelos passos vazios sem nenhum pedido vindo da thread de áudio.
+        `follow(None)` para de seguir. Chamar da thread do Tk.
+        """
+        self._position = position
+        if position is not None and not self._following:
+            self._following = True
+            self._due = time.perf_counter()
+            self.tk_calls += 1
+            self.root.after(0, self._follow_tick)
+
+    def _follow_tick(self):
+        position = self._position
+        if position is None:
+            self._following = False
+            return
+        with self._lock:
+            self._pending = position()
+            self._waiting += 1
+        self._flush()
+        self._due = time.perf_counter() + self.interval
+        self.tk_calls += 1
+        self.root.after(int(self.interval * 1000), self._follow_tick)
+
+    def _flush(self):
+        with self._lock:
+            step = self._pending
+            waiting, self._waiting = self._waiting, 0
+            self._scheduled = False
+            start = self._last_flush = time.perf_counter()
+            due = self._due
+        self.flushes += 1
+        if step != self.shown:
+            previous, self.shown = self.shown, step
+            if previous >= 0:
+                self._paint_column(previous, active=False)
+            if step >= 0:
+                self._paint_column(step, active=True)
+        if self.monitor is not None:
+            self.monitor.record("tk", start, (start - due) * 1000, waiting,
+                                (time.perf_counter() - start) * 1000)
+
+    def _paint_column(self, col, active):
+        for inst, row in self.buttons.items():
+            if col >= len(row):
+                continue
+            if active:
+                color = COLOR_ACTIVE
+            else:
+                state = self.is_on(inst, col)
+                color = state if isinstance(state, str) else (COLOR_ON if state else COLOR_OFF)
+            row[col].config(bg=color)
+            self.tk_calls += 1
+
+    def calls_per_second(self):
+        """Chamadas Tk/s desde a última consulta."""
+        now = time.perf_counter()
+        mark_time, mark_calls = self._rate_mark
+        self._rate_mark = (now, self.tk_calls)
+        elapsed = now - mark_time
+        return (self.tk_calls - mark_calls) / elapsed if elapsed > 0 else 0.0
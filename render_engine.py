@@ -0,0 +1,262 @@
+# render_engine.py
+"""Mixagem offline de grooves em um único buffer float32 (NumPy)."""
+import numpy as np
+
+from pattern_events import per_step, MAX_VELOCITY, MAX_PROBABILITY
+from sample_prep import resample
+
+STEPS_PER_BEAT = 4
+CLICK_EVERY = 4
+
+
+def step_frames(bpm, sample_rate):
+    """Duração de um passo (semicolcheia) em amostras."""
+    return int(round(60.0 / bpm / STEPS_PER_BEAT * sample_rate))
+
+
+def as_stereo(pcm, channels=2):
+    """Converte PCM (frames,) ou (frames, n) para float32 (frames, channels).
+
+    PCM inteiro (ex.: int16 do pacote memmap) é escalado para [-1, 1).
+    """
+    pcm = np.asarray(pcm)
+    if pcm.dtype.kind in "iu":
+        pcm = pcm.astype(np.float32) / float(np.iinfo(pcm.dtype).max + 1)
+    else:
+        pcm = pcm.astype(np.float32, copy=False)
+    if pcm.ndim == 1:
+        pcm = pcm[:, None]
+    if pcm.shape[1] == channels:
+        return pcm
+    if pcm.shape[1] == 1:
+        return np.repeat(pcm, channels, axis=1)
+    if pcm.shape[1] > channels:
+        return pcm[:, :channels]
+    return np.repeat(pcm.mean(axis=1, keepdims=True), channels, axis=1)
+
+
+def load_wav(path, sample_rate=44100, channels=2):
+    """Lê um WAV com soundfile e devolve float32 (frames, channels) na taxa pedida."""
+    import soundfile as sf
+    data, sr = sf.read(path, dtype="float32", always_2d=True)
+    return as_stereo(resample(data, sr, sample_rate), channels)
+
+
+def hit_gains(velocity, steps):
+    """Ganho de cada passo em `steps` a partir da velocity densa do groove (0/ausente = cheio)."""
+    return (per_step(velocity, np.asarray(steps), MAX_VELOCITY) / MAX_VELOCITY).astype(np.float32)
+
+
+def _mix_at(buf, pcm, offsets, sign=1.0):
+    """Soma `pcm * sign` em `buf` em cada offset; caudas que passam do fim dão a volta.
+
+    O buffer é um loop, então a cauda de um hit no fim do compasso soa no
+    começo da próxima volta, exatamente como no sequenciador ao vivo.
+    """
+    total = buf.shape[0]
+    length = pcm.shape[0]
+    if length == 0:
+        return
+    if sign != 1.0:
+        pcm = pcm * sign
+    for off in offsets:
+        pos = int(off) % total
+        remaining = length
+        src = 0
+        while remaining > 0:
+            n = min(remaining, total - pos)
+            buf[pos:pos + n] += pcm[src:src + n]
+            src += n
+            remaining -= n
+            pos = 0
+
+
+class GrooveRenderer:
+    """Renderiza `sequence` + timbres em um buffer de N compassos.
+
+    Mantém uma camada por instrumento para que ligar/desligar um passo ou
+    trocar o timbre refaça só a parte afetada do mix. A velocity vira o ganho
+    de cada hit; a probabilidade não se aplica aqui (o buffer é fixo e se
+    repete igual a cada volta).
+    """
+
+    def __init__(self, num_steps=16, sample_rate=44100, channels=2, bars=1):
+        self.num_steps = num_steps
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bars = bars
+        self.bpm = None
+        self.step_len = 0
+        self.sequence = {}
+        self.gains = {}
+        self.voices = {}
+        self.click = None
+        self.metronome = False
+        self.layers = {}
+        self.click_layer = None
+        self.mix = None
+        self.version = 0
+
+    @property
+    def frames(self):
+        return self.step_len * self.num_steps * self.bars
+
+    def _offsets(self, hits):
+        bar_starts = np.arange(self.bars) * self.num_steps
+        return ((bar_starts[:, None] + np.asarray(hits)[None, :]).ravel() * self.step_len)
+
+    def _render_layer(self, inst):
+        layer = np.zeros((self.frames, self.channels), dtype=np.float32)
+        voice = self.voices.get(inst)
+        if voice is not None:
+            hits = np.flatnonzero(np.asarray(self.sequence[inst][:self.num_steps]))
+            gains = self.gains[inst][hits]
+            # uma passada por nível de velocity (quase sempre um só)
+            for gain in np.unique(gains):
+                _mix_at(layer, voice, self._offsets(hits[gains == gain]), float(gain))
+        return layer
+
+    def _render_click(self):
+        layer = np.zeros((self.frames, self.channels), dtype=np.float32)
+        if self.metronome and self.click is not None:
+            offsets = np.arange(0, self.num_steps * self.bars, CLICK_EVERY) * self.step_len
+            _mix_at(layer, self.click, offsets)
+        return layer
+
+    def _sum(self):
+        mix = np.zeros((self.frames, self.channels), dtype=np.float32)
+        for layer in self.layers.values():
+            mix += layer
+        mix += self.click_layer
+        self.mix = mix
+        self.version += 1
+        return mix
+
+    def render(self, sequence, voices, bpm, click=None, metronome=False, velocity=None, num_steps=None):
+        """Renderização completa; devolve o buffer float32 (frames, channels)."""
+        if num_steps:
+            self.num_steps = num_steps
+        velocity = velocity or {}
+        self.sequence = {inst: (list(p) + [0] * self.num_steps)[:self.num_steps] for inst, p in sequence.items()}
+        self.gains = {inst: hit_gains(velocity.get(inst), np.arange(self.num_steps)) for inst in self.sequence}
+        self.voices = {inst: as_stereo(v, self.channels) for inst, v in voices.items() if v is not None}
+        self.click = as_stereo(click, self.channels) if click is not None else None
+        self.metronome = bool(metronome)
+        self.bpm = bpm
+        self.step_len = step_frames(bpm, self.sample_rate)
+        self.layers = {inst: self._render_layer(inst) for inst in self.sequence}
+        self.click_layer = self._render_click()
+        return self._sum()
+
+    def toggle_step(self, inst, step, on, gain=1.0):
+        """Atualiza o mix somando/subtraindo só o hit alterado (ligado com ganho `gain`)."""
+        if self.mix is None or inst not in self.sequence or step >= self.num_steps:
+            return self.mix
+        if bool(self.sequence[inst][step]) == bool(on):
+            return self.mix
+        self.sequence[inst][step] = 1 if on else 0
+        if on:
+            self.gains[inst][step] = gain
+        voice = self.voices.get(inst)
+        if voice is not None:
+            offsets = (np.arange(self.bars) * self.num_steps + step) * self.step_len
+            sign = float(self.gains[inst][step]) * (1.0 if on else -1.0)
+            _mix_at(self.layers[inst], voice, offsets, sign)
+            _mix_at(self.mix, voice, offsets, sign)
+            self.version += 1
+        return self.mix
+
+    def set_voice(self, inst, pcm):
+        """Troca o timbre de um instrumento e re-renderiza só a camada dele."""
+        if self.mix is None:
+            return self.mix
+        self.voices[inst] = as_stereo(pcm, self.channels) if pcm is not None else None
+        old = self.layers.get(inst)
+        new = self._render_layer(inst)
+        self.layers[inst] = new
+        if old is not None:
+            self.mix -= old
+        self.mix += new
+        self.version += 1
+        return self.mix
+
+    def set_metronome(self, enabled):
+        if self.mix is None or bool(enabled) == self.metronome:
+            return self.mix
+        self.metronome = bool(enabled)
+        self.mix -= self.click_layer
+        self.click_layer = self._render_click()
+        self.mix += self.click_layer
+        self.version += 1
+        return self.mix
+
+    def to_int16(self):
+        """Mix com clip em [-1, 1] convertido para int16 (formato do mixer)."""
+        return (np.clip(self.mix, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def stream_groove(sequence, voices, bpm, bars, sample_rate=44100, channels=2, num_steps=16,
+                  click=None, metronome=False, loops=(), tail=True, velocity=None, probability=None,
+                  seed=None):
+    """Gera o padrão tocado `bars` vezes em blocos de uma volta (memória constante).
+
+    Uma volta do padrão (`num_steps` passos) é renderizada uma vez sem dar a
+    volta; as caudas que passam do fim são somadas à volta seguinte
+    (overlap-add), então a primeira começa limpa e a última termina com a
+    cauda natural dos samples (`tail=False` corta exatamente em `bars`
+    voltas). `velocity` dá o ganho de cada hit; hits com `probability` < 100
+    são sorteados de novo a cada volta (`seed` fixa o sorteio). `loops` são
+    PCMs do looper repetidos a partir do frame 0, cada um no seu comprimento.
+    """
+    step_len = step_frames(bpm, sample_rate)
+    bar_len = step_len * num_steps
+    voices = {inst: as_stereo(v, channels) for inst, v in voices.items() if v is not None}
+    velocity, probability = velocity or {}, probability or {}
+    hits, chance = [], []
+    for inst, pattern in sequence.items():
+        if inst not in voices:
+            continue
+        steps = np.flatnonzero(np.asarray(pattern[:num_steps]))
+        gains = hit_gains(velocity.get(inst), steps)
+        probs = per_step(probability.get(inst), steps, MAX_PROBABILITY)
+        for s, gain, prob in zip(steps.tolist(), gains.tolist(), probs.tolist()):
+            hit = (voices[inst], s * step_len, gain)
+            if prob < MAX_PROBABILITY:
+                chance.append(hit + (prob,))
+            else:
+                hits.append(hit)
+    if metronome and click is not None:
+        click = as_stereo(click, channels)
+        hits += [(click, s * step_len, 1.0) for s in range(0, num_steps, CLICK_EVERY)]
+    overhang = max([off + len(pcm) - bar_len for pcm, off, *_ in hits + chance] + [0])
+    bar = np.zeros((bar_len + overhang, channels), dtype=np.float32)
+    for pcm, off, gain in hits:
+        bar[off:off + len(pcm)] += pcm * gain if gain != 1.0 else pcm
+    loops = [as_stereo(pcm, channels) for pcm in loops if pcm is not None and len(pcm)]
+    rng = np.random.default_rng(seed)
+
+    pending = np.zeros_like(bar)
+    pos = 0
+    for _ in range(bars):
+        pending += bar
+        for pcm, off, gain, prob in chance:
+            if rng.random() * MAX_PROBABILITY < prob:
+                pending[off:off + len(pcm)] += pcm * gain
+        block = pending[:bar_len].copy()
+        _add_loops(block, loops, pos)
+        yield block
+        pos += bar_len
+        # desloca um compasso: as caudas que sobraram vão para o começo
+        pending[:overhang] = pending[bar_len:]
+        pending[overhang:] = 0
+    if tail and overhang:
+        block = pending[:overhang].copy()
+        _add_loops(block, loops, pos)
+        yield block
+
+
+def _add_loops(block, loops, pos):
+    """Soma os loops do looper em `block`, que começa no frame absoluto `pos`."""
+    for pcm in loops:
+        idx = (pos + np.arange(len(block))) % len(pcm)
+        block += pcm[idx]
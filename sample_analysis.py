@@ -0,0 +1,173 @@
+# sample_analysis.py
+"""Índice de características dos samples para navegar pelos timbres.
+
+Para cada arquivo de `samples/`: duração, pico e RMS (dB FS), ataque (ms
+até o envelope chegar a 25% do pico), centroide espectral e uma miniatura
+da forma de onda (THUMB_POINTS picos em u8). Fica na tabela
+`sample_features` do grooves.db (GrooveStore), atualizada só para arquivos
+novos ou com mtime/tamanho diferente; a análise roda num pool de processos.
+
+    python sample_analysis.py            # atualiza o índice e lista os mais parecidos
+"""
+import os
+import math
+import logging
+
+import numpy as np
+
+from sample_prep import DEFAULT_SETTINGS, envelope
+
+# mudar a análise invalida o que está no banco
+ANALYSIS_VERSION = 1
+THUMB_POINTS = 64
+# samples longos (loops) só têm o começo analisado; a duração é a do arquivo inteiro
+ANALYSIS_SECONDS = 10
+ACTIVE_DB = -60          # RMS e centroide só sobre o trecho acima disso (relativo ao pico)
+CENTROID_FFT_MAX = 1 << 16
+FLOOR_DB = -120.0
+# abaixo disso não compensa subir processos (spawn + numpy custam mais que a análise)
+PARALLEL_MIN = 16
+SAVE_BATCH = 64
+
+
+def _db(value):
+    return 20 * math.log10(value) if value > 0 else FLOOR_DB
+
+
+def features(pcm, sample_rate, total_frames=None):
+    """Características de um PCM float (frames, canais); `total_frames` é a duração real se `pcm` for só o começo."""
+    total_frames = len(pcm) if total_frames is None else total_frames
+    mono = envelope(pcm)
+    peak = float(mono.max()) if len(mono) else 0.0
+    onset, active = 0, np.zeros(0, np.float32)
+    if peak > 0:
+        # mesmo critério do sample_prep.onset_frames, sem o limite de pré-roll
+        onset = int(np.argmax(mono >= DEFAULT_SETTINGS["onset_ratio"] * peak))
+        loud = np.flatnonzero(mono >= peak * 10 ** (ACTIVE_DB / 20))
+        active = pcm[loud[0]:loud[-1] + 1].sum(axis=1, dtype=np.float32) / pcm.shape[1]
+    rms = float(np.sqrt(np.mean(active.astype(np.float64) ** 2))) if len(active) else 0.0
+    centroid = 0.0
+    if len(active) > 1:
+        seg = active[:CENTROID_FFT_MAX] * np.hanning(min(len(active), CENTROID_FFT_MAX))
+        # zeros até a potência de 2: tamanhos primos deixam a FFT dezenas de vezes mais lenta
+        n_fft = 1 << (len(seg) - 1).bit_length()
+        power = np.abs(np.fft.rfft(seg, n_fft)) ** 2
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+        total = power.sum()
+        centroid = float((freqs * power).sum() / total) if total > 0 else 0.0
+    # miniatura: pico de cada fatia do sample inteiro lido, 0-255 em escala cheia
+    thumb = np.zeros(THUMB_POINTS, np.uint8)
+    if len(mono):
+        edges = np.linspace(0, len(mono), THUMB_POINTS + 1).astype(np.int64)
+        starts = np.minimum(edges[:-1], len(mono) - 1)
+        thumb = np.round(np.minimum(np.maximum.reduceat(mono, starts), 1.0) * 255).astype(np.uint8)
+    duration = total_frames / sample_rate
+    return {
+        "duration": duration,
+        "peak_db": _db(peak),
+        "rms_db": _db(rms),
+        "onset_ms": onset / sample_rate * 1000,
+        "centroid": centroid,
+        "octave": math.log2(max(centroid, 20.0)),
+        "dur_log": math.log2(max(duration, 1e-3)),
+        "thumb": thumb.tobytes(),
+    }
+
+
+def analyze_file(job):
+    """(categoria, nome, caminho, mtime, tamanho) -> linha para GrooveStore.save_sample_features.
+
+    Roda nos processos do pool: só numpy e soundfile, nada do app.
+    """
+    import soundfile as sf
+    category, name, path, mtime, size = job
+    with sf.SoundFile(path) as f:
+        sample_rate, total = f.samplerate, f.frames
+        pcm = f.read(min(total, int(ANALYSIS_SECONDS * sample_rate)), dtype="float32", always_2d=True)
+    row = features(pcm, sample_rate, total)
+    row.update(category=category, name=name, mtime=mtime, size=size, version=ANALYSIS_VERSION)
+    return row
+
+
+def stale_jobs(store, samples_root, files):
+    """(jobs a analisar, chaves removidas da árvore) comparando `files` do catálogo com o banco."""
+    stamps = store.sample_stamps()
+    jobs, present = [], set()
+    for key, entry in files.items():
+        category, _, name = key.partition("/")
+        present.add((category, name))
+        if stamps.get((category, name)) != (entry["mtime"], entry["size"], ANALYSIS_VERSION):
+            jobs.append((category, name, os.path.join(samples_root, category, name), entry["mtime"], entry["size"]))
+    return jobs, [key for key in stamps if key not in present]
+
+
+def _results(jobs, workers):
+    """Gera (job, linha ou exceção) na ordem em que ficam prontos."""
+    if len(jobs) < PARALLEL_MIN or workers == 1:
+        for job in jobs:
+            try:
+                yield job, analyze_file(job)
+            except Exception as e:
+                yield job, e
+        return
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    # spawn: o app tem threads (Tk, áudio) e fork copiaria travas no meio do uso
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(analyze_file, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def update_index(store, samples_root, files, workers=None, on_progress=None):
+    """Analisa o que mudou em `files` ({"Pasta/arquivo": {"mtime", "size"}}, ex.: catalog.files).
+
+    Grava em lotes de SAVE_BATCH (a UI já vê os primeiros) e remove do banco
+    o que saiu da árvore. Devolve (analisados, removidos, falhas).
+    """
+    jobs, removed = stale_jobs(store, samples_root, files)
+    if removed:
+        store.delete_sample_features(removed)
+    batch, done, failed = [], 0, 0
+    for job, row in _results(jobs, workers or os.cpu_count() or 1):
+        done += 1
+        if isinstance(row, Exception):
+            failed += 1
+            logging.warning("Erro analisando sample %s: %s", job[2], row)
+        else:
+            batch.append(row)
+        if len(batch) >= SAVE_BATCH:
+            store.save_sample_features(batch)
+            batch = []
+        if on_progress:
+            on_progress(done, len(jobs))
+    if batch:
+        store.save_sample_features(batch)
+    if jobs or removed:
+        logging.info("Índice de samples: %d analisados, %d removidos, %d falhas", len(jobs) - failed,
+                     len(removed), failed)
+    return len(jobs) - failed, len(removed), failed
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from db_backend import GrooveStore, DB_FILE
+    from instruments import load_catalog
+    root = sys.argv[1] if len(sys.argv) > 1 else "samples"
+    store = GrooveStore(DB_FILE)
+    catalog = load_catalog(root, os.path.join("cache", "instruments.json"), store)
+    start = time.perf_counter()
+    print("analisados %d, removidos %d, falhas %d" % update_index(store, root, catalog.files),
+          f"em {(time.perf_counter() - start) * 1000:.0f} ms")
+    for track in catalog.tracks():
+        timbre = catalog.resolve(track, None)
+        if timbre is None:
+            continue
+        f = store.load_sample_features(timbre.category, timbre.name)
+        near = store.nearest_samples(timbre.category, timbre.name, 3)
+        print(f"{timbre.category}/{timbre.name}: {f['duration']:.2f}s, RMS {f['rms_db']:.1f} dB, "
+              f"centroide {f['centroid']:.0f} Hz -> " + ", ".join(n for _c, n, _d in near))
@@ -0,0 +1,189 @@
+# sample_bank.py
+"""Banco de samples indexado em disco, decodificado sob demanda com cache LRU."""
+import os
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".aiff", ".aif")
+
+SampleRef = namedtuple("SampleRef", "category name path size")
+
+
+def decode_pcm16(path):
+    """Decodificador padrão: PCM int16 (frames, canais) via soundfile."""
+    import soundfile as sf
+    data, _sr = sf.read(path, dtype="int16", always_2d=True)
+    return data
+
+
+def default_sizeof(obj):
+    nbytes = getattr(obj, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return 0
+
+
+class SampleBank:
+    """Indexa `root/<categoria>/` sem decodificar nada.
+
+    O primeiro `get` de um sample chama `decoder(path)` e guarda o resultado
+    num LRU limitado por `budget_bytes` (medido com `sizeof`). Categorias são
+    resolvidas sem diferenciar maiúsculas ("kick" -> "Kick/"). Com um
+    `SamplePack`, `pcm` devolve views memmap sem decodificar nada. `refs`
+    (ex.: do catálogo de instrumentos) monta o índice sem listar o diretório.
+    """
+
+    def __init__(self, root, budget_bytes=64 * 1024 * 1024, decoder=decode_pcm16, sizeof=default_sizeof,
+                 pack=None, refs=None):
+        self.root = root
+        self.pack = pack
+        self.budget_bytes = budget_bytes
+        self.decoder = decoder
+        self.sizeof = sizeof
+        self.index = {}
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._inflight = {}
+        self._prewarm_thread = None
+        if refs is None:
+            self.scan()
+        else:
+            self.load_refs(refs)
+
+    def scan(self):
+        """(Re)indexa o diretório: só lista arquivos, não lê áudio."""
+        index = {}
+        try:
+            entries = sorted(os.scandir(self.root), key=lambda e: e.name)
+        except FileNotFoundError:
+            logging.warning("Diretório de samples não encontrado: %s", self.root)
+            entries = []
+        for cat in entries:
+            if not cat.is_dir():
+                continue
+            refs = {}
+            for f in sorted(os.scandir(cat.path), key=lambda e: e.name):
+                if f.is_file() and f.name.lower().endswith(AUDIO_EXTENSIONS):
+                    refs[f.name] = SampleRef(cat.name, f.name, f.path, f.stat().st_size)
+            index[cat.name.lower()] = refs
+        with self._lock:
+            self.index = index
+        logging.debug("SampleBank: %d categorias, %d arquivos indexados",
+                      len(index), sum(len(r) for r in index.values()))
+        return index
+
+    def load_refs(self, refs):
+        """Indexa a partir de SampleRefs já conhecidos, sem tocar no disco."""
+        index = {}
+        for ref in refs:
+            index.setdefault(ref.category.lower(), {})[ref.name] = ref
+        with self._lock:
+            self.index = index
+        return index
+
+    def categories(self):
+        return list(self.index.keys())
+
+    def files(self, category):
+        return list(self.index.get(category.lower(), {}).values())
+
+    def ref(self, category, name):
+        return self.index.get(category.lower(), {}).get(name)
+
+    def path(self, category, name):
+        ref = self.ref(category, name)
+        return ref.path if ref else None
+
+    def exists(self, category, name):
+        return self.ref(category, name) is not None
+
+    def get(self, category, name):
+        """Sample decodificado, ou None se não existir/falhar ao decodificar."""
+        ref = self.ref(category, name)
+        if ref is None:
+            return None
+        key = (category.lower(), name)
+        with self._lock:
+            obj = self.cache.get(key)
+            if obj is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return obj
+            self.misses += 1
+            # outro thread (prewarm) já está decodificando: espera por ele
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            pending.wait()
+            with self._lock:
+                return self.cache.get(key)
+        try:
+            obj = self.decoder(ref.path)
+        except Exception as e:
+            logging.warning("Erro ao carregar sample %s: %s", ref.path, e)
+            obj = None
+        with self._lock:
+            if obj is not None:
+                self._store(key, obj)
+            self._inflight.pop(key).set()
+        return obj
+
+    def pcm(self, category, name):
+        """PCM int16 (frames, canais): view do pacote memmap ou decodificado na hora."""
+        ref = self.ref(category, name)
+        if ref is None:
+            return None
+        if self.pack is not None:
+            view = self.pack.get(ref.category, ref.name)
+            if view is not None:
+                return view
+        try:
+            return decode_pcm16(ref.path)
+        except Exception as e:
+            logging.warning("Erro ao carregar sample %s: %s", ref.path, e)
+            return None
+
+    def _store(self, key, obj):
+        self.cache[key] = obj
+        self.cache_bytes += self.sizeof(obj)
+        # nunca despeja o item recém-inserido, mesmo que sozinho estoure o orçamento
+        while self.cache_bytes > self.budget_bytes and len(self.cache) > 1:
+            _old_key, old = self.cache.popitem(last=False)
+            self.cache_bytes -= self.sizeof(old)
+
+    def evict(self, category=None, name=None):
+        """Remove do cache um sample, uma categoria inteira ou tudo."""
+        with self._lock:
+            for key in list(self.cache):
+                if category is not None and key[0] != category.lower():
+                    continue
+                if name is not None and key[1] != name:
+                    continue
+                self.cache_bytes -= self.sizeof(self.cache.pop(key))
+
+    def prewarm(self, keys=None, background=True):
+        """Decodifica `keys` [(categoria, nome)] (ou o banco todo) antecipadamente."""
+        if keys is None:
+            keys = [(ref.category, ref.name) for refs in self.index.values() for ref in refs.values()]
+        keys = list(keys)
+
+        def run():
+            for category, name in keys:
+                self.get(category, name)
+            logging.debug("SampleBank: prewarm de %d samples concluído", len(keys))
+
+        if not background:
+            run()
+            return None
+        t = threading.Thread(target=run, name="sample-prewarm", daemon=True)
+        t.start()
+        self._prewarm_thread = t
+        return t
@@ -0,0 +1,210 @@
+# sample_pack.py
+"""Pacote persistente de samples decodificados (PCM cru + índice JSON) lido via np.memmap.
+
+    python sample_pack.py [samples_dir] [pack_dir]
+
+Gera `<pack_dir>/samples.pcm` (int16 intercalado) e `<pack_dir>/samples.json`
+com offset, frames, canais, taxa, mtime, tamanho e sha1 de cada arquivo.
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+PACK_VERSION = 1
+PCM_NAME = "samples.pcm"
+INDEX_NAME = "samples.json"
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".aiff", ".aif")
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_tree(samples_root):
+    """{"Categoria/arquivo.wav": caminho} para todos os áudios da árvore."""
+    found = {}
+    for cat in sorted(os.listdir(samples_root)):
+        cat_path = os.path.join(samples_root, cat)
+        if not os.path.isdir(cat_path):
+            continue
+        for name in sorted(os.listdir(cat_path)):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                found[f"{cat}/{name}"] = os.path.join(cat_path, name)
+    return found
+
+
+def split_sample_path(path, samples_root):
+    """("Categoria", "arquivo.wav") a partir do caminho de um sample."""
+    rel = os.path.relpath(path, samples_root).replace(os.sep, "/")
+    category, _, name = rel.partition("/")
+    return category, name
+
+
+class SamplePack:
+    """Pacote aberto: `get` devolve views (frames, canais) sem cópia, no dtype do índice.
+
+    O pacote de origem é int16; as variantes do sample_prep usam o mesmo layout em float32.
+    """
+
+    def __init__(self, pack_dir, index, blob):
+        self.pack_dir = pack_dir
+        self.index = index
+        self.entries = index["entries"]
+        self.blob = blob
+        self._by_lower = {key.lower(): key for key in self.entries}
+
+    @classmethod
+    def open(cls, pack_dir):
+        """Abre um pacote existente ou devolve None se ausente/corrompido."""
+        try:
+            with open(os.path.join(pack_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != PACK_VERSION:
+                return None
+            dtype = np.dtype(index.get("dtype", "int16"))
+            pcm_path = os.path.join(pack_dir, PCM_NAME)
+            if os.path.getsize(pcm_path) == 0:
+                blob = np.zeros(0, dtype=dtype)
+            else:
+                blob = np.memmap(pcm_path, dtype=dtype, mode="r")
+            return cls(pack_dir, index, blob)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.debug("Pacote de samples indisponível em %s: %s", pack_dir, e)
+            return None
+
+    def key(self, category, name):
+        return self._by_lower.get(f"{category}/{name}".lower())
+
+    def info(self, category, name):
+        key = self.key(category, name)
+        return self.entries[key] if key else None
+
+    def get(self, category, name):
+        entry = self.info(category, name)
+        if entry is None:
+            return None
+        start = entry["offset"]
+        count = entry["frames"] * entry["channels"]
+        return self.blob[start:start + count].reshape(entry["frames"], entry["channels"])
+
+    def stale_entries(self, samples_root):
+        """Chaves que mudaram em disco (mtime/tamanho e, na dúvida, sha1).
+
+        Quando só o mtime difere (ex.: PyInstaller extrai tudo em _MEIPASS a cada
+        execução) o sha1 decide; se bater, a entrada continua válida.
+        """
+        tree = scan_tree(samples_root)
+        stale = set(tree) ^ set(self.entries)
+        for key, path in tree.items():
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            st = os.stat(path)
+            if st.st_size != entry["size"]:
+                stale.add(key)
+            elif st.st_mtime != entry["mtime"] and file_sha1(path) != entry["sha1"]:
+                stale.add(key)
+        return stale
+
+
+def build_pack(samples_root, pack_dir, previous=None):
+    """Converte a árvore de samples num pacote novo e o abre.
+
+    Entradas iguais às do pacote anterior (mesmo sha1) são copiadas do blob
+    antigo em vez de decodificadas de novo.
+    """
+    import soundfile as sf
+
+    os.makedirs(pack_dir, exist_ok=True)
+    tree = scan_tree(samples_root)
+    old_by_hash = {}
+    if previous is not None:
+        for key, entry in previous.entries.items():
+            old_by_hash[entry["sha1"]] = key
+
+    entries = {}
+    offset = 0
+    decoded = 0
+    tmp_pcm = os.path.join(pack_dir, PCM_NAME + ".tmp")
+    with open(tmp_pcm, "wb") as out:
+        for key, path in tree.items():
+            st = os.stat(path)
+            sha1 = file_sha1(path)
+            old_key = old_by_hash.get(sha1)
+            if old_key is not None:
+                old = previous.entries[old_key]
+                pcm = previous.get(*old_key.split("/", 1))
+                sample_rate = old["sample_rate"]
+            else:
+                try:
+                    pcm, sample_rate = sf.read(path, dtype="int16", always_2d=True)
+                except Exception as e:
+                    logging.warning("Erro ao decodificar %s para o pacote: %s", path, e)
+                    continue
+                decoded += 1
+            pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+            out.write(pcm.tobytes())
+            entries[key] = {
+                "offset": offset,
+                "frames": int(pcm.shape[0]),
+                "channels": int(pcm.shape[1]),
+                "sample_rate": int(sample_rate),
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+                "sha1": sha1,
+            }
+            offset += pcm.size
+    pcm = None
+
+    if previous is not None:
+        # libera o memmap antigo antes de substituir o arquivo (Windows)
+        previous.blob = None
+    os.replace(tmp_pcm, os.path.join(pack_dir, PCM_NAME))
+    index = {"version": PACK_VERSION, "dtype": "int16", "entries": entries}
+    tmp_index = os.path.join(pack_dir, INDEX_NAME + ".tmp")
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, os.path.join(pack_dir, INDEX_NAME))
+    logging.info("Pacote de samples gerado em %s: %d arquivos (%d decodificados)",
+                 pack_dir, len(entries), decoded)
+    return SamplePack.open(pack_dir)
+
+
+def open_or_build(samples_root, pack_dir, bundled_dir=None):
+    """Abre o pacote válido mais próximo, reconstruindo o cache local se preciso.
+
+    `bundled_dir` é um pacote somente-leitura distribuído junto do executável;
+    se ainda bater com a árvore de samples, é usado direto.
+    """
+    if bundled_dir:
+        pack = SamplePack.open(bundled_dir)
+        if pack is not None and not pack.stale_entries(samples_root):
+            return pack
+    pack = SamplePack.open(pack_dir)
+    if pack is not None:
+        stale = pack.stale_entries(samples_root)
+        if not stale:
+            return pack
+        logging.info("Pacote de samples desatualizado (%d arquivos); reconstruindo", len(stale))
+    try:
+        return build_pack(samples_root, pack_dir, previous=pack)
+    except Exception as e:
+        logging.warning("Não foi possível gerar o pacote de samples: %s", e)
+        return None
+
+
+if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging(log_file="")
+    root = sys.argv[1] if len(sys.argv) > 1 else "samples"
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join("cache", "sample_pack")
+    built = build_pack(root, out_dir, previous=SamplePack.open(out_dir))
+    print(f"{len(built.entries)} samples -> {out_dir}")
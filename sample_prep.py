@@ -0,0 +1,265 @@
+# sample_prep.py
+"""Variantes dos samples prontas para a saída: reamostradas, aparadas e normalizadas.
+
+    python sample_prep.py [taxa] [samples_dir]
+
+Cada sample do pacote int16 (sample_pack) é convertido uma vez para a taxa
+do dispositivo de saída com um reamostrador polifásico de sinc janelado
+(Kaiser) vetorizado em NumPy, tem o silêncio inicial cortado e o ganho
+ajustado (pico ou loudness, com teto de pico). O resultado vai para um
+pacote float32 em `<cache>/<taxa>hz/`, no mesmo layout do sample_pack, e é
+aberto por memmap nas execuções seguintes. Cada entrada guarda também o
+`onset`: frames do início do sample até o ataque, que o sequenciador
+antecipa para o ataque cair em cima da grade.
+"""
+import os
+import sys
+import json
+import logging
+from math import gcd
+
+import numpy as np
+
+from sample_pack import SamplePack, scan_tree, file_sha1, PACK_VERSION, PCM_NAME, INDEX_NAME
+
+PREP_VERSION = 1
+DEFAULT_SETTINGS = {
+    "normalize": "loudness",   # "loudness", "peak" ou "none"
+    "loudness_db": -18.0,      # alvo do modo loudness (loudness momentânea máxima)
+    "ceiling_db": -3.0,        # teto de pico nos dois modos
+    "silence_db": -50.0,       # abaixo disso (relativo ao pico) é silêncio inicial
+    "preroll_ms": 0.5,         # margem mantida antes do primeiro som
+    "onset_ratio": 0.25,       # ataque: primeiro frame com |x| >= ratio * pico
+    "max_onset_ms": 5.0,       # nunca antecipa mais que isso
+}
+RESAMPLE_ZEROS = 32        # cruzamentos por zero do sinc de cada lado
+RESAMPLE_BETA = 8.6        # Kaiser: ~-80 dB de rejeição
+RESAMPLE_ROLLOFF = 0.95    # corte em 95% do Nyquist menor
+RESAMPLE_CHUNK = 8192      # frames de saída por passada (limita a memória)
+LOUDNESS_BLOCK_S = 0.4
+LOUDNESS_HOP_S = 0.1
+
+
+# ---------------- reamostragem ---------------- #
+def _phase_table(up, down):
+    """Coeficientes (up, taps) do sinc janelado, um conjunto por fase fracionária."""
+    cutoff = RESAMPLE_ROLLOFF * min(1.0, up / down)
+    half = int(np.ceil(RESAMPLE_ZEROS / cutoff))
+    # tap j da fase p fica em (j - half + 1) - p/up amostras de entrada do instante de saída
+    tau = (np.arange(2 * half)[None, :] - half + 1) - np.arange(up)[:, None] / up
+    window = np.i0(RESAMPLE_BETA * np.sqrt(np.clip(1.0 - (tau / half) ** 2, 0.0, None))) / np.i0(RESAMPLE_BETA)
+    table = cutoff * np.sinc(cutoff * tau) * window
+    # ganho DC exatamente 1 em todas as fases
+    table /= table.sum(axis=1, keepdims=True)
+    return table.astype(np.float32), half
+
+
+def resample(pcm, src_rate, dst_rate):
+    """PCM float (frames, canais) de `src_rate` para `dst_rate` (float32).
+
+    Polifásico: para a razão up/down reduzida, cada frame de saída n é o
+    produto dos `taps` frames de entrada em volta de n*down/up pela linha
+    da tabela da fase (n*down) % up. Tudo em blocos de RESAMPLE_CHUNK
+    frames de saída com einsum, sem laço por amostra.
+    """
+    pcm = np.asarray(pcm, dtype=np.float32)
+    if pcm.ndim == 1:
+        pcm = pcm[:, None]
+    if src_rate == dst_rate or len(pcm) == 0:
+        return pcm
+    g = gcd(int(src_rate), int(dst_rate))
+    up, down = int(dst_rate) // g, int(src_rate) // g
+    table, half = _phase_table(up, down)
+    taps = table.shape[1]
+    n_out = -(-len(pcm) * up // down)
+    padded = np.concatenate([np.zeros((half - 1, pcm.shape[1]), np.float32), pcm,
+                             np.zeros((half + 1, pcm.shape[1]), np.float32)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, taps, axis=0)   # (frames, canais, taps)
+    out = np.empty((n_out, pcm.shape[1]), dtype=np.float32)
+    for start in range(0, n_out, RESAMPLE_CHUNK):
+        n = np.arange(start, min(start + RESAMPLE_CHUNK, n_out), dtype=np.int64)
+        base, phase = np.divmod(n * down, up)
+        out[start:start + len(n)] = np.einsum("nct,nt->nc", windows[base], table[phase])
+    return out
+
+
+# ---------------- análise ---------------- #
+def envelope(pcm):
+    """|x| máximo entre os canais, frame a frame."""
+    if not len(pcm):
+        return np.zeros(0, np.float32)
+    # canal a canal: max(axis=1) sobre 1-2 colunas é bem mais lento que np.maximum
+    env = np.abs(pcm[:, 0])
+    for ch in range(1, pcm.shape[1]):
+        np.maximum(env, np.abs(pcm[:, ch]), out=env)
+    return env
+
+
+def trim_leading_silence(pcm, sample_rate, silence_db, preroll_ms):
+    """(pcm sem o silêncio inicial, frames cortados)."""
+    env = envelope(pcm)
+    peak = float(env.max()) if len(env) else 0.0
+    if peak <= 0.0:
+        return pcm, 0
+    loud = np.flatnonzero(env >= peak * 10 ** (silence_db / 20))
+    start = max(int(loud[0]) - int(round(preroll_ms / 1000 * sample_rate)), 0)
+    return pcm[start:], start
+
+
+def onset_frames(pcm, sample_rate, ratio, max_onset_ms):
+    """Frames do começo do sample até o ataque (limitado a `max_onset_ms`)."""
+    env = envelope(pcm)
+    if not len(env) or env.max() <= 0.0:
+        return 0
+    attack = int(np.argmax(env >= ratio * env.max()))
+    return min(attack, int(round(max_onset_ms / 1000 * sample_rate)))
+
+
+def loudness_db(pcm, sample_rate, output_channels=2):
+    """Loudness momentânea máxima (blocos de 400 ms) em dB FS, sem o filtro K do BS.1770.
+
+    Mono conta como tocado nos `output_channels` canais, como o mixer faz.
+    """
+    if not len(pcm):
+        return -np.inf
+    power = (pcm.astype(np.float64) ** 2).sum(axis=1)
+    if pcm.shape[1] == 1:
+        power *= output_channels
+    block = min(len(power), int(LOUDNESS_BLOCK_S * sample_rate))
+    hop = max(1, int(LOUDNESS_HOP_S * sample_rate))
+    csum = np.concatenate([[0.0], np.cumsum(power)])
+    starts = np.arange(0, len(power) - block + 1, hop)
+    mean_square = (csum[starts + block] - csum[starts]).max() / block
+    return -0.691 + 10 * np.log10(mean_square) if mean_square > 0 else -np.inf
+
+
+def normalize_gain_db(pcm, sample_rate, settings):
+    """Ganho (dB) pedido por `settings["normalize"]`, respeitando o teto de pico."""
+    mode = settings["normalize"]
+    peak = float(envelope(pcm).max()) if len(pcm) else 0.0
+    if mode == "none" or peak <= 0.0:
+        return 0.0
+    headroom = settings["ceiling_db"] - 20 * np.log10(peak)
+    if mode == "peak":
+        return float(headroom)
+    level = loudness_db(pcm, sample_rate)
+    return float(min(settings["loudness_db"] - level, headroom))
+
+
+def prepare(pcm, src_rate, dst_rate, settings=None):
+    """PCM int16/float -> (float32 pronto para a saída, metadados da preparação)."""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    pcm = np.asarray(pcm)
+    if pcm.dtype.kind in "iu":
+        pcm = pcm.astype(np.float32) / float(np.iinfo(pcm.dtype).max + 1)
+    pcm = resample(pcm, src_rate, dst_rate)
+    pcm, trimmed = trim_leading_silence(pcm, dst_rate, settings["silence_db"], settings["preroll_ms"])
+    gain_db = normalize_gain_db(pcm, dst_rate, settings)
+    if gain_db:
+        pcm = pcm * np.float32(10 ** (gain_db / 20))
+    onset = onset_frames(pcm, dst_rate, settings["onset_ratio"], settings["max_onset_ms"])
+    return np.ascontiguousarray(pcm, dtype=np.float32), {"trimmed": trimmed, "gain_db": gain_db, "onset": onset}
+
+
+# ---------------- pacote de variantes ---------------- #
+def variants_dir(cache_root, sample_rate):
+    return os.path.join(cache_root, f"{int(sample_rate)}hz")
+
+
+def _source_hashes(source, samples_root):
+    """{"Categoria/arquivo": sha1} da origem (pacote int16 ou a árvore de samples)."""
+    if source is not None:
+        return {key: entry["sha1"] for key, entry in source.entries.items()}
+    return {key: file_sha1(path) for key, path in scan_tree(samples_root).items()}
+
+
+def _is_current(pack, sample_rate, settings, hashes):
+    index = pack.index
+    return (index.get("prep_version") == PREP_VERSION and index.get("output_rate") == int(sample_rate)
+            and index.get("settings") == settings
+            and {key: e["sha1"] for key, e in pack.entries.items()} == hashes)
+
+
+def build_variants(source, samples_root, out_dir, sample_rate, settings=None, previous=None):
+    """Prepara todos os samples para `sample_rate` e grava o pacote float32 em `out_dir`.
+
+    `source` é o SamplePack int16 (None decodifica os arquivos). Entradas do
+    pacote anterior com o mesmo sha1 são copiadas em vez de refeitas.
+    """
+    import soundfile as sf
+
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    os.makedirs(out_dir, exist_ok=True)
+    reuse = {}
+    if previous is not None and previous.index.get("settings") == settings \
+            and previous.index.get("prep_version") == PREP_VERSION:
+        reuse = {entry["sha1"]: key for key, entry in previous.entries.items()}
+
+    paths = scan_tree(samples_root) if source is None else dict.fromkeys(source.entries)
+    entries, offset, prepared = {}, 0, 0
+    tmp_pcm = os.path.join(out_dir, PCM_NAME + ".tmp")
+    with open(tmp_pcm, "wb") as out:
+        for key in paths:
+            category, name = key.split("/", 1)
+            if source is not None:
+                src = source.entries[key]
+                sha1, src_rate, pcm = src["sha1"], src["sample_rate"], source.get(category, name)
+            else:
+                sha1 = file_sha1(paths[key])
+                try:
+                    pcm, src_rate = sf.read(paths[key], dtype="float32", always_2d=True)
+                except Exception as e:
+                    logging.warning("Erro ao decodificar %s para as variantes: %s", paths[key], e)
+                    continue
+            old_key = reuse.get(sha1)
+            if old_key is not None:
+                meta = {k: previous.entries[old_key][k] for k in ("trimmed", "gain_db", "onset")}
+                data = np.asarray(previous.get(*old_key.split("/", 1)))
+            else:
+                data, meta = prepare(pcm, src_rate, sample_rate, settings)
+                prepared += 1
+            out.write(data.tobytes())
+            entries[key] = {"offset": offset, "frames": int(data.shape[0]), "channels": int(data.shape[1]),
+                            "sample_rate": int(sample_rate), "sha1": sha1, **meta}
+            offset += data.size
+    data = None
+
+    if previous is not None:
+        # libera o memmap antigo antes de substituir o arquivo (Windows)
+        previous.blob = None
+    os.replace(tmp_pcm, os.path.join(out_dir, PCM_NAME))
+    index = {"version": PACK_VERSION, "dtype": "float32", "prep_version": PREP_VERSION,
+             "output_rate": int(sample_rate), "settings": settings, "entries": entries}
+    tmp_index = os.path.join(out_dir, INDEX_NAME + ".tmp")
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, os.path.join(out_dir, INDEX_NAME))
+    logging.info("Variantes dos samples em %s: %d arquivos a %d Hz (%d preparados)",
+                 out_dir, len(entries), sample_rate, prepared)
+    return SamplePack.open(out_dir)
+
+
+def open_or_build_variants(source, samples_root, cache_root, sample_rate, settings=None):
+    """Pacote de variantes para `sample_rate`, refeito só se a origem ou os ajustes mudaram."""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    out_dir = variants_dir(cache_root, sample_rate)
+    pack = SamplePack.open(out_dir)
+    try:
+        if pack is not None and _is_current(pack, sample_rate, settings, _source_hashes(source, samples_root)):
+            return pack
+        return build_variants(source, samples_root, out_dir, sample_rate, settings, previous=pack)
+    except Exception as e:
+        logging.warning("Não foi possível preparar as variantes dos samples: %s", e)
+        return None
+
+
+if __name__ == "__main__":
+    from log_setup import setup_logging
+    from sample_pack import open_or_build
+    setup_logging(log_file="")
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 48000
+    root = sys.argv[2] if len(sys.argv) > 2 else "samples"
+    source = open_or_build(root, os.path.join("cache", "sample_pack"))
+    built = open_or_build_variants(source, root, os.path.join("cache", "sample_variants"), rate)
+    onsets = [e["onset"] for e in built.entries.values()]
+    print(f"{len(built.entries)} samples a {rate} Hz; onset médio {np.mean(onsets) / rate * 1000:.2f} ms")
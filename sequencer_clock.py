@@ -0,0 +1,110 @@
+# sequencer_clock.py
+"""Relógio do sequenciador baseado em deadlines absolutos (sem drift)."""
+import time
+import threading
+from collections import namedtuple
+
+# step: índice absoluto desde o início do transporte
+# due: instante (relógio monotônico) em que o passo deve soar
+# lateness: atraso real do despacho em segundos (>= 0), contra `due - lead`
+Tick = namedtuple("Tick", "step due lateness")
+
+
+class StepClock:
+    """Agenda os passos em tempos fixos a partir do início do transporte.
+
+    O passo n vence em `origem + n * duração`; o tempo gasto disparando sons
+    ou atualizando a UI não se acumula de um passo para o outro. A espera é
+    feita em duas fases: um `Event.wait` grosso até `spin_margin` antes do
+    deadline e um spin curto até o instante exato.
+
+    Com `lead` (s), cada passo é entregue esse tanto antes de vencer: o
+    chamador agenda o som no instante exato do passo (ex.: um frame futuro
+    do mixer) e o atraso da thread até ali é absorvido pela antecedência.
+    """
+
+    def __init__(self, spin_margin=0.002, late_threshold=0.002, clock=time.perf_counter, lead=0.0):
+        self.spin_margin = spin_margin
+        self.late_threshold = late_threshold
+        self.clock = clock
+        self.lead = lead
+        self.step_duration = None
+        self.next_step = 0
+        self.late_steps = 0
+        self.dropped_steps = 0
+        self._anchor_time = None
+        self._anchor_step = 0
+
+    def start(self, step_duration, now=None):
+        """Zera o transporte; o passo 0 vence imediatamente."""
+        self.step_duration = float(step_duration)
+        self._anchor_time = self.clock() if now is None else now
+        self._anchor_step = 0
+        self.next_step = 0
+        self.late_steps = 0
+        self.dropped_steps = 0
+
+    def set_step_duration(self, step_duration):
+        """Muda o andamento a partir do próximo passo, sem deslocar a grade."""
+        step_duration = float(step_duration)
+        if step_duration == self.step_duration:
+            return
+        self._anchor_time = self.due_time(self.next_step)
+        self._anchor_step = self.next_step
+        self.step_duration = step_duration
+
+    def due_time(self, step):
+        return self._anchor_time + (step - self._anchor_step) * self.step_duration
+
+    def due_sample(self, step, sample_rate):
+        """Posição do passo em amostras a partir do início do transporte."""
+        return int(round((self.due_time(step) - self.due_time(0)) * sample_rate))
+
+    def step_at(self, t):
+        """Último passo que já venceu no instante `t` (-1 antes do passo 0)."""
+        step = self._anchor_step + int((t - self._anchor_time) // self.step_duration)
+        # relógios em que a duração varia (BeatGridClock) corrigem a estimativa linear
+        while step >= 0 and self.due_time(step) > t:
+            step -= 1
+        while self.due_time(step + 1) <= t:
+            step += 1
+        return max(step, -1)
+
+    def wait_next(self, stop_event=None, until=None):
+        """Bloqueia até `lead` antes do deadline do próximo passo e devolve um Tick.
+
+        Com `until`, pula direto para esse passo: os passos do meio não têm
+        nada a tocar e não contam como descartados. Retorna None se
+        `stop_event` for sinalizado durante a espera (o passo não avança).
+        Quando o chamador está atrasado mais de um passo inteiro, os passos
+        perdidos são descartados (contados em `dropped_steps`) para recuperar
+        a grade.
+        """
+        if stop_event is None:
+            stop_event = threading.Event()
+        step = self.next_step if until is None else max(self.next_step, until)
+        now = self.clock()
+        behind = int((now - self.due_time(step) + self.lead) / self.step_duration)
+        if behind > 0:
+            self.dropped_steps += behind
+            step += behind
+            self.next_step = step
+
+        due = self.due_time(step)
+        wake = due - self.lead
+        while True:
+            remaining = wake - self.clock()
+            if remaining <= 0:
+                break
+            if remaining > self.spin_margin:
+                if stop_event.wait(remaining - self.spin_margin):
+                    return None
+            elif stop_event.is_set():
+                return None
+
+        lateness = self.clock() - wake
+        if lateness > self.late_threshold:
+            self.late_steps += 1
+        tick = Tick(step, due, lateness)
+        self.next_step = step + 1
+        return tick
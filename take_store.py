@@ -0,0 +1,340 @@
+# take_store.py
+"""Takes do looper em disco: camadas int16 em memmap, com histórico de desfazer.
+
+Cada pista tem uma pasta em `loops/` (`pista_1/`, ...) com um index.json,
+uma camada por gravação (o take e cada overdub) e a mixagem delas
+(`mix_*.i16`). A mixagem é o buffer que o mixer toca e que o gravador
+atualiza: editor e reprodução compartilham a mesma memória mapeada, sem
+cópia float32 em RAM nem um WAV novo a cada overdub.
+
+Só as últimas `max_undo` camadas ficam separadas; além disso, a mais antiga
+é somada na base. Desfazer descarta a última camada e remonta a mixagem com
+as que restam. Arquivos do store que deixam de ser referenciados (camadas
+fundidas ou desfeitas, takes substituídos) são apagados por
+`TakeStore.compact()`. Os WAVs do looper antigo nunca são apagados: depois de
+importados ficam onde estão, registrados em `legacy_imported.json` para não
+voltarem numa pista limpa.
+"""
+import os
+import re
+import json
+import logging
+
+import numpy as np
+
+STORE_VERSION = 1
+PCM_DTYPE = np.int16
+PCM_MAX = 32767
+MAX_UNDO = 8
+# frames por bloco ao remontar/fundir camadas (limita a memória temporária)
+MIX_CHUNK = 1 << 16
+INDEX_NAME = "index.json"
+# WAVs do looper antigo: user_loop_<pista>.wav e user_loop_<pista>_<timestamp>.wav
+LEGACY_WAV = re.compile(r"user_loop_(\d+)(?:_(\d+))?\.wav$")
+LEGACY_IMPORTED = "legacy_imported.json"
+# o que o próprio store cria numa pasta de pista (_new_file, _save_index); só isso é compactado
+STORE_FILE = re.compile(r"(?:mix|layer)_\d+\.i16$|" + re.escape(INDEX_NAME) + r"\.tmp$")
+
+
+def to_pcm16(block):
+    """float [-1, 1] -> int16, saturando em vez de dar a volta."""
+    scaled = np.multiply(block, PCM_MAX + 1, dtype=np.float32)
+    np.clip(scaled, -PCM_MAX - 1, PCM_MAX, out=scaled)
+    return scaled.astype(PCM_DTYPE)
+
+
+def add_pcm16(dst, src):
+    """dst += src em int16, saturando (dst é alterado no lugar)."""
+    acc = dst.astype(np.int32)
+    acc += src
+    np.clip(acc, -PCM_MAX - 1, PCM_MAX, out=acc)
+    dst[:] = acc
+
+
+class StoredTake:
+    """Take de uma pista: camadas int16 em memmap e a mixagem que o mixer toca.
+
+    `data` é a mixagem (frames, canais), ou None com a pista vazia. Uma
+    gravação pede a camada com `begin_layer` e, no fim, `commit_layer` (ou
+    `abort_layer` se falhar); até lá a camada não entra no histórico.
+    """
+
+    def __init__(self, directory, max_undo=MAX_UNDO):
+        self.directory = directory
+        self.max_undo = max_undo
+        self.samplerate = None
+        self.frames = 0
+        self.channels = 0
+        self.mix_file = None
+        self.layer_files = []    # da base para a mais recente
+        self.counter = 0
+        self.data = None
+        self._pending = None     # (arquivo, memmap) da camada em gravação
+        self._load()
+
+    # ---------------- persistência ---------------- #
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self, name, mode="r+"):
+        return np.memmap(self._path(name), dtype=PCM_DTYPE, mode=mode, shape=(self.frames, self.channels))
+
+    def _new_file(self, prefix):
+        os.makedirs(self.directory, exist_ok=True)
+        self.counter += 1
+        name = f"{prefix}_{self.counter:04d}.i16"
+        return name, np.memmap(self._path(name), dtype=PCM_DTYPE, mode="w+", shape=(self.frames, self.channels))
+
+    def _load(self):
+        try:
+            with open(self._path(INDEX_NAME), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning("Índice de takes ilegível em %s: %s", self.directory, e)
+            return
+        if index.get("version") != STORE_VERSION:
+            logging.warning("Índice de takes de versão %s ignorado em %s", index.get("version"), self.directory)
+            return
+        self.counter = index.get("counter", 0)
+        if not index.get("layers"):
+            return
+        self.samplerate = index["samplerate"]
+        self.frames, self.channels = index["frames"], index["channels"]
+        try:
+            self.data = self._open(index["mix"])
+        except (OSError, ValueError) as e:
+            logging.warning("Mixagem do take ausente em %s: %s", self.directory, e)
+            self.frames = self.channels = 0
+            return
+        self.mix_file = index["mix"]
+        self.layer_files = list(index["layers"])
+
+    def _save_index(self):
+        index = {"version": STORE_VERSION, "counter": self.counter, "samplerate": self.samplerate,
+                 "frames": self.frames, "channels": self.channels, "mix": self.mix_file,
+                 "layers": self.layer_files}
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(INDEX_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._path(INDEX_NAME))
+
+    # ---------------- consulta ---------------- #
+    @property
+    def empty(self):
+        return self.data is None
+
+    @property
+    def layers(self):
+        return len(self.layer_files)
+
+    @property
+    def recording(self):
+        return self._pending is not None
+
+    @property
+    def duration(self):
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    def referenced(self):
+        """Arquivos da pasta em uso (o resto pode ser apagado pela compactação)."""
+        names = {INDEX_NAME}
+        if self.mix_file:
+            names.add(self.mix_file)
+        names.update(self.layer_files)
+        if self._pending is not None:
+            names.add(self._pending[0])
+        return names
+
+    # ---------------- gravação ---------------- #
+    def begin_layer(self, frames, channels=1, samplerate=44100):
+        """Camada zerada para o gravador; com a pista vazia, começa um take novo desse tamanho.
+
+        Num overdub `frames`/`channels`/`samplerate` são ignorados: o primeiro take manda.
+        """
+        if self._pending is not None:
+            raise RuntimeError(f"já há uma gravação em andamento em {self.directory}")
+        if self.data is None:
+            self.frames, self.channels, self.samplerate = int(frames), int(channels), int(samplerate)
+            # arquivo novo: o mixer pode ainda estar tocando a mixagem do take anterior
+            self.mix_file, self.data = self._new_file("mix")
+        self._pending = self._new_file("layer")
+        return self._pending[1]
+
+    def commit_layer(self):
+        """Fecha a camada gravada: entra no histórico e o índice é regravado."""
+        name, layer = self._pending
+        self._pending = None
+        layer.flush()
+        self.data.flush()
+        self.layer_files.append(name)
+        while len(self.layer_files) > self.max_undo + 1:
+            self._merge_oldest()
+        self._save_index()
+
+    def abort_layer(self):
+        """Descarta a camada em gravação; a mixagem volta a ser a soma das camadas antigas."""
+        if self._pending is None:
+            return
+        self._pending = None
+        if self.layer_files:
+            self._remix()
+        else:
+            self._reset()
+        self._save_index()
+
+    # ---------------- histórico ---------------- #
+    def undo(self):
+        """Descarta a última camada; a pista esvazia ao desfazer o próprio take. False se não houver o que desfazer."""
+        if self._pending is not None or not self.layer_files:
+            return False
+        self.layer_files.pop()
+        if self.layer_files:
+            self._remix()
+        else:
+            self._reset()
+        self._save_index()
+        return True
+
+    def clear(self):
+        """Esvazia a pista (os arquivos ficam para a compactação)."""
+        if self._pending is not None:
+            return False
+        self._reset()
+        self._save_index()
+        return True
+
+    def _reset(self):
+        self.data = None
+        self.mix_file = None
+        self.layer_files = []
+        self.frames = self.channels = 0
+        self.samplerate = None
+
+    def _merge_oldest(self):
+        # a camada logo acima da base deixa de ser desfazível: soma na base
+        base, layer = self._open(self.layer_files[0]), self._open(self.layer_files[1], "r")
+        for start in range(0, self.frames, MIX_CHUNK):
+            add_pcm16(base[start:start + MIX_CHUNK], layer[start:start + MIX_CHUNK])
+        base.flush()
+        del self.layer_files[1]
+
+    def _remix(self):
+        # reescreve no lugar: o mixer toca este mesmo buffer e passa a ouvir o resultado
+        layers = [self._open(name, "r") for name in self.layer_files]
+        for start in range(0, self.frames, MIX_CHUNK):
+            end = min(start + MIX_CHUNK, self.frames)
+            acc = layers[0][start:end].astype(np.int32)
+            for layer in layers[1:]:
+                acc += layer[start:end]
+            np.clip(acc, -PCM_MAX - 1, PCM_MAX, out=acc)
+            self.data[start:end] = acc
+        self.data.flush()
+
+    # ---------------- importação ---------------- #
+    def import_wav(self, path):
+        """Take a partir de um WAV (pista do looper antigo), como uma gravação só."""
+        import soundfile as sf
+        pcm, sr = sf.read(path, dtype="float32", always_2d=True)
+        layer = self.begin_layer(len(pcm), pcm.shape[1], sr)
+        layer[:] = to_pcm16(pcm)
+        if self.layers:
+            add_pcm16(self.data, layer)
+        else:
+            self.data[:] = layer
+        self.commit_layer()
+
+
+class TakeStore:
+    """Uma StoredTake por pista do looper, em `root/pista_<n>/`."""
+
+    def __init__(self, root, tracks, max_undo=MAX_UNDO):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.takes = [StoredTake(os.path.join(root, f"pista_{i + 1}"), max_undo) for i in range(tracks)]
+
+    def take(self, idx):
+        return self.takes[idx]
+
+    def _legacy_wavs(self):
+        """{pista (0-based): [caminhos do mais novo para o mais antigo]} dos WAVs do looper antigo."""
+        found = {}
+        for entry in os.scandir(self.root):
+            m = LEGACY_WAV.match(entry.name)
+            if m and entry.is_file():
+                found.setdefault(int(m.group(1)) - 1, []).append((int(m.group(2) or 0), entry.path))
+        return {idx: [p for _ts, p in sorted(items, reverse=True)] for idx, items in found.items()}
+
+    def _handled_legacy(self):
+        try:
+            with open(os.path.join(self.root, LEGACY_IMPORTED), "r", encoding="utf-8") as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logging.warning("Registro de WAVs importados ilegível em %s: %s", self.root, e)
+            return set()
+
+    def _save_handled_legacy(self, names):
+        path = os.path.join(self.root, LEGACY_IMPORTED)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sorted(names), f)
+        os.replace(path + ".tmp", path)
+
+    def import_legacy(self):
+        """Pistas vazias recebem o WAV mais recente do looper antigo, uma vez só.
+
+        Os WAVs ficam em `root`; os de pistas que já têm take (importados
+        agora ou antes) entram no registro e não são mais considerados.
+        """
+        handled = self._handled_legacy()
+        done = set()
+        imported = 0
+        for idx, paths in self._legacy_wavs().items():
+            names = [os.path.basename(p) for p in paths]
+            pending = [p for p, name in zip(paths, names) if name not in handled]
+            if not 0 <= idx < len(self.takes) or not pending:
+                continue
+            if self.takes[idx].empty:
+                try:
+                    self.takes[idx].import_wav(pending[0])
+                    imported += 1
+                    logging.info("Pista %d importada de %s (o WAV foi mantido)", idx + 1, pending[0])
+                except Exception as e:
+                    logging.warning("Não foi possível importar %s: %s", pending[0], e)
+                    continue
+            done.update(names)
+        if done:
+            self._save_handled_legacy(handled | done)
+        return imported
+
+    def compact(self):
+        """Apaga os arquivos do store que nenhuma pista referencia; devolve (arquivos, bytes) liberados.
+
+        Só considera o que o store cria dentro de `pista_<n>/` (STORE_FILE):
+        WAVs do looper antigo e qualquer outro arquivo ficam intactos.
+        Arquivos ainda abertos (ex.: mapeados no Windows) ficam para a
+        próxima vez.
+        """
+        victims = []
+        for take in self.takes:
+            if not os.path.isdir(take.directory):
+                continue
+            keep = take.referenced()
+            victims.extend(e.path for e in os.scandir(take.directory)
+                           if e.is_file() and e.name not in keep and STORE_FILE.match(e.name))
+        files = freed = 0
+        for path in victims:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError as e:
+                logging.debug("Compactação: %s mantido (%s)", path, e)
+                continue
+            files += 1
+            freed += size
+        if files:
+            logging.info("Compactação de %s: %d arquivos, %.1f MB liberados", self.root, files, freed / 1e6)
+        return files, freed
@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Os módulos do app ficam soltos na raiz do projeto; os testes importam direto deles."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,96 @@
+# tests/test_groove_codec.py
+import json
+
+import pytest
+
+import groove_codec
+from groove_codec import GrooveFormatError
+
+DENSE = {
+    "sequence": {"Bumbo": [1, 0, 0, 0] * 4, "Caixa": [0, 0, 1, 0] * 4, "Hi-hat": [1, 1] * 8},
+    "timbres": {"Bumbo": 0, "Caixa": 3, "Hi-hat": None},
+    "velocity": {"Bumbo": [100, 0, 0, 0] * 4, "Caixa": [0, 0, 90, 0] * 4, "Hi-hat": [60, 40] * 8},
+}
+# 4 compassos com poucos hits: cai no layout de eventos (FLAG_SPARSE)
+SPARSE = {
+    "sequence": {"Bumbo": [1] + [0] * 63, "Caixa": [0] * 60 + [1, 0, 0, 0]},
+    "timbres": {"Bumbo": 2, "Caixa": 1},
+    "velocity": {"Bumbo": [127] + [0] * 63, "Caixa": [0] * 60 + [80, 0, 0, 0]},
+    "probability": {"Bumbo": [100] + [0] * 63, "Caixa": [0] * 60 + [50, 0, 0, 0]},
+}
+
+
+def encode(groove):
+    return groove_codec.encode(groove["sequence"], groove["timbres"], groove.get("velocity"),
+                               groove.get("probability"), groove.get("length"))
+
+
+def flags(blob):
+    return groove_codec._HEADER.unpack_from(blob)[4]
+
+
+@pytest.mark.parametrize("groove", [DENSE, SPARSE], ids=["denso", "esparso"])
+def test_round_trip(groove):
+    assert groove_codec.decode(encode(groove)) == groove
+
+
+def test_layout_escolhido():
+    dense, sparse = encode(DENSE), encode(SPARSE)
+    assert not flags(dense) & groove_codec.FLAG_SPARSE
+    # só velocity: continua na versão 1, legível por quem só conhece ela
+    assert dense[3] == 1
+    assert flags(sparse) & groove_codec.FLAG_SPARSE
+    assert sparse[3] == groove_codec.VERSION
+
+
+@pytest.mark.parametrize("groove", [DENSE, SPARSE], ids=["denso", "esparso"])
+def test_blob_truncado(groove):
+    blob = encode(groove)
+    for size in range(len(blob)):
+        with pytest.raises(GrooveFormatError):
+            groove_codec.decode(blob[:size])
+
+
+def test_blob_corrompido():
+    blob = bytearray(encode(DENSE))
+    with pytest.raises(GrooveFormatError):
+        groove_codec.decode(b"XYZ" + bytes(blob[3:]))
+    blob[3] = 99
+    with pytest.raises(GrooveFormatError):
+        groove_codec.decode(bytes(blob))
+
+
+def test_evento_fora_da_grade():
+    blob = bytearray(encode(SPARSE))
+    # n_steps do cabeçalho menor que o último passo com evento
+    blob[5:7] = (8).to_bytes(2, "little")
+    with pytest.raises(GrooveFormatError):
+        groove_codec.decode(bytes(blob))
+
+
+def test_json_antigo():
+    text = json.dumps({"sequence": {"Bumbo": [True, False], "Caixa": [0, 1]},
+                       "timbres": {"Bumbo": "Bumbo 2", "Caixa": None}})
+    assert groove_codec.from_json(text) == {
+        "sequence": {"Bumbo": [1, 0], "Caixa": [0, 1]},
+        "timbres": {"Bumbo": 1, "Caixa": None},
+    }
+
+
+def test_json_com_valores_nulos():
+    groove = groove_codec.normalize({"sequence": {"Bumbo": [1, 1, 1]},
+                                     "velocity": {"Bumbo": [100, None, "forte"]},
+                                     "probability": {"Bumbo": None}})
+    assert groove["velocity"] == {"Bumbo": [100, 0, 0]}
+    assert groove["probability"] == {"Bumbo": []}
+
+
+@pytest.mark.parametrize("data", [
+    {"timbres": {}},
+    {"sequence": [1, 0, 1]},
+    {"sequence": {"Bumbo": [1]}, "velocity": 5},
+    {"sequence": {"Bumbo": [1]}, "length": "longo"},
+])
+def test_json_invalido(data):
+    with pytest.raises(GrooveFormatError):
+        groove_codec.normalize(data)
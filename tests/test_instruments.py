@@ -0,0 +1,78 @@
+# tests/test_instruments.py
+import os
+
+import pytest
+
+import instruments
+from db_backend import GrooveStore
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "samples"
+    write(root / "Kick" / "Deep Kick.wav", b"deep")
+    write(root / "Kick" / "FL 808 Kick.wav", b"808")
+    write(root / "Kick" / "Punch Kick.wav", b"punch")
+    write(root / "Kick" / "Punch Copy.wav", b"punch")
+    write(root / "Snare" / "Clap.wav", b"clap")
+    write(root / "Snare" / "notas.txt", b"ignorado")
+    return str(root)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GrooveStore(str(tmp_path / "grooves.db"))
+    yield store
+    store.close()
+
+
+def ids(catalog, track):
+    return {t.name: t.id for t in catalog.timbres(track)}
+
+
+def test_varredura(tree):
+    catalog, _cache = instruments.build_catalog(tree)
+    assert catalog.tracks() == ["kick", "snare"]
+    # posição na lista antiga vira o ID; o resto vem depois dela, em ordem alfabética
+    legacy = len(instruments.LEGACY_TIMBRES["kick"])
+    assert ids(catalog, "kick") == {"FL 808 Kick.wav": 3, "Deep Kick.wav": legacy, "Punch Copy.wav": legacy + 1}
+    punch = catalog.by_file("Kick", "Punch Kick.wav")
+    assert punch.files == ("Punch Copy.wav", "Punch Kick.wav")
+    assert len(catalog) == 4
+
+
+def test_ids_sobrevivem_sem_o_cache(tree, store, tmp_path):
+    cache_path = str(tmp_path / "cache" / "instruments.json")
+    before = ids(instruments.load_catalog(tree, cache_path, store), "kick")
+    os.remove(cache_path)
+    os.remove(os.path.join(tree, "Kick", "Deep Kick.wav"))
+    write(os.path.join(tree, "Kick", "Alpha Kick.wav"), b"alpha")
+    after = ids(instruments.load_catalog(tree, cache_path, store), "kick")
+    assert after["FL 808 Kick.wav"] == before["FL 808 Kick.wav"]
+    assert after["Punch Copy.wav"] == before["Punch Copy.wav"]
+    # o ID do sample removido fica reservado: o novo não herda
+    assert after["Alpha Kick.wav"] not in before.values()
+
+
+def test_arquivo_sobrescrito_no_lugar(tree, store, tmp_path):
+    cache_path = str(tmp_path / "cache" / "instruments.json")
+    first = instruments.load_catalog(tree, cache_path, store)
+    folder = os.path.join(tree, "Kick")
+    folder_mtime = os.stat(folder).st_mtime
+    path = os.path.join(folder, "Deep Kick.wav")
+    write(path, b"DEEP")
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    # sobrescrever não cria nem renomeia nada: a pasta fica com o mesmo mtime
+    os.utime(folder, (folder_mtime, folder_mtime))
+    second = instruments.load_catalog(tree, cache_path, store)
+    old, new = first.by_file("Kick", "Deep Kick.wav"), second.by_file("Kick", "Deep Kick.wav")
+    assert new.sha1 != old.sha1
+    assert new.id not in ids(first, "kick").values()
+    assert ids(second, "kick")["FL 808 Kick.wav"] == 3
@@ -0,0 +1,84 @@
+# tests/test_sequencer_clock.py
+import pytest
+
+from sequencer_clock import StepClock
+
+
+class FakeTime:
+    """Relógio manual; a espera do StepClock avança ele em vez de dormir."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEvent:
+    def __init__(self, clock, spin=0.0001):
+        self.clock = clock
+        self.spin = spin
+
+    def wait(self, timeout):
+        # como no SO, acorda um pouco depois do pedido (e sempre avança o relógio)
+        self.clock.now += timeout + self.spin
+        return False
+
+    def is_set(self):
+        self.clock.now += self.spin
+        return False
+
+
+def make_clock(lead=0.0):
+    time = FakeTime()
+    clock = StepClock(clock=time, lead=lead)
+    clock.start(0.125, now=0.0)
+    return clock, time, FakeEvent(time)
+
+
+def test_grade_sem_drift():
+    clock, time, event = make_clock()
+    for n in range(32):
+        tick = clock.wait_next(event)
+        assert tick.step == n
+        assert tick.due == pytest.approx(n * 0.125)
+        assert time.now == pytest.approx(n * 0.125, abs=0.001)
+        # trabalho do passo não empurra o próximo
+        time.now += 0.05
+    assert clock.late_steps == 0
+
+
+def test_lead_entrega_antes_do_deadline():
+    clock, time, event = make_clock(lead=0.02)
+    clock.wait_next(event)
+    tick = clock.wait_next(event)
+    assert tick.due == pytest.approx(0.125)
+    assert time.now == pytest.approx(0.105, abs=0.001)
+    assert tick.lateness < clock.late_threshold
+
+
+def test_passos_perdidos_sao_descartados():
+    clock, time, event = make_clock()
+    clock.wait_next(event)
+    time.now = 1.0
+    tick = clock.wait_next(event)
+    assert tick.step == 8
+    assert clock.dropped_steps == 7
+    assert clock.late_steps == 0
+
+
+def test_until_pula_sem_descartar():
+    clock, time, event = make_clock()
+    tick = clock.wait_next(event, until=4)
+    assert (tick.step, clock.dropped_steps) == (4, 0)
+    assert time.now == pytest.approx(0.5, abs=0.001)
+
+
+def test_mudanca_de_andamento_mantem_a_grade():
+    clock, time, event = make_clock()
+    for _ in range(4):
+        clock.wait_next(event)
+    clock.set_step_duration(0.25)
+    assert clock.due_time(4) == pytest.approx(0.5)
+    assert clock.due_time(6) == pytest.approx(1.0)
+    assert clock.step_at(0.9) == 5
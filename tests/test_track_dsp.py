@@ -0,0 +1,99 @@
+# tests/test_track_dsp.py
+import math
+
+import numpy as np
+import pytest
+
+import track_dsp
+from pattern_snapshot import swing_delay
+from track_dsp import TrackBuses, TrackChain
+
+SR = 48000
+
+
+def recursion(x, a, state):
+    """y[n] = y[n-1] + a (x[n] - y[n-1]), amostra a amostra, como referência."""
+    y = np.empty_like(x)
+    for row in range(x.shape[0]):
+        prev = state[row].copy()
+        for n in range(x.shape[1]):
+            prev = prev + a[row] * (x[row, n] - prev)
+            y[row, n] = prev
+        state[row] = prev
+    return y
+
+
+@pytest.mark.parametrize("cutoffs", [(200.0, 5000.0), (1.0, 20.0)], ids=["tipico", "muito-grave"])
+def test_one_pole_igual_a_recursao(cutoffs):
+    rng = np.random.default_rng(1)
+    a = np.array([track_dsp.one_pole_coeff(c, SR) for c in cutoffs])
+    x = rng.uniform(-1, 1, (len(a), 1500, 2))
+    expected_state = np.zeros((len(a), 2))
+    expected = recursion(x, a, expected_state)
+    state = np.zeros((len(a), 2))
+    # dois blocos seguidos e trechos menores que o bloco: o estado atravessa os dois
+    got = np.concatenate([track_dsp.one_pole(x[:, :1000].copy(), a, state, chunk=256),
+                          track_dsp.one_pole(x[:, 1000:].copy(), a, state, chunk=256)], axis=1)
+    np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(state, expected_state, rtol=1e-9, atol=1e-12)
+
+
+def test_one_pole_trecho_padrao_nao_estoura():
+    a = np.array([track_dsp.one_pole_coeff(8000.0, SR)])
+    x = np.ones((1, 4096, 1))
+    y = track_dsp.one_pole(x.copy(), a, np.zeros((1, 1)))
+    assert np.isfinite(y).all()
+    np.testing.assert_allclose(y, recursion(x, a, np.zeros((1, 1))), rtol=1e-9)
+
+
+def test_filtro_desligado_acima_do_limite():
+    assert track_dsp.one_pole_coeff(None, SR) == 1.0
+    assert track_dsp.one_pole_coeff(0.45 * SR, SR) == 1.0
+    assert 0.0 < track_dsp.one_pole_coeff(1000.0, SR) < 1.0
+
+
+def test_buses_filtro_ganho_e_pan():
+    chains = [TrackChain(cutoff=500.0), TrackChain(gain_db=-6.0, pan=-1.0)]
+    buses = TrackBuses(chains, SR, blocksize=128)
+    rng = np.random.default_rng(2)
+    x = rng.uniform(-0.5, 0.5, (2, 256, 2)).astype(np.float32)
+    out = np.zeros((256, 2), dtype=np.float32)
+    for start in (0, 128):
+        view = buses.begin(128)
+        view[:] = x[:, start:start + 128]
+        buses.active[:] = True
+        buses.mix_into(out[start:start + 128])
+    a = np.array([track_dsp.one_pole_coeff(500.0, SR)])
+    low = recursion(x[:1].astype(np.float64), a, np.zeros((1, 2)))[0]
+    expected = low * track_dsp.pan_gains(0.0, 0.0) + x[1] * track_dsp.pan_gains(-6.0, -1.0)
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+def test_pan_gains():
+    np.testing.assert_allclose(track_dsp.pan_gains(0.0, 0.0), [1.0, 1.0], rtol=1e-6)
+    np.testing.assert_allclose(track_dsp.pan_gains(0.0, -1.0), [math.sqrt(2), 0.0], atol=1e-6)
+    gain = 10 ** (-6 / 20)
+    for pan in (-1.0, -0.3, 0.0, 0.7, 1.0, 5.0):
+        left, right = track_dsp.pan_gains(-6.0, pan)
+        # potência constante em qualquer posição (pan fora de [-1, 1] é limitado)
+        assert left ** 2 + right ** 2 == pytest.approx(2 * gain ** 2, rel=1e-5)
+    np.testing.assert_allclose(track_dsp.pan_gains(-6.0, 0.0, channels=1), [gain], rtol=1e-6)
+
+
+def test_soft_limit():
+    quiet = np.linspace(-0.8, 0.8, 101, dtype=np.float32)
+    assert np.array_equal(track_dsp.soft_limit(quiet.copy()), quiet)
+    loud = np.linspace(-20, 20, 4001)
+    y = track_dsp.soft_limit(loud.copy())
+    assert np.abs(y).max() <= 1.0
+    assert np.all(np.diff(y) >= 0)
+    assert np.all(np.diff(y[np.abs(loud) < 2]) > 0)
+    assert np.array_equal(np.sign(y), np.sign(loud))
+    # sem degrau no joelho
+    t = track_dsp.LIMIT_THRESHOLD
+    assert track_dsp.soft_limit(np.array([t + 1e-6]))[0] == pytest.approx(t, abs=1e-5)
+
+
+@pytest.mark.parametrize("percent, delay", [(50, 0.0), (66, 0.32), (75, 0.5), (30, 0.0), (90, 0.5)])
+def test_swing_delay(percent, delay):
+    assert swing_delay(percent) == pytest.approx(delay)
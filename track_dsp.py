@@ -0,0 +1,150 @@
+# track_dsp.py
+"""Cadeia de efeitos por track e limitador do master, em blocos NumPy.
+
+Cada track do sequenciador tem um bus no mixer (AudioEngine): as vozes da
+track somam no bus e, uma vez por bloco, todos os buses ativos passam juntos
+(um array (tracks, frames, canais)) por um passa-baixa de um polo, ganho e
+pan e são somados na saída. Nada é feito amostra a amostra em Python: o
+filtro recursivo usa a forma fechada com cumsum (ver `one_pole`).
+
+Os coeficientes são calculados em `TrackBuses.__init__`, fora da thread de
+áudio; a thread só troca o objeto inteiro (herdando o estado do filtro do
+anterior para não estalar).
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# gain_db: ganho da track; pan: -1 (esquerda) a 1 (direita); cutoff: Hz do passa-baixa (None = aberto)
+TrackChain = namedtuple("TrackChain", "gain_db pan cutoff", defaults=(0.0, 0.0, None))
+# acima disso o passa-baixa de um polo já não muda nada audível: fica desligado
+MAX_CUTOFF_RATIO = 0.45
+# b^-k precisa caber em float64 (máx ~1e308): e^600 deixa folga para a soma
+CUMSUM_LOG_RANGE = 600.0
+LIMIT_THRESHOLD = 0.8
+# estado do filtro abaixo disso conta como silêncio (o bus deixa de ser processado)
+SILENCE = 1e-6
+
+
+def pan_gains(gain_db, pan, channels=2):
+    """Ganho por canal: pan de potência constante, normalizado para 1 no centro."""
+    gain = 10 ** (gain_db / 20)
+    if channels != 2:
+        return np.full(channels, gain, dtype=np.float32)
+    theta = (min(max(pan, -1.0), 1.0) + 1) * math.pi / 4
+    return np.array([math.cos(theta), math.sin(theta)], dtype=np.float32) * gain * math.sqrt(2)
+
+
+def one_pole_coeff(cutoff, samplerate):
+    """Coeficiente `a` de y[n] = y[n-1] + a (x[n] - y[n-1]); 1.0 = filtro desligado."""
+    if not cutoff or cutoff >= MAX_CUTOFF_RATIO * samplerate:
+        return 1.0
+    return 1.0 - math.exp(-2 * math.pi * max(cutoff, 1.0) / samplerate)
+
+
+def filter_chunk(a):
+    """Maior trecho em que b^-k (b = 1 - a) não estoura float64."""
+    return max(1, int(CUMSUM_LOG_RANGE / -math.log(1.0 - a)))
+
+
+def filter_tables(a, chunk):
+    """(b^k, a b^-k) para k = 1..chunk, por linha: (linhas, chunk, 1) em float64."""
+    a = np.asarray(a, dtype=np.float64)[:, None, None]
+    powers = np.exp(np.log1p(-a) * np.arange(1, chunk + 1)[None, :, None])
+    return powers, a / powers
+
+
+def one_pole(x, a, state, chunk=None, tables=None):
+    """Passa-baixa de um polo sobre o eixo 1 de `x` (linhas, frames, canais), no lugar.
+
+    `a` tem um coeficiente por linha (< 1) e `state` (linhas, canais) guarda a
+    última saída de cada uma entre blocos (atualizado aqui). Forma fechada:
+    y[j] = b^(j+1) y[-1] + b^(j+1) Σ_{i<=j} a b^-(i+1) x[i], com b = 1 - a;
+    o somatório é um cumsum, feito em trechos de `chunk` frames. `tables`
+    (de `filter_tables`, com pelo menos `chunk` frames) evita recalcular as
+    potências a cada bloco.
+    """
+    chunk = chunk or filter_chunk(float(np.max(a)))
+    powers, scaled = tables if tables is not None else filter_tables(a, chunk)
+    frames = x.shape[1]
+    for start in range(0, frames, chunk):
+        n = min(chunk, frames - start)
+        acc = x[:, start:start + n] * scaled[:, :n]
+        np.cumsum(acc, axis=1, out=acc)
+        acc += state[:, None, :]
+        acc *= powers[:, :n]
+        x[:, start:start + n] = acc
+        state[:] = acc[:, -1]
+    return x
+
+
+def soft_limit(block, threshold=LIMIT_THRESHOLD):
+    """Limitador suave no lugar: linear até `threshold`, curva tanh até 1 acima disso."""
+    mag = np.abs(block)
+    if mag.max(initial=0.0) <= threshold:
+        return block
+    over = mag > threshold
+    knee = 1.0 - threshold
+    block[over] = np.copysign(threshold + knee * np.tanh((mag[over] - threshold) / knee), block[over])
+    return block
+
+
+class TrackBuses:
+    """Buses das tracks de um AudioEngine, com a cadeia de cada uma já resolvida em coeficientes.
+
+    Usado só pela thread de áudio depois de entregue com `engine.set_buses`:
+    `begin(frames)` devolve os buffers zerados do bloco, o mixer soma as
+    vozes em `buffers[bus]` e marca `active[bus]`, e `mix_into(out)` processa
+    e soma na saída.
+    """
+
+    def __init__(self, chains, samplerate, channels=2, blocksize=256):
+        self.chains = tuple(chains)
+        self.count = len(self.chains)
+        self.channels = channels
+        self.gains = np.array([pan_gains(c.gain_db, c.pan, channels) for c in self.chains],
+                              dtype=np.float32).reshape(self.count, channels)
+        self.coeffs = np.array([one_pole_coeff(c.cutoff, samplerate) for c in self.chains], dtype=np.float64)
+        self.filtered = self.coeffs < 1.0
+        self.chunk = filter_chunk(float(self.coeffs[self.filtered].max())) if self.filtered.any() else blocksize
+        # potências do filtro para um bloco inteiro (ou um trecho, se o bloco for maior que `chunk`)
+        self.tables = filter_tables(np.where(self.filtered, self.coeffs, 0.0), min(self.chunk, blocksize))
+        self.buffers = np.zeros((self.count, blocksize, channels), dtype=np.float32)
+        self.state = np.zeros((self.count, channels), dtype=np.float64)
+        self.active = np.zeros(self.count, dtype=bool)
+        self.frames = 0
+
+    def take_state(self, previous):
+        """Continua o filtro das tracks de `previous` (troca de parâmetros sem estalo)."""
+        n = min(self.count, previous.count)
+        if previous.channels == self.channels:
+            self.state[:n] = previous.state[:n]
+            self.state[~self.filtered] = 0.0
+
+    def begin(self, frames):
+        if frames > self.buffers.shape[1]:
+            self.buffers = np.zeros((self.count, frames, self.channels), dtype=np.float32)
+        self.frames = frames
+        self.active[:] = False
+        view = self.buffers[:, :frames]
+        view.fill(0.0)
+        return view
+
+    def mix_into(self, out):
+        """Filtro, ganho/pan e soma em `out` só dos buses com som ou com o filtro ainda soando."""
+        ringing = self.filtered & (np.abs(self.state).max(axis=1) > SILENCE)
+        rows = np.flatnonzero(self.active | ringing)
+        if len(rows) == 0:
+            return
+        frames = self.frames
+        block = self.buffers[rows, :frames]
+        filtered = self.filtered[rows]
+        if filtered.any():
+            sub = rows[filtered]
+            state = self.state[sub]
+            chunk = min(self.chunk, self.tables[0].shape[1])
+            tables = (self.tables[0][sub], self.tables[1][sub])
+            block[filtered] = one_pole(block[filtered], self.coeffs[sub], state, chunk, tables)
+            self.state[sub] = state
+        out[:frames] += np.einsum("tfc,tc->fc", block, self.gains[rows])